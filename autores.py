@@ -0,0 +1,51 @@
+import threading
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from models import Autor
+from repositorio import clave_autor
+
+
+def normalizar_nombre(nombre: str) -> str:
+    return clave_autor(" ".join(nombre.split()))
+
+
+def id_autor(nombre: str, fecha_nacimiento: date) -> str:
+    return f"{normalizar_nombre(nombre)}_{fecha_nacimiento.isoformat()}"
+
+
+class RegistroAutores:
+    def __init__(self):
+        self._por_clave: Dict[Tuple[str, date], Autor] = {}
+        self._por_id: Dict[str, Autor] = {}
+        self._por_nombre: Dict[str, List[Autor]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._por_id)
+
+    def obtener_o_crear(self, nombre: str, fecha_nacimiento: date) -> Autor:
+        clave = (normalizar_nombre(nombre), fecha_nacimiento)
+        autor = self._por_clave.get(clave)
+        if autor is not None:
+            return autor
+        with self._lock:
+            autor = self._por_clave.get(clave)
+            if autor is None:
+                autor_id = id_autor(nombre, fecha_nacimiento)
+                autor = Autor(nombre=" ".join(nombre.split()), fecha_nacimiento=fecha_nacimiento, id=autor_id)
+                self._por_clave[clave] = autor
+                self._por_id[autor.id] = autor
+                self._por_nombre.setdefault(clave[0], []).append(autor)
+            return autor
+
+    def registrar(self, autor: Autor) -> Autor:
+        if autor.id is not None and self._por_id.get(autor.id) is autor:
+            return autor
+        return self.obtener_o_crear(autor.nombre, autor.fecha_nacimiento)
+
+    def obtener(self, autor_id: str) -> Optional[Autor]:
+        return self._por_id.get(autor_id)
+
+    def buscar(self, nombre: str) -> List[Autor]:
+        return list(self._por_nombre.get(normalizar_nombre(nombre), ()))
@@ -0,0 +1,138 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from datetime import datetime
+from urllib.parse import quote, urlencode
+
+from starlette.concurrency import run_in_threadpool
+
+from benchmarks.carga import (
+    DIRECTORIO_RESULTADOS, MEZCLA, Biblioteca, _commit, _esperar_servidor, _mezcla, _puerto_libre, _servir,
+    generar_peticiones, resumir
+)
+
+MODOS = {"anyio": run_in_threadpool, "asyncio": asyncio.to_thread}
+
+
+def _codificar(peticion: dict, anfitrion: str) -> bytes:
+    ruta = quote(peticion["ruta"])
+    if peticion.get("parametros"):
+        ruta += "?" + urlencode(peticion["parametros"])
+    cuerpo = json.dumps(peticion["cuerpo"]).encode() if peticion.get("cuerpo") else b""
+    encabezados = f"{peticion['metodo']} {ruta} HTTP/1.1\r\nHost: {anfitrion}\r\nContent-Length: {len(cuerpo)}\r\n"
+    if cuerpo:
+        encabezados += "Content-Type: application/json\r\n"
+    return (encabezados + "\r\n").encode() + cuerpo
+
+
+async def _leer_respuesta(lector: asyncio.StreamReader) -> int:
+    cabecera = await lector.readuntil(b"\r\n\r\n")
+    lineas = cabecera.decode("latin-1").split("\r\n")
+    longitud = 0
+    for linea in lineas[1:]:
+        nombre, _, valor = linea.partition(":")
+        if nombre.lower() == "content-length":
+            longitud = int(valor)
+    await lector.readexactly(longitud)
+    return int(lineas[0].split()[1])
+
+
+async def reproducir(puerto: int, peticiones: list, clientes: int):
+    anfitrion = f"127.0.0.1:{puerto}"
+    codificadas = [_codificar(peticion, anfitrion) for peticion in peticiones]
+    siguiente = iter(range(len(peticiones)))
+    muestras = []
+
+    async def trabajar():
+        lector, escritor = await asyncio.open_connection("127.0.0.1", puerto)
+        try:
+            for indice in siguiente:
+                inicio = time.perf_counter()
+                try:
+                    escritor.write(codificadas[indice])
+                    estado = await _leer_respuesta(lector)
+                except (OSError, asyncio.IncompleteReadError):
+                    estado = "excepcion"
+                    escritor.close()
+                    lector, escritor = await asyncio.open_connection("127.0.0.1", puerto)
+                muestras.append((peticiones[indice]["endpoint"], time.perf_counter() - inicio, estado))
+        finally:
+            escritor.close()
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajar() for _ in range(clientes)))
+    return muestras, time.perf_counter() - inicio
+
+
+def medir(app, servicio, modo: str, peticiones: list, calentamiento: int, clientes: int) -> dict:
+    servicio.ejecutor = MODOS[modo]
+    puerto = _puerto_libre()
+    proceso = multiprocessing.get_context("fork").Process(target=_servir, args=(app, puerto))
+    proceso.start()
+    try:
+        _esperar_servidor(f"http://127.0.0.1:{puerto}")
+        asyncio.run(reproducir(puerto, peticiones[:calentamiento], clientes))
+        muestras, duracion = asyncio.run(reproducir(puerto, peticiones[calentamiento:], clientes))
+    finally:
+        proceso.terminate()
+        proceso.join()
+    return resumir(muestras, duracion)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compara el pool de hilos de anyio con asyncio.to_thread para descargar el servicio bajo uvicorn"
+    )
+    parser.add_argument("--libros", type=int, default=10_000)
+    parser.add_argument("--copias-por-libro", type=int, default=3)
+    parser.add_argument("--lectores", type=int, default=5_000)
+    parser.add_argument("--zipf", type=float, default=1.0)
+    parser.add_argument("--peticiones", type=int, default=10_000)
+    parser.add_argument("--calentamiento", type=int, default=500)
+    parser.add_argument("--clientes", default="8,64,256", help="niveles de concurrencia separados por comas")
+    parser.add_argument("--mezcla", type=_mezcla, default=MEZCLA)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--salida", help="archivo JSON de resultados (por defecto en benchmarks/resultados/)")
+    args = parser.parse_args()
+
+    biblioteca = Biblioteca(args.libros, args.copias_por_libro, args.lectores, args.zipf, args.semilla)
+    peticiones = generar_peticiones(biblioteca, args.calentamiento + args.peticiones, args.mezcla, args.semilla)
+
+    from main import app, biblioteca as service, servicio
+    inicio = time.perf_counter()
+    biblioteca.cargar(service)
+    print(f"biblioteca: {biblioteca.parametros} cargada en {time.perf_counter() - inicio:.1f} s")
+
+    print(f"{'modo':<7} {'clientes':>8} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'p99.9 ms':>9}  estados")
+    corridas = []
+    for clientes in (int(valor) for valor in args.clientes.split(",")):
+        for modo in MODOS:
+            resumen = medir(app, servicio, modo, peticiones, args.calentamiento, clientes)
+            total = resumen["total"]
+            estados = " ".join(f"{estado}:{n}" for estado, n in sorted(total["estados"].items()))
+            print(
+                f"{modo:<7} {clientes:>8} {total['rps']:>9.0f} {total['p50_ms']:>8.2f} "
+                f"{total['p95_ms']:>8.2f} {total['p99_ms']:>8.2f} {total['p999_ms']:>9.2f}  {estados}"
+            )
+            corridas.append({"modo": modo, "clientes": clientes, "endpoints": resumen})
+
+    salida = args.salida
+    if salida is None:
+        os.makedirs(DIRECTORIO_RESULTADOS, exist_ok=True)
+        salida = os.path.join(DIRECTORIO_RESULTADOS, f"asincronia-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(salida, "w", encoding="utf-8") as archivo:
+        json.dump({
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "commit": _commit(),
+            "biblioteca": biblioteca.parametros,
+            "mezcla": args.mezcla,
+            "corridas": corridas
+        }, archivo, indent=2, ensure_ascii=False)
+    print(f"resultados guardados en {salida}")
+
+
+if __name__ == "__main__":
+    main()
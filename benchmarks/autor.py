@@ -0,0 +1,43 @@
+import argparse
+import time
+from datetime import date
+
+from models import Autor, Libro
+from service import BibliotecaService
+
+LIBROS_POR_AUTOR = 10
+
+
+def construir_biblioteca(cantidad_libros: int) -> BibliotecaService:
+    service = BibliotecaService()
+    autores = [
+        Autor(nombre=f"Autor {i}", fecha_nacimiento=date(1950, 1, 1))
+        for i in range(max(1, cantidad_libros // LIBROS_POR_AUTOR))
+    ]
+    for i in range(cantidad_libros):
+        autor = autores[i % len(autores)]
+        service.agregar_libro(Libro(nombre=f"Libro {i}", anio=2000, autor=autor, id=f"L{i}"))
+    return service
+
+
+def medir(service: BibliotecaService, repeticiones: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        service.obtener_libros_por_autor("AUTOR 0")
+    return (time.perf_counter() - inicio) / repeticiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia de obtener_libros_por_autor vs tamaño del catálogo")
+    parser.add_argument("--tamanios", type=int, nargs="+", default=[1_000, 10_000, 100_000, 300_000])
+    parser.add_argument("--repeticiones", type=int, default=10_000)
+    args = parser.parse_args()
+
+    print(f"{'libros':>10} {'us/consulta':>12}")
+    for tamanio in args.tamanios:
+        service = construir_biblioteca(tamanio)
+        print(f"{tamanio:>10} {medir(service, args.repeticiones) * 1e6:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import argparse
+import random
+import statistics
+import time
+from datetime import date
+from itertools import accumulate
+
+from busqueda import IndiceBusqueda, normalizar
+from models import Autor, Libro
+
+SILABAS = [c + v for c in "bcdfglmnprstv" for v in "aeiou"]
+
+
+def generar_vocabulario(tamanio: int, aleatorio: random.Random) -> list:
+    palabras = set()
+    while len(palabras) < tamanio:
+        palabras.add("".join(aleatorio.choices(SILABAS, k=aleatorio.randint(2, 4))))
+    palabras = sorted(palabras)
+    aleatorio.shuffle(palabras)
+    return palabras
+
+
+def generar_libros(cantidad: int, vocabulario: list, aleatorio: random.Random) -> list:
+    pesos_acumulados = list(accumulate(1 / rango for rango in range(1, len(vocabulario) + 1)))
+    autores = [
+        Autor(nombre=" ".join(aleatorio.choices(vocabulario, k=2)).title(), fecha_nacimiento=date(1950, 1, 1))
+        for _ in range(max(1, cantidad // 10))
+    ]
+    return [
+        Libro(
+            nombre=" ".join(aleatorio.choices(vocabulario, cum_weights=pesos_acumulados, k=aleatorio.randint(2, 6))).capitalize(),
+            anio=2000,
+            autor=autores[i % len(autores)],
+            id=f"L{i}"
+        )
+        for i in range(cantidad)
+    ]
+
+
+def generar_consultas(libros: list, cantidad: int, aleatorio: random.Random) -> dict:
+    muestras = aleatorio.sample(libros, cantidad)
+    palabras = [normalizar(libro.nombre).split() for libro in muestras]
+    return {
+        "1 palabra": [p[-1] + " " for p in palabras],
+        "2 palabras": [" ".join(p[:2]) + " " for p in palabras],
+        "prefijo 3": [p[-1][:3] for p in palabras],
+        "palabra + prefijo": [f"{p[0]} {p[1][:3]}" for p in palabras],
+    }
+
+
+def percentil(valores: list, p: float) -> float:
+    return sorted(valores)[min(len(valores) - 1, int(len(valores) * p))]
+
+
+def medir(funcion, consultas: list) -> list:
+    tiempos = []
+    for consulta in consultas:
+        inicio = time.perf_counter()
+        funcion(consulta)
+        tiempos.append((time.perf_counter() - inicio) * 1e6)
+    return tiempos
+
+
+def escaneo_ingenuo(libros: list, consulta: str) -> list:
+    terminos = normalizar(consulta).split()
+    return [libro for libro in libros if all(t in normalizar(libro.nombre) for t in terminos)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia de búsqueda por título con índice invertido")
+    parser.add_argument("--libros", type=int, default=1_000_000)
+    parser.add_argument("--vocabulario", type=int, default=50_000)
+    parser.add_argument("--consultas", type=int, default=1_000)
+    parser.add_argument("--escaneos", type=int, default=3, help="consultas medidas con escaneo ingenuo")
+    args = parser.parse_args()
+
+    aleatorio = random.Random(42)
+    libros = generar_libros(args.libros, generar_vocabulario(args.vocabulario, aleatorio), aleatorio)
+
+    indice = IndiceBusqueda()
+    inicio = time.perf_counter()
+    for libro in libros:
+        indice.agregar(libro)
+    print(f"indexados {len(indice)} títulos en {time.perf_counter() - inicio:.1f} s")
+
+    print(f"{'consulta':>18} {'p50 us':>10} {'p99 us':>10} {'media us':>10}")
+    for tipo, consultas in generar_consultas(libros, args.consultas, aleatorio).items():
+        tiempos = medir(indice.buscar, consultas)
+        print(f"{tipo:>18} {percentil(tiempos, 0.5):>10.1f} {percentil(tiempos, 0.99):>10.1f} {statistics.mean(tiempos):>10.1f}")
+
+    if args.escaneos:
+        consultas = generar_consultas(libros, args.escaneos, aleatorio)["2 palabras"]
+        tiempos = medir(lambda consulta: escaneo_ingenuo(libros, consulta), consultas)
+        print(f"{'escaneo ingenuo':>18} {statistics.median(tiempos):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
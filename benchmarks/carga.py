@@ -0,0 +1,343 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime
+from itertools import accumulate, count
+
+from benchmarks.busqueda import generar_vocabulario, percentil
+from models import Autor, Copia, Lector, Libro
+
+MEZCLA = {"copias": 40, "lector": 25, "autor": 10, "buscar": 10, "prestamo": 8, "devolucion": 7}
+DIRECTORIO_RESULTADOS = os.path.join(os.path.dirname(__file__), "resultados")
+MAX_PRESTAMOS = 3
+
+
+class Biblioteca:
+    def __init__(self, libros: int, copias_por_libro: int, lectores: int, zipf: float, semilla: int):
+        self.parametros = {
+            "libros": libros,
+            "copias_por_libro": copias_por_libro,
+            "lectores": lectores,
+            "zipf": zipf,
+            "semilla": semilla
+        }
+        aleatorio = random.Random(semilla)
+        vocabulario = generar_vocabulario(max(100, libros // 20), aleatorio)
+        self.autores = [
+            Autor(nombre=" ".join(aleatorio.choices(vocabulario, k=2)).title(), fecha_nacimiento=date(1950, 1, 1))
+            for _ in range(max(1, libros // 10))
+        ]
+        self.libros = [
+            Libro(
+                nombre=" ".join(aleatorio.choices(vocabulario, k=aleatorio.randint(2, 5))).capitalize(),
+                anio=aleatorio.randint(1950, 2024),
+                autor=self.autores[i % len(self.autores)],
+                id=f"L{i}"
+            )
+            for i in range(libros)
+        ]
+        self.copias_por_libro = copias_por_libro
+        self.lectores = [f"R{i}" for i in range(lectores)]
+        self.pesos_libros = list(accumulate(1 / rango ** zipf for rango in range(1, libros + 1)))
+
+    def cargar(self, service):
+        for libro in self.libros:
+            service.agregar_libro(libro)
+            for j in range(self.copias_por_libro):
+                service.agregar_copia(Copia(id=f"{libro.id}-C{j}", libro=libro))
+        for lector_id in self.lectores:
+            service.agregar_lector(Lector(id=lector_id, nombre=f"Lector {lector_id}", email=f"{lector_id}@example.com"))
+
+
+def generar_peticiones(biblioteca: Biblioteca, cantidad: int, mezcla: dict, semilla: int) -> list:
+    aleatorio = random.Random(semilla)
+    tipos = list(mezcla)
+    pesos_tipos = list(accumulate(mezcla.values()))
+    libros = aleatorio.choices(biblioteca.libros, cum_weights=biblioteca.pesos_libros, k=cantidad)
+    prestadas = set()
+    activos = []
+    por_lector = Counter()
+    peticiones = []
+    for libro, tipo in zip(libros, aleatorio.choices(tipos, cum_weights=pesos_tipos, k=cantidad)):
+        if tipo == "devolucion" and not activos:
+            tipo = "prestamo"
+        if tipo == "copias":
+            peticiones.append(_peticion("GET /libros/{libro_id}/copias", "GET", f"/libros/{libro.id}/copias"))
+        elif tipo == "lector":
+            lector_id = aleatorio.choice(biblioteca.lectores)
+            peticiones.append(_peticion("GET /lectores/{lector_id}", "GET", f"/lectores/{lector_id}"))
+        elif tipo == "autor":
+            ruta = f"/libros/autor/{libro.autor.nombre}"
+            peticiones.append(_peticion("GET /libros/autor/{nombre_autor}", "GET", ruta, {"limite": 20}))
+        elif tipo == "buscar":
+            palabras = libro.nombre.lower().split()
+            consulta = palabras[0] + " " + palabras[-1][:3] if len(palabras) > 1 else palabras[0][:3]
+            peticiones.append(_peticion("GET /libros/buscar", "GET", "/libros/buscar", {"q": consulta}))
+        elif tipo == "prestamo":
+            lector_id = aleatorio.choice(biblioteca.lectores)
+            libres = [
+                j for j in range(biblioteca.copias_por_libro) if f"{libro.id}-C{j}" not in prestadas
+            ]
+            copia_id = f"{libro.id}-C{aleatorio.choice(libres or range(biblioteca.copias_por_libro))}"
+            if libres and por_lector[lector_id] < MAX_PRESTAMOS:
+                prestadas.add(copia_id)
+                activos.append((lector_id, copia_id))
+                por_lector[lector_id] += 1
+            peticiones.append(_peticion(
+                "POST /prestamos/", "POST", "/prestamos/", cuerpo={"lector_id": lector_id, "copia_id": copia_id}
+            ))
+        else:
+            lector_id, copia_id = activos.pop(aleatorio.randrange(len(activos)))
+            prestadas.discard(copia_id)
+            por_lector[lector_id] -= 1
+            peticiones.append(_peticion(
+                "POST /devoluciones/", "POST", "/devoluciones/", cuerpo={"lector_id": lector_id, "copia_id": copia_id}
+            ))
+    return peticiones
+
+
+def _peticion(endpoint: str, metodo: str, ruta: str, parametros: dict = None, cuerpo: dict = None) -> dict:
+    peticion = {"endpoint": endpoint, "metodo": metodo, "ruta": ruta}
+    if parametros:
+        peticion["parametros"] = parametros
+    if cuerpo:
+        peticion["cuerpo"] = cuerpo
+    return peticion
+
+
+def guardar_traza(ruta: str, biblioteca: Biblioteca, peticiones: list):
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        archivo.write(json.dumps({"biblioteca": biblioteca.parametros}) + "\n")
+        for peticion in peticiones:
+            archivo.write(json.dumps(peticion, ensure_ascii=False) + "\n")
+
+
+def leer_traza(ruta: str):
+    parametros = None
+    peticiones = []
+    with open(ruta, encoding="utf-8") as archivo:
+        for linea in archivo:
+            if not linea.strip():
+                continue
+            registro = json.loads(linea)
+            if "biblioteca" in registro:
+                parametros = registro["biblioteca"]
+                continue
+            registro.setdefault("endpoint", f"{registro['metodo']} {registro['ruta']}")
+            peticiones.append(registro)
+    return parametros, peticiones
+
+
+def reproducir(crear_cliente, peticiones: list, clientes: int):
+    siguiente = count()
+    muestras = []
+
+    def trabajar():
+        cliente = crear_cliente()
+        propias = []
+        while True:
+            indice = next(siguiente)
+            if indice >= len(peticiones):
+                break
+            peticion = peticiones[indice]
+            inicio = time.perf_counter()
+            try:
+                estado = cliente.request(
+                    peticion["metodo"],
+                    peticion["ruta"],
+                    params=peticion.get("parametros"),
+                    json=peticion.get("cuerpo")
+                ).status_code
+            except Exception:
+                estado = "excepcion"
+            propias.append((peticion["endpoint"], time.perf_counter() - inicio, estado))
+        cliente.close()
+        muestras.extend(propias)
+
+    hilos = [threading.Thread(target=trabajar) for _ in range(clientes)]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return muestras, time.perf_counter() - inicio
+
+
+def resumir(muestras: list, duracion: float) -> dict:
+    grupos = defaultdict(list)
+    for endpoint, latencia, estado in muestras:
+        grupos[endpoint].append((latencia, estado))
+        grupos["total"].append((latencia, estado))
+    resumen = {}
+    for endpoint, valores in sorted(grupos.items(), key=lambda item: (item[0] == "total", item[0])):
+        latencias = [latencia * 1000 for latencia, _ in valores]
+        resumen[endpoint] = {
+            "peticiones": len(valores),
+            "rps": len(valores) / duracion,
+            "p50_ms": percentil(latencias, 0.50),
+            "p95_ms": percentil(latencias, 0.95),
+            "p99_ms": percentil(latencias, 0.99),
+            "p999_ms": percentil(latencias, 0.999),
+            "estados": dict(Counter(str(estado) for _, estado in valores))
+        }
+    return resumen
+
+
+def imprimir(resumen: dict, anterior: dict = None):
+    encabezado = f"{'endpoint':<34} {'peticiones':>10} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  estados"
+    if anterior:
+        encabezado += f"  {'Δ req/s':>8} {'Δ p99':>8}"
+    print(encabezado)
+    for endpoint, datos in resumen.items():
+        estados = " ".join(f"{estado}:{n}" for estado, n in sorted(datos["estados"].items()))
+        linea = (
+            f"{endpoint:<34} {datos['peticiones']:>10} {datos['rps']:>9.0f} "
+            f"{datos['p50_ms']:>8.2f} {datos['p95_ms']:>8.2f} {datos['p99_ms']:>8.2f}  {estados}"
+        )
+        previo = (anterior or {}).get(endpoint)
+        if previo:
+            linea += f"  {datos['rps'] / previo['rps'] - 1:>+8.1%} {datos['p99_ms'] / previo['p99_ms'] - 1:>+8.1%}"
+        print(linea)
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as conexion:
+        conexion.bind(("127.0.0.1", 0))
+        return conexion.getsockname()[1]
+
+
+def _servir(app, puerto: int):
+    import uvicorn
+    uvicorn.run(app, host="127.0.0.1", port=puerto, log_level="warning")
+
+
+def _esperar_servidor(url: str, segundos: float = 30):
+    import httpx
+    limite = time.monotonic() + segundos
+    while True:
+        try:
+            httpx.get(url + "/")
+            return
+        except httpx.TransportError:
+            if time.monotonic() > limite:
+                raise
+            time.sleep(0.05)
+
+
+def _mezcla(texto: str) -> dict:
+    mezcla = {}
+    for parte in texto.split(","):
+        tipo, _, peso = parte.partition("=")
+        if tipo not in MEZCLA:
+            raise argparse.ArgumentTypeError(f"tipo de petición desconocido: {tipo}")
+        mezcla[tipo] = float(peso)
+    return mezcla
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API con bibliotecas y cargas sintéticas")
+    parser.add_argument("--modo", choices=["proceso", "uvicorn"], default="proceso")
+    parser.add_argument("--libros", type=int, default=10_000)
+    parser.add_argument("--copias-por-libro", type=int, default=3)
+    parser.add_argument("--lectores", type=int, default=5_000)
+    parser.add_argument("--zipf", type=float, default=1.0, help="exponente de popularidad de los títulos")
+    parser.add_argument("--peticiones", type=int, default=20_000)
+    parser.add_argument("--calentamiento", type=int, default=500, help="peticiones iniciales que no se miden")
+    parser.add_argument("--clientes", type=int, default=4, help="hilos que envían peticiones en paralelo")
+    parser.add_argument("--mezcla", type=_mezcla, default=MEZCLA, help="p. ej. copias=40,lector=25,prestamo=10")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--reproducir", help="traza JSONL de peticiones a reproducir en lugar de generarla")
+    parser.add_argument("--grabar", help="guarda la traza generada en este archivo JSONL")
+    parser.add_argument("--salida", help="archivo JSON de resultados (por defecto en benchmarks/resultados/)")
+    parser.add_argument("--comparar", help="resultados JSON de una corrida anterior")
+    args = parser.parse_args()
+
+    parametros = None
+    if args.reproducir:
+        parametros, peticiones = leer_traza(args.reproducir)
+    biblioteca = Biblioteca(**parametros) if parametros else Biblioteca(
+        args.libros, args.copias_por_libro, args.lectores, args.zipf, args.semilla
+    )
+    if not args.reproducir:
+        peticiones = generar_peticiones(biblioteca, args.calentamiento + args.peticiones, args.mezcla, args.semilla)
+    if args.grabar:
+        guardar_traza(args.grabar, biblioteca, peticiones)
+
+    from main import app, biblioteca as service
+    inicio = time.perf_counter()
+    biblioteca.cargar(service)
+    print(f"biblioteca: {biblioteca.parametros} cargada en {time.perf_counter() - inicio:.1f} s")
+
+    proceso = None
+    if args.modo == "uvicorn":
+        import httpx
+        puerto = _puerto_libre()
+        url = f"http://127.0.0.1:{puerto}"
+        proceso = multiprocessing.get_context("fork").Process(target=_servir, args=(app, puerto))
+        proceso.start()
+        _esperar_servidor(url)
+
+        def crear_cliente():
+            return httpx.Client(base_url=url)
+    else:
+        from fastapi.testclient import TestClient
+
+        def crear_cliente():
+            return TestClient(app)
+
+    try:
+        calentamiento = min(args.calentamiento, len(peticiones) // 10) if args.reproducir else args.calentamiento
+        reproducir(crear_cliente, peticiones[:calentamiento], args.clientes)
+        muestras, duracion = reproducir(crear_cliente, peticiones[calentamiento:], args.clientes)
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.join()
+
+    resumen = resumir(muestras, duracion)
+    anterior = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            anterior = json.load(archivo)["endpoints"]
+    print(f"modo: {args.modo}, clientes: {args.clientes}, duración: {duracion:.1f} s")
+    imprimir(resumen, anterior)
+
+    resultado = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "modo": args.modo,
+        "clientes": args.clientes,
+        "biblioteca": biblioteca.parametros,
+        "mezcla": args.mezcla,
+        "traza": args.reproducir,
+        "duracion_s": duracion,
+        "endpoints": resumen
+    }
+    salida = args.salida
+    if salida is None:
+        os.makedirs(DIRECTORIO_RESULTADOS, exist_ok=True)
+        marca = datetime.now().strftime("%Y%m%d-%H%M%S")
+        salida = os.path.join(DIRECTORIO_RESULTADOS, f"carga-{args.modo}-{marca}.json")
+    with open(salida, "w", encoding="utf-8") as archivo:
+        json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+    print(f"resultados guardados en {salida}")
+
+
+if __name__ == "__main__":
+    main()
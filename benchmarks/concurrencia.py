@@ -0,0 +1,81 @@
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from models import Autor, BioAlert, Copia, EstadoCopia, Lector, Libro
+from repositorio import RepositorioMemoria, RepositorioSQLite
+from service import BibliotecaService
+
+COPIAS_POR_HILO = 3
+
+
+def crear_repositorio(backend: str, directorio: str):
+    if backend == "sqlite":
+        return RepositorioSQLite(os.path.join(directorio, "biblioteca.db"))
+    return RepositorioMemoria()
+
+
+def poblar(service: BibliotecaService, hilos: int):
+    autor = Autor(nombre="Autor", fecha_nacimiento=date(1950, 1, 1))
+    libro = service.agregar_libro(Libro(nombre="Libro", anio=2000, autor=autor, id="X"))
+    for hilo in range(hilos):
+        service.agregar_lector(Lector(id=f"L{hilo}", nombre=f"Lector {hilo}", email=f"l{hilo}@example.com"))
+        for i in range(COPIAS_POR_HILO):
+            service.agregar_copia(Copia(id=f"C{hilo}-{i}", libro=libro))
+
+
+def ciclos(service: BibliotecaService, hilo: int, repeticiones: int):
+    lector_id = f"L{hilo}"
+    for r in range(repeticiones):
+        copia_id = f"C{hilo}-{r % COPIAS_POR_HILO}"
+        service.prestar_libro(lector_id, copia_id)
+        service.devolver_libro(lector_id, copia_id)
+
+
+def medir(backend: str, franjas: int, hilos: int, operaciones: int, latencia: float) -> float:
+    BioAlert()._suscripciones = {}
+    with tempfile.TemporaryDirectory() as directorio:
+        repositorio = crear_repositorio(backend, directorio)
+        service = BibliotecaService(repositorio=repositorio, franjas=franjas)
+        poblar(service, hilos)
+        if latencia:
+            actualizar = repositorio.actualizar_estado_copia
+
+            def actualizar_con_latencia(copia, nuevo_estado):
+                time.sleep(latencia)
+                actualizar(copia, nuevo_estado)
+
+            repositorio.actualizar_estado_copia = actualizar_con_latencia
+        repeticiones = operaciones // (2 * hilos)
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=hilos) as pool:
+            list(pool.map(lambda i: ciclos(service, i, repeticiones), range(hilos)))
+        transcurrido = time.perf_counter() - inicio
+        assert service.contar_copias_estado("X", EstadoCopia.PRESTADA) == 0
+        if backend == "sqlite":
+            repositorio.cerrar()
+    return 2 * repeticiones * hilos / transcurrido
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput de préstamos concurrentes: lock global vs franjas")
+    parser.add_argument("--hilos", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--operaciones", type=int, default=20_000)
+    parser.add_argument("--franjas", type=int, default=64)
+    parser.add_argument("--latencia", type=float, default=0.0,
+                        help="segundos de espera simulada por escritura en el repositorio")
+    parser.add_argument("--backend", choices=["memoria", "sqlite"], default="memoria")
+    args = parser.parse_args()
+
+    print(f"{'hilos':>6} {'global ops/s':>14} {'franjas ops/s':>14}")
+    for hilos in args.hilos:
+        global_ = medir(args.backend, 1, hilos, args.operaciones, args.latencia)
+        franjas = medir(args.backend, args.franjas, hilos, args.operaciones, args.latencia)
+        print(f"{hilos:>6} {global_:>14.0f} {franjas:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import argparse
+import base64
+import random
+import time
+from array import array
+from datetime import date, datetime, timedelta
+
+from historial import HistorialPrestamos
+from models import Autor, Copia, Libro, Prestamo
+
+INICIO = datetime(2015, 1, 1)
+PERIODOS = {
+    "1 día": timedelta(days=1),
+    "1 mes": timedelta(days=30),
+    "1 año": timedelta(days=365),
+    "todo": None,
+}
+
+
+def generar_exportacion(prestamos: int, libros: int, anios: int, semilla: int) -> dict:
+    aleatorio = random.Random(semilla)
+    inicio = int(INICIO.timestamp())
+    paso = anios * 365 * 86400 / prestamos
+    pesos = [1 / (rango + 1) for rango in range(libros)]
+    codigos_libro = array("I", aleatorio.choices(range(libros), weights=pesos, k=prestamos))
+    devoluciones = array("q", (inicio + int(i * paso) for i in range(prestamos)))
+    columnas = {
+        "libros": codigos_libro,
+        "autores": array("I", (codigo // 10 for codigo in codigos_libro)),
+        "lectores": array("I", (i % 100_000 for i in range(prestamos))),
+        "fechas_prestamo": array("q", (fecha - 14 * 86400 for fecha in devoluciones)),
+        "fechas_devolucion": devoluciones,
+        "dias_retraso": array("I", bytes(4 * prestamos)),
+    }
+    return {
+        "libros": [f"L{i}" for i in range(libros)],
+        "autores": [f"Autor {i}" for i in range(libros // 10 + 1)],
+        "lectores": [f"R{i}" for i in range(100_000)],
+        "columnas": {nombre: base64.b64encode(columna.tobytes()).decode() for nombre, columna in columnas.items()},
+    }
+
+
+def medir_consultas(historial: HistorialPrestamos, anios: int, consultas: int, semilla: int):
+    aleatorio = random.Random(semilla)
+    print(f"{'consulta':<22} {'primera (ms)':>13} {'repetida (ms)':>14}")
+    for nombre, duracion in PERIODOS.items():
+        if duracion is None:
+            periodos = [(INICIO - timedelta(seconds=aleatorio.randrange(86400)), None) for _ in range(consultas)]
+        else:
+            maximo = int(anios * 365 * 86400 - duracion.total_seconds())
+            inicios = [INICIO + timedelta(seconds=aleatorio.randrange(maximo)) for _ in range(consultas)]
+            periodos = [(desde, desde + duracion) for desde in inicios]
+        tiempos = []
+        for _ in range(2):
+            inicio = time.perf_counter()
+            for desde, hasta in periodos:
+                historial.mas_prestados(10, desde, hasta)
+            tiempos.append((time.perf_counter() - inicio) / consultas * 1e3)
+        print(f"{'top-10 ' + nombre:<22} {tiempos[0]:>13.2f} {tiempos[1]:>14.2f}")
+
+
+def medir_registros(historial: HistorialPrestamos, cantidad: int, anios: int, semilla: int):
+    aleatorio = random.Random(semilla)
+    autor = Autor(nombre="Autor 0", fecha_nacimiento=date(1950, 1, 1))
+    libro = Libro(nombre="L0", anio=2000, autor=autor, id="L0")
+    fin = INICIO + timedelta(days=anios * 365)
+    for nombre, desplazamiento in (("en orden", lambda: timedelta(0)),
+                                   ("desordenado", lambda: -timedelta(days=aleatorio.randrange(anios * 365)))):
+        prestamos = []
+        for i in range(cantidad):
+            prestamo = Prestamo(Copia(id="C", libro=libro), INICIO, INICIO)
+            prestamo.fecha_devolucion_real = fin + timedelta(seconds=i) + desplazamiento()
+            prestamos.append(prestamo)
+        inicio = time.perf_counter()
+        for prestamo in prestamos:
+            historial.registrar(prestamo, "R0", 0)
+        print(f"{'registrar ' + nombre:<22} {(time.perf_counter() - inicio) / cantidad * 1e6:>13.2f} µs/préstamo")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Costo del historial de préstamos a escala de producción")
+    parser.add_argument("--prestamos", type=int, default=10_000_000)
+    parser.add_argument("--libros", type=int, default=50_000)
+    parser.add_argument("--anios", type=int, default=10)
+    parser.add_argument("--consultas", type=int, default=20)
+    parser.add_argument("--registros", type=int, default=20_000)
+    parser.add_argument("--semilla", type=int, default=1)
+    args = parser.parse_args()
+
+    datos = generar_exportacion(args.prestamos, args.libros, args.anios, args.semilla)
+    historial = HistorialPrestamos()
+    inicio = time.perf_counter()
+    historial.importar(datos)
+    del datos
+    print(f"{args.prestamos:,} préstamos de {args.libros:,} libros en {args.anios} años; "
+          f"importar: {time.perf_counter() - inicio:.1f} s")
+    medir_consultas(historial, args.anios, args.consultas, args.semilla)
+    medir_registros(historial, args.registros, args.anios, args.semilla)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import argparse
+import json
+import tempfile
+import time
+
+from importacion import ImportadorNDJSON
+from service import BibliotecaService
+
+
+def generar_lineas(copias: int, copias_por_libro: int):
+    for i in range(0, copias, copias_por_libro):
+        libro_id = f"X{i // copias_por_libro}"
+        yield json.dumps({
+            "tipo": "libro", "id": libro_id, "nombre": f"Libro {libro_id}", "anio": 2000,
+            "autor_nombre": f"Autor {i % 1000}", "autor_fecha_nacimiento": "1950-01-01"
+        }).encode()
+        for j in range(i, min(i + copias_por_libro, copias)):
+            yield json.dumps({"tipo": "copia", "id": f"C{j}", "libro_id": libro_id}).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Velocidad de importación NDJSON")
+    parser.add_argument("--copias", type=int, default=1_000_000)
+    parser.add_argument("--copias-por-libro", type=int, default=10)
+    parser.add_argument("--tam-lote", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryFile() as archivo:
+        for linea in generar_lineas(args.copias, args.copias_por_libro):
+            archivo.write(linea + b"\n")
+        archivo.seek(0)
+
+        importador = ImportadorNDJSON(BibliotecaService(), tam_lote=args.tam_lote)
+        inicio = time.perf_counter()
+        resultado = importador.importar(archivo)
+        transcurrido = time.perf_counter() - inicio
+
+    print(f"importadas: {resultado['importadas']}, errores: {resultado['cantidad_errores']}")
+    print(f"{transcurrido:.1f} s ({resultado['procesadas'] / transcurrido:,.0f} registros/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import argparse
+import gc
+import tracemalloc
+from datetime import date
+from typing import Optional
+
+from pydantic import BaseModel
+
+from models import Autor, Libro, Copia, EstadoCopia
+
+COPIAS_POR_LIBRO = 10
+
+
+class AutorPydantic(BaseModel):
+    nombre: str
+    fecha_nacimiento: date
+
+
+class LibroPydantic(BaseModel):
+    nombre: str
+    anio: int
+    autor: AutorPydantic
+    id: Optional[str] = None
+
+
+class CopiaPydantic(BaseModel):
+    id: str
+    libro: LibroPydantic
+    estado: EstadoCopia = EstadoCopia.DISPONIBLE
+
+
+MODELOS = {
+    "pydantic": (AutorPydantic, LibroPydantic, CopiaPydantic),
+    "slots": (Autor, Libro, Copia),
+}
+
+
+def construir(modelos, cantidad_copias: int) -> dict:
+    clase_autor, clase_libro, clase_copia = modelos
+    autor = clase_autor(nombre="Autor", fecha_nacimiento=date(1950, 1, 1))
+    copias = {}
+    libro = None
+    for i in range(cantidad_copias):
+        if i % COPIAS_POR_LIBRO == 0:
+            libro = clase_libro(nombre=f"Libro {i}", anio=2000, autor=autor, id=f"L{i}")
+        copia_id = f"C{i}"
+        copias[copia_id] = clase_copia(id=copia_id, libro=libro)
+    return copias
+
+
+def medir(modelos, cantidad_copias: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    copias = construir(modelos, cantidad_copias)
+    actual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del copias
+    gc.collect()
+    return actual / cantidad_copias
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes por copia almacenada: modelos Pydantic vs dataclasses con slots")
+    parser.add_argument("--copias", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--modelos", nargs="+", choices=sorted(MODELOS), default=["pydantic", "slots"])
+    args = parser.parse_args()
+
+    print(f"{'copias':>12} {'modelo':>10} {'bytes/copia':>12}")
+    for cantidad in args.copias:
+        for nombre in args.modelos:
+            print(f"{cantidad:>12} {nombre:>10} {medir(MODELOS[nombre], cantidad):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import argparse
+import asyncio
+import time
+from datetime import date
+
+from metricas import MetricasBiblioteca, MetricasHTTP, MiddlewareMetricas
+from models import Autor, BioAlert, Copia, Lector, Libro
+from service import BibliotecaService
+
+
+class Ruta:
+    def __init__(self, path: str):
+        self.path = path
+
+
+class MetricasNulas(MetricasBiblioteca):
+    def prestamo(self, estado_anterior=None):
+        pass
+
+    def devolucion(self, estado_anterior, nuevo_estado=None):
+        pass
+
+    def copia(self, anterior, nuevo):
+        pass
+
+    def suspension(self, anterior, nueva):
+        pass
+
+
+async def aplicacion(scope, receive, send):
+    scope["route"] = Ruta("/libros/{libro_id}/copias")
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def recibir():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def enviar(mensaje):
+    pass
+
+
+async def _peticiones(app, cantidad: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(cantidad):
+        await app({"type": "http", "method": "GET", "path": "/libros/X/copias"}, recibir, enviar)
+    return time.perf_counter() - inicio
+
+
+def medir_middleware(cantidad: int) -> tuple:
+    sin = min(asyncio.run(_peticiones(aplicacion, cantidad)) for _ in range(3))
+    con = min(asyncio.run(_peticiones(MiddlewareMetricas(aplicacion, MetricasHTTP()), cantidad)) for _ in range(3))
+    return sin / cantidad * 1e6, con / cantidad * 1e6
+
+
+def _ciclos(service: BibliotecaService, cantidad: int) -> float:
+    inicio = time.perf_counter()
+    for _ in range(cantidad):
+        service.prestar_libro("R", "C")
+        service.devolver_libro("R", "C")
+    return time.perf_counter() - inicio
+
+
+def medir_dominio(cantidad: int) -> tuple:
+    tiempos = []
+    for metricas in (MetricasNulas(), MetricasBiblioteca()):
+        BioAlert()._suscripciones = {}
+        service = BibliotecaService()
+        autor = Autor(nombre="Autor", fecha_nacimiento=date(1950, 1, 1))
+        service.agregar_copia(Copia(id="C", libro=Libro(nombre="Libro", anio=2000, autor=autor, id="X")))
+        service.agregar_lector(Lector(id="R", nombre="Lector", email="r@example.com"))
+        service.metricas = metricas
+        tiempos.append(min(_ciclos(service, cantidad) for _ in range(3)) / (2 * cantidad) * 1e6)
+    return tuple(tiempos)
+
+
+def medir_exposicion(rutas: int) -> float:
+    metricas = MetricasHTTP()
+    for i in range(rutas):
+        for estado in (200, 400, 404):
+            metricas.observar("GET", f"/ruta/{i}", estado, 0.001 * i)
+    dominio = MetricasBiblioteca()
+    inicio = time.perf_counter()
+    for _ in range(100):
+        "\n".join(metricas.exponer() + dominio.exponer())
+    return (time.perf_counter() - inicio) / 100 * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Costo de la instrumentación de métricas por petición")
+    parser.add_argument("--peticiones", type=int, default=200_000)
+    parser.add_argument("--operaciones", type=int, default=50_000)
+    parser.add_argument("--rutas", type=int, default=20)
+    args = parser.parse_args()
+
+    sin, con = medir_middleware(args.peticiones)
+    print(f"{'medición':<34} {'sin métricas':>13} {'con métricas':>13} {'costo':>9}")
+    print(f"{'middleware ASGI (µs/petición)':<34} {sin:>13.2f} {con:>13.2f} {con - sin:>9.2f}")
+    sin, con = medir_dominio(args.operaciones)
+    print(f"{'préstamo/devolución (µs/op)':<34} {sin:>13.2f} {con:>13.2f} {con - sin:>9.2f}")
+    print(f"\nexposición de /metrics con {args.rutas} rutas: {medir_exposicion(args.rutas):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+from models import Autor, BioAlert, Copia, Lector, Libro
+from persistencia import EVENTOS_POR_INSTANTANEA, RegistroEventos, cargar_biblioteca
+from service import BibliotecaService
+
+
+def poblar(service: BibliotecaService, lectores: int):
+    autor = Autor(nombre="Autor", fecha_nacimiento=date(1950, 1, 1))
+    libro = service.agregar_libro(Libro(nombre="Libro", anio=2000, autor=autor, id="X"))
+    for i in range(lectores):
+        service.agregar_copia(Copia(id=f"C{i}", libro=libro))
+        service.agregar_lector(Lector(id=f"L{i}", nombre=f"Lector {i}", email=f"l{i}@example.com"))
+
+
+def ciclos(service: BibliotecaService, lector: int, repeticiones: int):
+    for _ in range(repeticiones):
+        service.prestar_libro(f"L{lector}", f"C{lector}")
+        service.devolver_libro(f"L{lector}", f"C{lector}")
+
+
+def medir_escrituras(crear_registro, hilos: int, operaciones: int, rondas: int = 3) -> float:
+    mejor = 0.0
+    for _ in range(rondas):
+        BioAlert()._suscripciones = {}
+        registro = crear_registro()
+        service = BibliotecaService(registro=registro)
+        poblar(service, hilos)
+        repeticiones = operaciones // (2 * hilos)
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=hilos) as pool:
+            list(pool.map(lambda i: ciclos(service, i, repeticiones), range(hilos)))
+        transcurrido = time.perf_counter() - inicio
+        if registro is not None:
+            registro.cerrar()
+        mejor = max(mejor, 2 * repeticiones * hilos / transcurrido)
+    return mejor
+
+
+def generar_registro(directorio: str, eventos: int):
+    lectores = max(1, eventos // 1000)
+    inicio = datetime(2024, 1, 1)
+    with open(os.path.join(directorio, "eventos-00000000000000000001.log"), "w") as archivo:
+        seq = 0
+
+        def escribir(evento):
+            nonlocal seq
+            seq += 1
+            archivo.write(json.dumps({"seq": seq, **evento}, separators=(",", ":")) + "\n")
+
+        for i in range(lectores):
+            escribir({"tipo": "libro", "id": f"X{i}", "nombre": f"Libro {i}", "anio": 2000,
+                      "autor_nombre": f"Autor {i % 100}", "autor_fecha_nacimiento": "1950-01-01"})
+            escribir({"tipo": "copia", "id": f"C{i}", "libro_id": f"X{i}", "estado": "disponible"})
+            escribir({"tipo": "lector", "id": f"L{i}", "nombre": f"Lector {i}", "email": f"l{i}@example.com",
+                      "dias_suspension": 0, "fecha_fin_suspension": None})
+        i = 0
+        while seq < eventos - 1:
+            lector = i % lectores
+            fecha = (inicio + timedelta(minutes=i)).isoformat()
+            escribir({"tipo": "prestamo", "lector_id": f"L{lector}", "copia_id": f"C{lector}", "fecha": fecha})
+            escribir({"tipo": "devolucion", "lector_id": f"L{lector}", "copia_id": f"C{lector}", "fecha": fecha})
+            i += 1
+
+
+def medir_replay(eventos: int):
+    with tempfile.TemporaryDirectory() as directorio:
+        generar_registro(directorio, eventos)
+        BioAlert()._suscripciones = {}
+        inicio = time.perf_counter()
+        service = cargar_biblioteca(directorio)
+        transcurrido = time.perf_counter() - inicio
+        service.registro.cerrar()
+    return transcurrido
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coste del registro de eventos y velocidad de reproducción")
+    parser.add_argument("--operaciones", type=int, default=100_000)
+    parser.add_argument("--hilos", type=int, default=8)
+    parser.add_argument("--eventos", type=int, default=10_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        base = medir_escrituras(lambda: None, args.hilos, args.operaciones)
+        print(f"sin registro:        {base:>10.0f} ops/s")
+        asincrono = medir_escrituras(
+            lambda: RegistroEventos(tempfile.mkdtemp(dir=directorio)), args.hilos, args.operaciones
+        )
+        print(f"registro por lotes:  {asincrono:>10.0f} ops/s ({1e6 / asincrono - 1e6 / base:+.1f} us/op)")
+        durable = medir_escrituras(
+            lambda: RegistroEventos(tempfile.mkdtemp(dir=directorio), durable=True),
+            args.hilos, args.operaciones // 10
+        )
+        print(f"registro durable:    {durable:>10.0f} ops/s ({1e6 / durable - 1e6 / base:+.1f} us/op)")
+
+    transcurrido = medir_replay(args.eventos)
+    velocidad = args.eventos / transcurrido
+    print(f"reproducción de {args.eventos} eventos: {transcurrido:.1f} s ({velocidad:,.0f} eventos/s)")
+    print(f"cola máxima tras una instantánea cada {EVENTOS_POR_INSTANTANEA:,} eventos: "
+          f"{EVENTOS_POR_INSTANTANEA / velocidad:.1f} s de reproducción")
+
+if __name__ == "__main__":
+    main()
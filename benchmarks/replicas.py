@@ -0,0 +1,83 @@
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from datetime import date
+
+from models import Autor, Copia, Libro
+from service import BibliotecaService
+from servidor_estado import ReplicaBiblioteca, ServidorEstado
+
+CLAVE = b"benchmark"
+AUTORES = 100
+
+
+def servir(direccion: str, libros: int, listo, detener):
+    service = BibliotecaService()
+    autores = [Autor(nombre=f"Autor {i}", fecha_nacimiento=date(1950, 1, 1)) for i in range(AUTORES)]
+    for i in range(libros):
+        libro = service.agregar_libro(Libro(nombre=f"Libro {i}", anio=2000, autor=autores[i % AUTORES], id=f"L{i}"))
+        service.agregar_copia(Copia(id=f"C{i}", libro=libro))
+    servidor = ServidorEstado(service, direccion, CLAVE).iniciar()
+    listo.set()
+    detener.wait()
+    servidor.cerrar()
+
+
+def leer(direccion: str, libros: int, segundos: float, barrera, resultados):
+    replica = ReplicaBiblioteca(direccion, CLAVE)
+    barrera.wait()
+    lecturas = 0
+    fin = time.perf_counter() + segundos
+    while time.perf_counter() < fin:
+        for i in range(100):
+            replica.obtener_libros_por_autor(f"autor {i}")
+            replica.contar_copias_libro(f"L{(lecturas + i) % libros}")
+        lecturas += 200
+    resultados.put(lecturas)
+    replica.cerrar()
+
+
+def medir(contexto, direccion: str, workers: int, libros: int, segundos: float) -> float:
+    barrera = contexto.Barrier(workers)
+    resultados = contexto.Queue()
+    procesos = [
+        contexto.Process(target=leer, args=(direccion, libros, segundos, barrera, resultados))
+        for _ in range(workers)
+    ]
+    for proceso in procesos:
+        proceso.start()
+    total = sum(resultados.get() for _ in procesos)
+    for proceso in procesos:
+        proceso.join()
+    return total / segundos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Escalado de lecturas locales con réplicas en varios procesos")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--libros", type=int, default=10_000)
+    parser.add_argument("--segundos", type=float, default=3.0)
+    args = parser.parse_args()
+
+    contexto = multiprocessing.get_context("fork")
+    with tempfile.TemporaryDirectory() as directorio:
+        direccion = os.path.join(directorio, "estado.sock")
+        listo, detener = contexto.Event(), contexto.Event()
+        dueno = contexto.Process(target=servir, args=(direccion, args.libros, listo, detener))
+        dueno.start()
+        listo.wait()
+        print(f"núcleos disponibles: {len(os.sched_getaffinity(0))}")
+        print(f"{'workers':>8} {'lecturas/s':>14} {'escalado':>9}")
+        base = None
+        for workers in args.workers:
+            lecturas = medir(contexto, direccion, workers, args.libros, args.segundos)
+            base = base or lecturas
+            print(f"{workers:>8} {lecturas:>14.0f} {lecturas / base:>8.2f}x")
+        detener.set()
+        dueno.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import argparse
+import gc
+import json
+import math
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date
+
+from models import Autor, BioAlert, Copia, Lector, Libro
+from service import BibliotecaService
+
+COPIAS_POR_LIBRO = 3
+LIBROS_POR_AUTOR = 10
+LECTORES_POR_COPIA = 0.1
+SUSCRIPTORES_POR_LIBRO = 5
+METODOS = [
+    "prestar_libro",
+    "devolver_libro",
+    "obtener_copias_disponibles",
+    "obtener_libros_por_autor",
+    "notificar_disponibilidad",
+]
+MODELOS = {
+    "O(1)": lambda n: 1.0,
+    "O(log n)": lambda n: math.log(n),
+    "O(n)": lambda n: float(n),
+    "O(n log n)": lambda n: n * math.log(n),
+}
+
+
+def memoria_residente() -> int:
+    with open("/proc/self/statm") as archivo:
+        return int(archivo.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def construir(copias: int) -> BibliotecaService:
+    service = BibliotecaService()
+    libros = max(1, copias // COPIAS_POR_LIBRO)
+    autores = [
+        Autor(nombre=f"Autor {i}", fecha_nacimiento=date(1950, 1, 1))
+        for i in range(max(1, libros // LIBROS_POR_AUTOR))
+    ]
+    for i in range(libros):
+        libro = service.agregar_libro(Libro(nombre=f"Libro {i}", anio=2000, autor=autores[i % len(autores)], id=f"B{i}"))
+        for j in range(COPIAS_POR_LIBRO):
+            service.agregar_copia(Copia(id=f"B{i}-C{j}", libro=libro))
+    for i in range(max(1, int(copias * LECTORES_POR_COPIA))):
+        service.agregar_lector(Lector(id=f"R{i}", nombre=f"Lector {i}", email=f"r{i}@example.com"))
+    return service
+
+
+def cronometrar(funcion, argumentos: list) -> list:
+    tiempos = []
+    for args in argumentos:
+        inicio = time.perf_counter()
+        funcion(*args)
+        tiempos.append((time.perf_counter() - inicio) * 1e6)
+    return tiempos
+
+
+def medir_tamanio(copias: int, muestras: int, semilla: int) -> dict:
+    BioAlert()._suscripciones = {}
+    aleatorio = random.Random(semilla)
+    gc.collect()
+    antes = memoria_residente()
+    inicio = time.perf_counter()
+    gc.disable()
+    try:
+        service = construir(copias)
+    finally:
+        gc.enable()
+    construccion = time.perf_counter() - inicio
+    gc.collect()
+    memoria = memoria_residente() - antes
+
+    libros = max(1, copias // COPIAS_POR_LIBRO)
+    lectores = max(1, int(copias * LECTORES_POR_COPIA))
+    autores = max(1, libros // LIBROS_POR_AUTOR)
+    muestras = min(muestras, libros, lectores)
+    libros_muestra = [f"B{i}" for i in aleatorio.sample(range(libros), muestras)]
+    pares = [(f"R{i}", f"{libro_id}-C0") for i, libro_id in zip(aleatorio.sample(range(lectores), muestras), libros_muestra)]
+
+    bio_alert = service.bio_alert
+    for libro_id in libros_muestra:
+        for lector_id in aleatorio.sample(range(lectores), min(lectores, SUSCRIPTORES_POR_LIBRO)):
+            bio_alert.suscribir(service.lectores[f"R{lector_id}"], libro_id)
+
+    tiempos = {
+        "prestar_libro": cronometrar(service.prestar_libro, pares),
+        "devolver_libro": cronometrar(service.devolver_libro, pares),
+        "obtener_copias_disponibles": cronometrar(service.obtener_copias_disponibles, [(l,) for l in libros_muestra]),
+        "obtener_libros_por_autor": cronometrar(
+            service.obtener_libros_por_autor,
+            [(f"Autor {aleatorio.randrange(autores)}",) for _ in range(muestras)]
+        ),
+    }
+    for libro_id in libros_muestra:
+        for lector_id in aleatorio.sample(range(lectores), min(lectores, SUSCRIPTORES_POR_LIBRO)):
+            bio_alert.suscribir(service.lectores[f"R{lector_id}"], libro_id)
+    tiempos["notificar_disponibilidad"] = cronometrar(bio_alert.notificar_disponibilidad, [(l,) for l in libros_muestra])
+
+    return {
+        "copias": copias,
+        "construccion_s": construccion,
+        "memoria_bytes": memoria,
+        "mediana_us": {metodo: statistics.median(valores) for metodo, valores in tiempos.items()},
+        "p99_us": {metodo: sorted(valores)[int(len(valores) * 0.99)] for metodo, valores in tiempos.items()},
+    }
+
+
+def _medir_en_proceso(copias: int, muestras: int, semilla: int, cola):
+    cola.put(medir_tamanio(copias, muestras, semilla))
+
+
+def ajustar(tamanios: list, valores: list) -> tuple:
+    x = [math.log(n) for n in tamanios]
+    y = [math.log(max(v, 1e-9)) for v in valores]
+    media_x, media_y = statistics.fmean(x), statistics.fmean(y)
+    varianza = sum((xi - media_x) ** 2 for xi in x)
+    pendiente = sum((xi - media_x) * (yi - media_y) for xi, yi in zip(x, y)) / varianza if varianza else 0.0
+    mejor, menor_error = None, math.inf
+    for nombre, modelo in MODELOS.items():
+        residuos = [yi - math.log(modelo(n)) for n, yi in zip(tamanios, y)]
+        desplazamiento = statistics.fmean(residuos)
+        error = sum((r - desplazamiento) ** 2 for r in residuos)
+        if error < menor_error:
+            mejor, menor_error = nombre, error
+    return pendiente, mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks de los métodos calientes de BibliotecaService")
+    parser.add_argument(
+        "--tamanios", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000],
+        help="cantidades de copias del catálogo; 10_000_000 requiere unos 9 GB de RAM"
+    )
+    parser.add_argument("--muestras", type=int, default=2_000, help="llamadas medidas por método y tamaño")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--max-pendiente", type=float, help="falla si la pendiente log-log de algún método la supera")
+    parser.add_argument("--salida", help="guarda las mediciones en este archivo JSON")
+    args = parser.parse_args()
+
+    contexto = multiprocessing.get_context("fork")
+    resultados = []
+    print(f"{'copias':>10} {'construcción':>13} {'memoria MB':>11} {'B/copia':>8} " + " ".join(f"{m[:14]:>14}" for m in METODOS))
+    for copias in args.tamanios:
+        cola = contexto.Queue()
+        proceso = contexto.Process(target=_medir_en_proceso, args=(copias, args.muestras, args.semilla, cola))
+        proceso.start()
+        resultado = cola.get()
+        proceso.join()
+        resultados.append(resultado)
+        print(
+            f"{copias:>10} {resultado['construccion_s']:>12.1f}s {resultado['memoria_bytes'] / 2**20:>11.1f} "
+            f"{resultado['memoria_bytes'] / copias:>8.0f} "
+            + " ".join(f"{resultado['mediana_us'][m]:>12.2f}µs" for m in METODOS)
+        )
+
+    tamanios = [r["copias"] for r in resultados]
+    excedidos = []
+    if len(tamanios) > 1:
+        print(f"\n{'método':<28} {'pendiente':>10} {'ajuste':>11}")
+        for metodo in METODOS:
+            pendiente, modelo = ajustar(tamanios, [r["mediana_us"][metodo] for r in resultados])
+            print(f"{metodo:<28} {pendiente:>10.2f} {modelo:>11}")
+            if args.max_pendiente is not None and pendiente > args.max_pendiente:
+                excedidos.append(metodo)
+        pendiente, modelo = ajustar(tamanios, [max(1, r["memoria_bytes"]) for r in resultados])
+        print(f"{'memoria':<28} {pendiente:>10.2f} {modelo:>11}")
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump(resultados, archivo, indent=2)
+    if excedidos:
+        print(f"\npendiente mayor a {args.max_pendiente}: {', '.join(excedidos)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import argparse
+import heapq
+import random
+import time
+from datetime import date, datetime, timedelta
+from itertools import accumulate
+
+from benchmarks.servicio import memoria_residente
+from models import Autor, BioAlert, Copia, EstadoCopia, Lector, Libro
+from reloj import RelojVirtual
+from service import BibliotecaService
+
+PASO = timedelta(hours=1)
+DIAS_POR_MES = 30
+
+
+class Simulacion:
+    def __init__(self, args):
+        self.args = args
+        self.aleatorio = random.Random(args.semilla)
+        self.reloj = RelojVirtual(datetime(2024, 1, 1, 9, 0))
+        BioAlert()._suscripciones = {}
+        self.service = BibliotecaService(reloj=self.reloj)
+        self.autores = [
+            Autor(nombre=f"Autor {i}", fecha_nacimiento=date(1950, 1, 1)) for i in range(max(1, args.libros // 10))
+        ]
+        self.libros = []
+        self.lectores = []
+        self.devoluciones = []
+        self.operaciones = 0
+        self.rechazos = 0
+        self.suscripciones = 0
+        for _ in range(args.libros):
+            self.agregar_libro()
+        for _ in range(args.lectores):
+            self.agregar_lector()
+        self.service.activar_temporizador()
+
+    def agregar_libro(self):
+        indice = len(self.libros)
+        libro = self.service.agregar_libro(Libro(
+            nombre=f"Libro {indice}", anio=2000, autor=self.autores[indice % len(self.autores)], id=f"B{indice}"
+        ))
+        for j in range(self.args.copias_por_libro):
+            self.service.agregar_copia(Copia(id=f"B{indice}-C{j}", libro=libro))
+        self.libros.append(libro.id)
+        self.pesos = None
+
+    def agregar_lector(self):
+        lector_id = f"R{len(self.lectores)}"
+        self.service.agregar_lector(Lector(id=lector_id, nombre=f"Lector {lector_id}", email=f"{lector_id}@example.com"))
+        self.lectores.append(lector_id)
+
+    def elegir_libro(self) -> str:
+        if self.pesos is None:
+            self.pesos = list(accumulate(1 / rango ** self.args.zipf for rango in range(1, len(self.libros) + 1)))
+        return self.aleatorio.choices(self.libros, cum_weights=self.pesos)[0]
+
+    def prestar(self):
+        libro_id = self.elegir_libro()
+        lector_id = self.aleatorio.choice(self.lectores)
+        disponibles = self.service.obtener_copias_disponibles(libro_id)
+        self.operaciones += 1
+        if not disponibles:
+            if self.aleatorio.random() < self.args.suscripcion:
+                self.suscripciones += self.service.suscribir_lector(lector_id, libro_id)
+            return
+        copia_id = disponibles[0].id
+        try:
+            prestamo = self.service.prestar_libro(lector_id, copia_id)
+        except ValueError:
+            self.rechazos += 1
+            return
+        if self.aleatorio.random() < self.args.retraso:
+            dias = self.aleatorio.uniform(31, 60)
+        else:
+            dias = self.aleatorio.uniform(3, 30)
+        heapq.heappush(self.devoluciones, (prestamo.fecha_prestamo + timedelta(days=dias), lector_id, copia_id))
+
+    def paso(self):
+        ahora = self.reloj.avanzar(PASO)
+        self.service.procesar_temporizadores()
+        while self.devoluciones and self.devoluciones[0][0] <= ahora:
+            _, lector_id, copia_id = heapq.heappop(self.devoluciones)
+            self.service.devolver_libro(lector_id, copia_id)
+            self.operaciones += 1
+        prestamos_por_paso = self.args.prestamos_por_dia * PASO / timedelta(days=1)
+        cantidad = int(prestamos_por_paso) + (self.aleatorio.random() < prestamos_por_paso % 1)
+        for _ in range(cantidad):
+            self.prestar()
+        if ahora.hour == 0:
+            for _ in range(self.args.lectores_por_dia):
+                self.agregar_lector()
+            for _ in range(self.args.libros_por_dia):
+                self.agregar_libro()
+
+    def estado(self) -> dict:
+        metricas = self.service.metricas
+        return {
+            "prestamos_activos": metricas.prestamos_activos,
+            "con_retraso": metricas.copias[EstadoCopia.CON_RETRASO],
+            "suspendidos": metricas.lectores_suspendidos(self.reloj.hoy()),
+            "suscripciones": len(self.service.bio_alert.todas_las_suscripciones()),
+            "lectores": len(self.lectores),
+            "copias": len(self.libros) * self.args.copias_por_libro,
+            "memoria_mb": memoria_residente() / 2 ** 20,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulación acelerada de circulación con reloj virtual")
+    parser.add_argument("--meses", type=int, default=12)
+    parser.add_argument("--libros", type=int, default=20_000)
+    parser.add_argument("--copias-por-libro", type=int, default=2)
+    parser.add_argument("--lectores", type=int, default=10_000)
+    parser.add_argument("--prestamos-por-dia", type=float, default=3_000)
+    parser.add_argument("--lectores-por-dia", type=int, default=20)
+    parser.add_argument("--libros-por-dia", type=int, default=10)
+    parser.add_argument("--retraso", type=float, default=0.15, help="fracción de devoluciones fuera de plazo")
+    parser.add_argument("--suscripcion", type=float, default=0.3, help="probabilidad de suscribirse si no hay copias")
+    parser.add_argument("--zipf", type=float, default=1.0)
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    simulacion = Simulacion(args)
+    print(f"población inicial en {time.perf_counter() - inicio:.1f} s")
+    print(
+        f"{'mes':>3} {'fecha':>10} {'operaciones':>11} {'ops/s':>8} {'activos':>8} {'retraso':>8} "
+        f"{'suspend.':>8} {'suscrip.':>8} {'lectores':>8} {'copias':>8} {'memoria MB':>10}"
+    )
+    pasos_por_mes = int(timedelta(days=DIAS_POR_MES) / PASO)
+    total = time.perf_counter()
+    for mes in range(1, args.meses + 1):
+        operaciones = simulacion.operaciones
+        inicio = time.perf_counter()
+        for _ in range(pasos_por_mes):
+            simulacion.paso()
+        transcurrido = time.perf_counter() - inicio
+        hechas = simulacion.operaciones - operaciones
+        estado = simulacion.estado()
+        print(
+            f"{mes:>3} {simulacion.reloj.hoy().isoformat():>10} {hechas:>11} {hechas / transcurrido:>8.0f} "
+            f"{estado['prestamos_activos']:>8} {estado['con_retraso']:>8} {estado['suspendidos']:>8} "
+            f"{estado['suscripciones']:>8} {estado['lectores']:>8} {estado['copias']:>8} {estado['memoria_mb']:>10.1f}"
+        )
+    transcurrido = time.perf_counter() - total
+    print(
+        f"\n{args.meses} meses simulados en {transcurrido:.1f} s "
+        f"({args.meses * DIAS_POR_MES * 86_400 / transcurrido:,.0f}x tiempo real), "
+        f"{simulacion.operaciones} operaciones, {simulacion.rechazos} rechazos"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from functools import partial
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple
+
+from models import Libro
+
+PESO_TITULO = 2.0
+PESO_AUTOR = 1.0
+FACTOR_PREFIJO = 0.5
+MAX_EXPANSIONES = 64
+DIVISOR_PRESUPUESTO = 4
+
+_PALABRA = re.compile(r"\w+")
+
+Capas = Dict[float, Dict[str, None]]
+Expansion = List[Tuple[Capas, float]]
+
+
+def normalizar(texto: str) -> str:
+    if texto.isascii():
+        return texto.casefold()
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in descompuesto if not unicodedata.combining(c)).casefold()
+
+
+def tokenizar(texto: str) -> List[str]:
+    return _PALABRA.findall(normalizar(texto))
+
+
+def _pesos(libro: Libro) -> Dict[str, float]:
+    pesos: Dict[str, float] = {}
+    for token in tokenizar(libro.nombre):
+        pesos[token] = pesos.get(token, 0.0) + PESO_TITULO
+    for token in tokenizar(libro.autor.nombre):
+        pesos[token] = pesos.get(token, 0.0) + PESO_AUTOR
+    return pesos
+
+
+def _tamanio(expansion: Expansion) -> int:
+    return sum(len(ids) for capas, _ in expansion for ids in capas.values())
+
+
+def _capas_por_puntaje(expansion: Expansion) -> List[Tuple[float, Dict[str, None]]]:
+    capas = [(peso * escala, ids) for capas, escala in expansion for peso, ids in capas.items()]
+    capas.sort(key=itemgetter(0), reverse=True)
+    return capas
+
+
+def _mejores(expansion: Expansion, limite: int) -> List[Tuple[str, float]]:
+    mejores: Dict[str, float] = {}
+    for puntaje, ids in _capas_por_puntaje(expansion):
+        for libro_id in ids:
+            if libro_id not in mejores:
+                mejores[libro_id] = puntaje
+                if len(mejores) >= limite:
+                    return list(mejores.items())
+    return list(mejores.items())
+
+
+def _mejores_combinados(expansiones: List[Expansion], limite: int) -> Optional[List[Tuple[str, float]]]:
+    listas = [_capas_por_puntaje(expansion) for expansion in expansiones]
+    inicio = (0,) * len(listas)
+    pendientes = [(-sum(capas[0][0] for capas in listas), inicio)]
+    vistas = {inicio}
+    mejores: Dict[str, float] = {}
+    presupuesto = min(_tamanio(expansion) for expansion in expansiones) // DIVISOR_PRESUPUESTO
+    while pendientes:
+        negativo, indices = heapq.heappop(pendientes)
+        conjuntos = sorted((listas[i][j][1] for i, j in enumerate(indices)), key=len)
+        presupuesto -= len(conjuntos[0]) + len(listas)
+        if presupuesto < 0:
+            return None
+        for libro_id in conjuntos[0]:
+            if libro_id not in mejores and all(libro_id in ids for ids in conjuntos[1:]):
+                mejores[libro_id] = -negativo
+                if len(mejores) >= limite:
+                    return list(mejores.items())
+        for i, j in enumerate(indices):
+            if j + 1 < len(listas[i]):
+                siguiente = indices[:i] + (j + 1,) + indices[i + 1:]
+                if siguiente not in vistas:
+                    vistas.add(siguiente)
+                    heapq.heappush(pendientes, (negativo + listas[i][j][0] - listas[i][j + 1][0], siguiente))
+    return list(mejores.items())
+
+
+def _unir(expansion: Expansion) -> Dict[str, float]:
+    puntajes: Dict[str, float] = {}
+    for puntaje, ids in _capas_por_puntaje(expansion):
+        for libro_id in ids:
+            puntajes.setdefault(libro_id, puntaje)
+    return puntajes
+
+
+def _buscar_en_capas(capas: List[Tuple[float, Dict[str, None]]], libro_id: str) -> Optional[float]:
+    for puntaje, ids in capas:
+        if libro_id in ids:
+            return puntaje
+    return None
+
+
+class IndiceBusqueda:
+    def __init__(self):
+        self._postings: Dict[str, Capas] = {}
+        self._frecuencias: Dict[str, int] = {}
+        self._vocabulario: List[str] = []
+        self._completados: Dict[str, List[str]] = {}
+        self._documentos = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._documentos
+
+    def agregar(self, libro: Libro):
+        pesos = _pesos(libro)
+        with self._lock:
+            self._documentos += 1
+            for token, peso in pesos.items():
+                self._invalidar(token)
+                capas = self._postings.get(token)
+                if capas is None:
+                    capas = self._postings[token] = {}
+                    self._frecuencias[token] = 0
+                    insort(self._vocabulario, token)
+                capas.setdefault(peso, {})[libro.id] = None
+                self._frecuencias[token] += 1
+
+    def quitar(self, libro: Libro):
+        pesos = _pesos(libro)
+        with self._lock:
+            self._documentos -= 1
+            for token, peso in pesos.items():
+                self._invalidar(token)
+                capas = self._postings.get(token)
+                ids = capas.get(peso) if capas is not None else None
+                if ids is None or libro.id not in ids:
+                    continue
+                del ids[libro.id]
+                if not ids:
+                    del capas[peso]
+                self._frecuencias[token] -= 1
+                if not capas:
+                    del self._postings[token]
+                    del self._frecuencias[token]
+                    del self._vocabulario[bisect_left(self._vocabulario, token)]
+
+    def _invalidar(self, token: str):
+        if self._completados:
+            for fin in range(1, len(token) + 1):
+                self._completados.pop(token[:fin], None)
+
+    def buscar(self, consulta: str, limite: int = 20) -> List[Tuple[str, float]]:
+        terminos = tokenizar(consulta)
+        if not terminos:
+            return []
+        prefijo = None if consulta[-1].isspace() else terminos.pop()
+        with self._lock:
+            expansiones = [self._expandir(termino, exacto=True) for termino in terminos]
+            if prefijo is not None:
+                expansiones.append(self._expandir(prefijo))
+            if not all(expansiones):
+                return []
+            if len(expansiones) == 1:
+                return _mejores(expansiones[0], limite)
+            mejores = _mejores_combinados(expansiones, limite)
+            if mejores is not None:
+                return mejores
+            expansiones.sort(key=_tamanio)
+            candidatos = _unir(expansiones[0])
+            consultas = []
+            for expansion in expansiones[1:]:
+                capas = _capas_por_puntaje(expansion)
+                if len(candidatos) * len(capas) > _tamanio(expansion):
+                    consultas.append(_unir(expansion).get)
+                else:
+                    consultas.append(partial(_buscar_en_capas, capas))
+            puntajes: Dict[str, float] = {}
+            for libro_id, puntaje in candidatos.items():
+                for consultar in consultas:
+                    otro = consultar(libro_id)
+                    if otro is None:
+                        break
+                    puntaje += otro
+                else:
+                    puntajes[libro_id] = puntaje
+        return heapq.nlargest(limite, puntajes.items(), key=itemgetter(1))
+
+    def _expandir(self, termino: str, exacto: bool = False) -> Expansion:
+        if exacto:
+            terminos = [termino] if termino in self._postings else []
+        else:
+            terminos = self._completar(termino)
+        expansion = []
+        for candidato in terminos:
+            escala = math.log(1 + self._documentos / self._frecuencias[candidato])
+            if candidato != termino:
+                escala *= FACTOR_PREFIJO
+            expansion.append((self._postings[candidato], escala))
+        return expansion
+
+    def _completar(self, prefijo: str) -> List[str]:
+        terminos = self._completados.get(prefijo)
+        if terminos is not None:
+            return terminos
+        inicio = bisect_left(self._vocabulario, prefijo)
+        fin = inicio
+        while fin < len(self._vocabulario) and fin - inicio <= MAX_EXPANSIONES:
+            if not self._vocabulario[fin].startswith(prefijo):
+                return self._vocabulario[inicio:fin]
+            fin += 1
+        if fin - inicio <= MAX_EXPANSIONES:
+            return self._vocabulario[inicio:fin]
+        fin = bisect_left(self._vocabulario, prefijo + "\U0010ffff", fin)
+        terminos = heapq.nlargest(MAX_EXPANSIONES, self._vocabulario[inicio:fin], key=self._frecuencias.__getitem__)
+        self._completados[prefijo] = terminos
+        return terminos
@@ -0,0 +1,36 @@
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+CAPACIDAD_CACHE = 10_000
+
+
+class CacheRespuestas:
+    def __init__(self, capacidad: int = CAPACIDAD_CACHE):
+        if capacidad < 1:
+            raise ValueError("La capacidad de la caché debe ser positiva")
+        self.capacidad = capacidad
+        self.aciertos = 0
+        self.fallos = 0
+        self._entradas: "OrderedDict[Hashable, Tuple[str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def obtener(self, clave: Hashable, etag: str) -> Optional[bytes]:
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None or entrada[0] != etag:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[1]
+
+    def guardar(self, clave: Hashable, etag: str, cuerpo: bytes):
+        with self._lock:
+            self._entradas[clave] = (etag, cuerpo)
+            self._entradas.move_to_end(clave)
+            if len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
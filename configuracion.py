@@ -0,0 +1,64 @@
+import os
+
+from notificaciones import DespachadorNotificaciones, TransporteSMTP
+from persistencia import EVENTOS_POR_INSTANTANEA, cargar_biblioteca
+from repositorio import RepositorioSQLite
+from service import BibliotecaService, INTERVALO_TEMPORIZADOR
+
+
+def crear_biblioteca() -> BibliotecaService:
+    directorio_datos = os.environ.get("BIBLIOTECA_DATOS")
+    ruta_sqlite = os.environ.get("BIBLIOTECA_SQLITE")
+
+    if directorio_datos:
+        biblioteca = cargar_biblioteca(
+            directorio_datos,
+            durable=os.environ.get("BIBLIOTECA_DURABLE", "0") == "1",
+            eventos_por_instantanea=int(os.environ.get("BIBLIOTECA_EVENTOS_POR_INSTANTANEA", EVENTOS_POR_INSTANTANEA))
+        )
+    elif ruta_sqlite:
+        biblioteca = BibliotecaService(repositorio=RepositorioSQLite(ruta_sqlite))
+    else:
+        biblioteca = BibliotecaService()
+
+    limite_notificaciones = os.environ.get("BIBLIOTECA_LIMITE_NOTIFICACIONES")
+
+    if limite_notificaciones:
+        biblioteca.limite_notificaciones = int(limite_notificaciones)
+
+    smtp_host = os.environ.get("BIBLIOTECA_SMTP_HOST")
+
+    if smtp_host:
+        biblioteca.despachador = DespachadorNotificaciones(
+            TransporteSMTP(
+                smtp_host,
+                int(os.environ.get("BIBLIOTECA_SMTP_PUERTO", "25")),
+                os.environ.get("BIBLIOTECA_SMTP_REMITENTE", "bioalert@biblioteca.local")
+            ),
+            biblioteca.bio_alert,
+            trabajadores=int(os.environ.get("BIBLIOTECA_SMTP_TRABAJADORES", "4"))
+        )
+
+    intervalo_temporizador = float(os.environ.get("BIBLIOTECA_INTERVALO_TEMPORIZADOR", INTERVALO_TEMPORIZADOR))
+
+    if intervalo_temporizador > 0:
+        biblioteca.iniciar_temporizador(intervalo_temporizador)
+
+    return biblioteca
+
+
+def cerrar_biblioteca(biblioteca: BibliotecaService):
+    biblioteca.detener_temporizador()
+    if biblioteca.despachador is not None:
+        biblioteca.despachador.cerrar()
+    if biblioteca.registro is not None:
+        biblioteca.registro.cerrar()
+    if isinstance(biblioteca.repositorio, RepositorioSQLite):
+        biblioteca.repositorio.cerrar()
+
+
+def clave_servidor_estado() -> bytes:
+    clave = os.environ.get("BIBLIOTECA_CLAVE_ESTADO")
+    if not clave:
+        raise ValueError("BIBLIOTECA_CLAVE_ESTADO es obligatoria para el servidor de estado")
+    return clave.encode()
@@ -0,0 +1,167 @@
+import threading
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from models import EstadoCopia
+
+FILTROS = ("disponibles", "agotados", "con_espera")
+TAMANIO_BLOQUE = 1024
+
+
+@dataclass(slots=True)
+class DisponibilidadLibro:
+    total: int = 0
+    disponibles: int = 0
+    en_espera: int = 0
+
+    def copiar(self) -> "DisponibilidadLibro":
+        return DisponibilidadLibro(self.total, self.disponibles, self.en_espera)
+
+
+def _banderas(contadores: DisponibilidadLibro) -> Tuple[bool, bool]:
+    return contadores.disponibles > 0, contadores.en_espera > 0
+
+
+class IndicePosiciones:
+    def __init__(self):
+        self._bloques: Dict[int, List[int]] = {}
+        self._claves: List[int] = []
+        self._cantidad = 0
+
+    def __len__(self) -> int:
+        return self._cantidad
+
+    def agregar(self, posicion: int):
+        clave = posicion // TAMANIO_BLOQUE
+        bloque = self._bloques.get(clave)
+        if bloque is None:
+            bloque = self._bloques[clave] = []
+            insort(self._claves, clave)
+        indice = bisect_left(bloque, posicion)
+        if indice == len(bloque) or bloque[indice] != posicion:
+            bloque.insert(indice, posicion)
+            self._cantidad += 1
+
+    def quitar(self, posicion: int):
+        clave = posicion // TAMANIO_BLOQUE
+        bloque = self._bloques.get(clave)
+        if bloque is None:
+            return
+        indice = bisect_left(bloque, posicion)
+        if indice == len(bloque) or bloque[indice] != posicion:
+            return
+        del bloque[indice]
+        self._cantidad -= 1
+        if not bloque:
+            del self._bloques[clave]
+            del self._claves[bisect_left(self._claves, clave)]
+
+    def pagina(self, despues: Optional[int], limite: int) -> Tuple[List[int], bool]:
+        inicio = despues + 1 if despues is not None else 0
+        posiciones = []
+        for indice in range(bisect_left(self._claves, inicio // TAMANIO_BLOQUE), len(self._claves)):
+            bloque = self._bloques[self._claves[indice]]
+            desde = bisect_left(bloque, inicio)
+            faltan = limite - len(posiciones)
+            posiciones.extend(bloque[desde:desde + faltan])
+            if len(bloque) - desde > faltan:
+                return posiciones, True
+        return posiciones, False
+
+
+class CatalogoDisponibilidad:
+    def __init__(self):
+        self._libros: Dict[str, DisponibilidadLibro] = {}
+        self._posiciones: Dict[str, int] = {}
+        self._ids: List[str] = []
+        self._indices = {nombre: IndicePosiciones() for nombre in (None, *FILTROS)}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._libros)
+
+    def libro(self, libro_id: str):
+        with self._lock:
+            self._contadores(libro_id)
+
+    def copia(
+        self,
+        anterior: Optional[Tuple[str, EstadoCopia]],
+        libro_id: Optional[str],
+        estado: Optional[EstadoCopia]
+    ):
+        with self._lock:
+            if anterior is not None:
+                contadores = self._contadores(anterior[0])
+                antes = _banderas(contadores)
+                contadores.total -= 1
+                contadores.disponibles -= anterior[1] == EstadoCopia.DISPONIBLE
+                self._reindexar(anterior[0], antes, contadores)
+            if libro_id is not None:
+                contadores = self._contadores(libro_id)
+                antes = _banderas(contadores)
+                contadores.total += 1
+                contadores.disponibles += estado == EstadoCopia.DISPONIBLE
+                self._reindexar(libro_id, antes, contadores)
+
+    def estado(self, libro_id: str, anterior: EstadoCopia, nuevo: EstadoCopia):
+        if (anterior == EstadoCopia.DISPONIBLE) == (nuevo == EstadoCopia.DISPONIBLE):
+            return
+        with self._lock:
+            contadores = self._contadores(libro_id)
+            antes = _banderas(contadores)
+            contadores.disponibles += 1 if nuevo == EstadoCopia.DISPONIBLE else -1
+            self._reindexar(libro_id, antes, contadores)
+
+    def espera(self, libro_id: str, cantidad: int):
+        with self._lock:
+            contadores = self._contadores(libro_id)
+            antes = _banderas(contadores)
+            contadores.en_espera = cantidad
+            self._reindexar(libro_id, antes, contadores)
+
+    def obtener(self, libro_id: str) -> DisponibilidadLibro:
+        with self._lock:
+            contadores = self._libros.get(libro_id)
+            return contadores.copiar() if contadores is not None else DisponibilidadLibro()
+
+    def pagina(
+        self,
+        despues: Optional[str],
+        limite: int,
+        filtro: Optional[str] = None
+    ) -> Tuple[List[Tuple[str, DisponibilidadLibro]], Optional[str]]:
+        if filtro is not None and filtro not in FILTROS:
+            raise ValueError(f"Filtro inválido. Opciones: {', '.join(FILTROS)}")
+        with self._lock:
+            posicion = None
+            if despues is not None:
+                posicion = self._posiciones.get(despues)
+                if posicion is None:
+                    raise ValueError("Cursor inválido")
+            posiciones, hay_mas = self._indices[filtro].pagina(posicion, limite)
+            ids = [self._ids[posicion] for posicion in posiciones]
+            return [(libro_id, self._libros[libro_id].copiar()) for libro_id in ids], ids[-1] if hay_mas else None
+
+    def _contadores(self, libro_id: str) -> DisponibilidadLibro:
+        contadores = self._libros.get(libro_id)
+        if contadores is None:
+            contadores = self._libros[libro_id] = DisponibilidadLibro()
+            posicion = self._posiciones[libro_id] = len(self._ids)
+            self._ids.append(libro_id)
+            self._indices[None].agregar(posicion)
+            self._indices["agotados"].agregar(posicion)
+        return contadores
+
+    def _reindexar(self, libro_id: str, antes: Tuple[bool, bool], contadores: DisponibilidadLibro):
+        disponible, con_espera = _banderas(contadores)
+        posicion = self._posiciones[libro_id]
+        if disponible != antes[0]:
+            self._indices["disponibles" if disponible else "agotados"].agregar(posicion)
+            self._indices["agotados" if disponible else "disponibles"].quitar(posicion)
+        if con_espera != antes[1]:
+            if con_espera:
+                self._indices["con_espera"].agregar(posicion)
+            else:
+                self._indices["con_espera"].quitar(posicion)
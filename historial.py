@@ -0,0 +1,315 @@
+import base64
+import heapq
+import threading
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from datetime import datetime
+from itertools import compress, groupby
+from typing import Dict, List, Optional, Tuple
+
+from models import Prestamo
+
+COLUMNAS = {
+    "libros": "I",
+    "autores": "I",
+    "lectores": "I",
+    "fechas_prestamo": "q",
+    "fechas_devolucion": "q",
+    "dias_retraso": "I",
+}
+DIA = 86400
+NIVELES = (1, 32, 1024)
+
+
+def _conservar_mejor(mejores: List[Tuple[int, int]], limite: int, cantidad: int, codigo: int):
+    if len(mejores) < limite:
+        heapq.heappush(mejores, (cantidad, codigo))
+    elif cantidad > mejores[0][0]:
+        heapq.heapreplace(mejores, (cantidad, codigo))
+
+
+class Codificador:
+    def __init__(self, valores: Optional[List[str]] = None):
+        self.valores: List[str] = list(valores or [])
+        self._codigos: Dict[str, int] = {valor: codigo for codigo, valor in enumerate(self.valores)}
+
+    def __len__(self) -> int:
+        return len(self.valores)
+
+    def codificar(self, valor: str) -> int:
+        codigo = self._codigos.get(valor)
+        if codigo is None:
+            codigo = self._codigos[valor] = len(self.valores)
+            self.valores.append(valor)
+        return codigo
+
+    def codigo(self, valor: str) -> Optional[int]:
+        return self._codigos.get(valor)
+
+
+class HistorialPrestamos:
+    def __init__(self):
+        self.libros = Codificador()
+        self.autores = Codificador()
+        self.lectores = Codificador()
+        self.nombres_autores: List[str] = []
+        self._columnas = {nombre: array(tipo) for nombre, tipo in COLUMNAS.items()}
+        self._reiniciar_agregados()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._columnas["libros"])
+
+    def _reiniciar_agregados(self):
+        self._prestamos_libro = array("I")
+        self._por_cantidad: Dict[int, Dict[int, None]] = {}
+        self._cantidades: List[int] = []
+        self._prestamos_autor = array("Q")
+        self._retrasos_autor = array("Q")
+        self.retrasados = 0
+        self._filas_dia: Dict[int, array] = {}
+        self._cubetas: List[Dict[int, Counter]] = [{} for _ in NIVELES]
+        self._claves: List[List[int]] = [[] for _ in NIVELES]
+        self._ordenes: Dict[Tuple[int, int], List[Tuple[int, int]]] = {}
+
+    def registrar(self, prestamo: Prestamo, lector_id: str, dias_retraso: int):
+        libro = prestamo.copia.libro
+        devolucion = int(prestamo.fecha_devolucion_real.timestamp())
+        with self._lock:
+            codigo_libro = self.libros.codificar(libro.id)
+            codigo_autor = self._codificar_autor(libro.autor.nombre)
+            fila = {
+                "libros": codigo_libro,
+                "autores": codigo_autor,
+                "lectores": self.lectores.codificar(lector_id),
+                "fechas_prestamo": int(prestamo.fecha_prestamo.timestamp()),
+                "fechas_devolucion": devolucion,
+                "dias_retraso": dias_retraso,
+            }
+            for nombre, columna in self._columnas.items():
+                columna.append(fila[nombre])
+            self._indexar(devolucion // DIA, (len(self) - 1,), (codigo_libro,))
+            self._sumar(codigo_libro, codigo_autor, 1, int(dias_retraso > 0))
+
+    def _indexar(self, dia: int, filas, codigos_libro):
+        filas_dia = self._filas_dia.get(dia)
+        if filas_dia is None:
+            filas_dia = self._filas_dia[dia] = array("I")
+        filas_dia.extend(filas)
+        for nivel, (dias, cubetas, claves) in enumerate(zip(NIVELES, self._cubetas, self._claves)):
+            clave = dia // dias
+            conteo = cubetas.get(clave)
+            if conteo is None:
+                conteo = cubetas[clave] = Counter()
+                insort(claves, clave)
+            conteo.update(codigos_libro)
+            self._ordenes.pop((nivel, clave), None)
+
+    def _codificar_autor(self, nombre: str) -> int:
+        codigo = self.autores.codificar(nombre.casefold())
+        if codigo == len(self.nombres_autores):
+            self.nombres_autores.append(nombre)
+        return codigo
+
+    def _sumar(self, codigo_libro: int, codigo_autor: int, prestamos: int, retrasos: int):
+        cantidades = self._prestamos_libro
+        if codigo_libro >= len(cantidades):
+            cantidades.extend([0] * (codigo_libro + 1 - len(cantidades)))
+        anterior = cantidades[codigo_libro]
+        if anterior:
+            grupo = self._por_cantidad[anterior]
+            del grupo[codigo_libro]
+            if not grupo:
+                del self._por_cantidad[anterior]
+                del self._cantidades[bisect_left(self._cantidades, anterior)]
+        nueva = cantidades[codigo_libro] = anterior + prestamos
+        grupo = self._por_cantidad.get(nueva)
+        if grupo is None:
+            grupo = self._por_cantidad[nueva] = {}
+            insort(self._cantidades, nueva)
+        grupo[codigo_libro] = None
+
+        for columna in (self._prestamos_autor, self._retrasos_autor):
+            if codigo_autor >= len(columna):
+                columna.extend([0] * (codigo_autor + 1 - len(columna)))
+        self._prestamos_autor[codigo_autor] += prestamos
+        self._retrasos_autor[codigo_autor] += retrasos
+        self.retrasados += retrasos
+
+    def mas_prestados(
+        self,
+        limite: int = 10,
+        desde: Optional[datetime] = None,
+        hasta: Optional[datetime] = None
+    ) -> List[Tuple[str, int]]:
+        with self._lock:
+            if desde is None and hasta is None:
+                resultado = []
+                for cantidad in reversed(self._cantidades):
+                    for codigo in self._por_cantidad[cantidad]:
+                        resultado.append((self.libros.valores[codigo], cantidad))
+                        if len(resultado) == limite:
+                            return resultado
+                return resultado
+            dias = self._claves[0]
+            if not dias:
+                return []
+            primero, ultimo = dias[0] * DIA, (dias[-1] + 1) * DIA
+            inicio = int(desde.timestamp()) if desde is not None else primero
+            fin = int(hasta.timestamp()) if hasta is not None else ultimo
+            dentro = bisect_left(dias, -(-fin // DIA)) - bisect_left(dias, inicio // DIA)
+            if 2 * dentro <= len(dias):
+                return self._mas_prestados_en(self._cubetas_en_periodo(inicio, fin), limite)
+            fuera = Counter()
+            for _, conteo in self._cubetas_en_periodo(primero, inicio) + self._cubetas_en_periodo(fin, ultimo):
+                fuera.update(conteo)
+            return self._mas_prestados_descontando(limite, fuera)
+
+    def _mas_prestados_en(self, cubetas: List[Tuple[Optional[tuple], Counter]], limite: int) -> List[Tuple[str, int]]:
+        conteos = [conteo for _, conteo in cubetas]
+        ordenes = [self._orden(clave, conteo) for clave, conteo in cubetas]
+        vistos = set()
+        mejores: List[Tuple[int, int]] = []
+        for profundidad in range(max(map(len, ordenes), default=0)):
+            umbral = 0
+            for orden in ordenes:
+                if profundidad >= len(orden):
+                    continue
+                codigo, cantidad = orden[profundidad]
+                umbral += cantidad
+                if codigo in vistos:
+                    continue
+                vistos.add(codigo)
+                _conservar_mejor(mejores, limite, sum(conteo.get(codigo, 0) for conteo in conteos), codigo)
+            if len(mejores) == limite and mejores[0][0] >= umbral:
+                break
+        return [(self.libros.valores[codigo], cantidad) for cantidad, codigo in sorted(mejores, reverse=True)]
+
+    def _orden(self, clave: Optional[tuple], conteo: Counter) -> List[Tuple[int, int]]:
+        orden = self._ordenes.get(clave) if clave is not None else None
+        if orden is None:
+            orden = conteo.most_common()
+            if clave is not None:
+                self._ordenes[clave] = orden
+        return orden
+
+    def _mas_prestados_descontando(self, limite: int, fuera: Counter) -> List[Tuple[str, int]]:
+        mejores: List[Tuple[int, int]] = []
+        for cantidad in reversed(self._cantidades):
+            if len(mejores) == limite and cantidad <= mejores[0][0]:
+                break
+            for codigo in self._por_cantidad[cantidad]:
+                restante = cantidad - fuera.get(codigo, 0)
+                if restante > 0:
+                    _conservar_mejor(mejores, limite, restante, codigo)
+        return [(self.libros.valores[codigo], cantidad) for cantidad, codigo in sorted(mejores, reverse=True)]
+
+    def _cubetas_en_periodo(self, inicio: int, fin: int) -> List[Tuple[Optional[tuple], Counter]]:
+        if fin <= inicio:
+            return []
+        primer_dia = -(-inicio // DIA)
+        ultimo_dia = fin // DIA
+        if primer_dia > ultimo_dia:
+            return [(None, self._contar_filas(inicio // DIA, inicio, fin))]
+        cubetas = []
+        if inicio % DIA:
+            cubetas.append((None, self._contar_filas(primer_dia - 1, inicio, fin)))
+        if fin % DIA:
+            cubetas.append((None, self._contar_filas(ultimo_dia, inicio, fin)))
+        self._cubetas_en_rango(cubetas, primer_dia, ultimo_dia, len(NIVELES) - 1)
+        return cubetas
+
+    def _cubetas_en_rango(self, cubetas: list, desde_dia: int, hasta_dia: int, nivel: int):
+        if desde_dia >= hasta_dia:
+            return
+        dias = NIVELES[nivel]
+        primera = -(-desde_dia // dias)
+        ultima = hasta_dia // dias
+        if primera >= ultima:
+            self._cubetas_en_rango(cubetas, desde_dia, hasta_dia, nivel - 1)
+            return
+        claves = self._claves[nivel]
+        conteos = self._cubetas[nivel]
+        cubetas.extend(
+            ((nivel, clave), conteos[clave])
+            for clave in claves[bisect_left(claves, primera):bisect_left(claves, ultima)]
+        )
+        if nivel:
+            self._cubetas_en_rango(cubetas, desde_dia, primera * dias, nivel - 1)
+            self._cubetas_en_rango(cubetas, ultima * dias, hasta_dia, nivel - 1)
+
+    def _contar_filas(self, dia: int, inicio: int, fin: int) -> Counter:
+        fechas = self._columnas["fechas_devolucion"]
+        libros = self._columnas["libros"]
+        return Counter(libros[fila] for fila in self._filas_dia.get(dia, ()) if inicio <= fechas[fila] < fin)
+
+    def circulacion_autor(self, nombre_autor: str) -> Optional[dict]:
+        with self._lock:
+            codigo = self.autores.codigo(nombre_autor.casefold())
+            if codigo is None:
+                return None
+            return self._resumen_autor(codigo)
+
+    def _resumen_autor(self, codigo: int) -> dict:
+        prestamos = self._prestamos_autor[codigo]
+        retrasos = self._retrasos_autor[codigo]
+        return {
+            "autor": self.nombres_autores[codigo],
+            "prestamos": prestamos,
+            "devoluciones_con_retraso": retrasos,
+            "tasa_retraso": retrasos / prestamos if prestamos else 0.0
+        }
+
+    def autores_mas_prestados(self, limite: int = 10) -> List[dict]:
+        with self._lock:
+            prestamos = self._prestamos_autor
+            codigos = heapq.nlargest(limite, range(len(prestamos)), key=prestamos.__getitem__)
+            return [self._resumen_autor(codigo) for codigo in codigos]
+
+    def resumen(self) -> dict:
+        with self._lock:
+            total = len(self)
+            return {
+                "prestamos": total,
+                "devoluciones_con_retraso": self.retrasados,
+                "tasa_retraso": self.retrasados / total if total else 0.0,
+                "libros": len(self.libros),
+                "lectores": len(self.lectores)
+            }
+
+    def exportar(self) -> dict:
+        with self._lock:
+            return {
+                "libros": self.libros.valores,
+                "autores": self.nombres_autores,
+                "lectores": self.lectores.valores,
+                "columnas": {
+                    nombre: base64.b64encode(columna.tobytes()).decode() for nombre, columna in self._columnas.items()
+                }
+            }
+
+    def importar(self, datos: dict):
+        with self._lock:
+            self.libros = Codificador(datos["libros"])
+            self.nombres_autores = list(datos["autores"])
+            self.autores = Codificador([nombre.casefold() for nombre in self.nombres_autores])
+            self.lectores = Codificador(datos["lectores"])
+            for nombre, tipo in COLUMNAS.items():
+                columna = array(tipo)
+                columna.frombytes(base64.b64decode(datos["columnas"][nombre]))
+                self._columnas[nombre] = columna
+            self._reiniciar_agregados()
+            libros = self._columnas["libros"]
+            inicio = 0
+            for dia, grupo in groupby(map(DIA.__rfloordiv__, self._columnas["fechas_devolucion"])):
+                fin = inicio + len(list(grupo))
+                self._indexar(dia, range(inicio, fin), libros[inicio:fin])
+                inicio = fin
+            autores = self._columnas["autores"]
+            retrasos = Counter(compress(autores, self._columnas["dias_retraso"]))
+            for (codigo_libro, codigo_autor), cantidad in Counter(zip(self._columnas["libros"], autores)).items():
+                self._sumar(codigo_libro, codigo_autor, cantidad, 0)
+            for codigo_autor, cantidad in retrasos.items():
+                self._retrasos_autor[codigo_autor] += cantidad
+                self.retrasados += cantidad
@@ -0,0 +1,172 @@
+import argparse
+import sys
+from datetime import date
+from typing import Iterable, List, Literal, Optional, Tuple, Union
+
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+from typing_extensions import Annotated
+
+from models import Libro, Copia, Lector, EstadoCopia
+from service import BibliotecaService
+
+
+class RegistroLibro(BaseModel):
+    tipo: Literal["libro"]
+    nombre: str
+    anio: int
+    autor_nombre: str
+    autor_fecha_nacimiento: date
+    id: Optional[str] = None
+
+
+class RegistroCopia(BaseModel):
+    tipo: Literal["copia"]
+    id: str
+    libro_id: str
+    estado: EstadoCopia = EstadoCopia.DISPONIBLE
+
+
+class RegistroLector(BaseModel):
+    tipo: Literal["lector"]
+    id: str
+    nombre: str
+    email: str
+
+
+Registro = Annotated[Union[RegistroLibro, RegistroCopia, RegistroLector], Field(discriminator="tipo")]
+validar_registro = TypeAdapter(Registro).validator.validate_json
+
+
+def _mensaje_validacion(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(parte) for parte in detalle['loc']) or 'registro'}: {detalle['msg']}"
+        for detalle in error.errors(include_url=False)
+    )
+
+
+class ImportadorNDJSON:
+    def __init__(self, service: BibliotecaService, tam_lote: int = 1000, max_errores: int = 1000):
+        self.service = service
+        self.tam_lote = tam_lote
+        self.max_errores = max_errores
+        self.procesadas = 0
+        self.importadas = {"libro": 0, "copia": 0, "lector": 0}
+        self.cantidad_errores = 0
+        self.errores: List[dict] = []
+
+    def _registrar_errores(self, errores: List[Tuple[int, str]]):
+        self.cantidad_errores += len(errores)
+        for numero, mensaje in sorted(errores)[:self.max_errores - len(self.errores)]:
+            self.errores.append({"linea": numero, "error": mensaje})
+
+    def _insertar(self, registro):
+        if isinstance(registro, RegistroCopia):
+            libro = self.service.libros.get(registro.libro_id)
+            if libro is None:
+                raise ValueError("Libro no encontrado")
+            self.service.agregar_copia(Copia(id=registro.id, libro=libro, estado=registro.estado))
+        elif isinstance(registro, RegistroLibro):
+            autor = self.service.registrar_autor(registro.autor_nombre, registro.autor_fecha_nacimiento)
+            self.service.agregar_libro(Libro(id=registro.id, nombre=registro.nombre, anio=registro.anio, autor=autor))
+        else:
+            self.service.agregar_lector(Lector(id=registro.id, nombre=registro.nombre, email=registro.email))
+
+    def procesar_lote(self, lineas: List[Tuple[int, bytes]]):
+        self.procesadas += len(lineas)
+        errores = []
+        validos = []
+        for numero, linea in lineas:
+            try:
+                validos.append((numero, validar_registro(linea)))
+            except ValidationError as e:
+                errores.append((numero, _mensaje_validacion(e)))
+
+        with self.service.repositorio.transaccion():
+            for numero, registro in validos:
+                try:
+                    self._insertar(registro)
+                except ValueError as e:
+                    errores.append((numero, str(e)))
+                else:
+                    self.importadas[registro.tipo] += 1
+        self._registrar_errores(errores)
+
+    def importar(self, lineas: Iterable[bytes]) -> dict:
+        lote = []
+        for numero, linea in enumerate(lineas, start=1):
+            if not linea.strip():
+                continue
+            lote.append((numero, linea))
+            if len(lote) >= self.tam_lote:
+                self.procesar_lote(lote)
+                lote = []
+        if lote:
+            self.procesar_lote(lote)
+        return self.resultado()
+
+    def resultado(self) -> dict:
+        return {
+            "procesadas": self.procesadas,
+            "importadas": dict(self.importadas),
+            "cantidad_errores": self.cantidad_errores,
+            "errores": list(self.errores)
+        }
+
+
+def _biblioteca_local(args) -> BibliotecaService:
+    if args.datos:
+        from persistencia import cargar_biblioteca
+        return cargar_biblioteca(args.datos)
+    from repositorio import RepositorioSQLite
+    return BibliotecaService(repositorio=RepositorioSQLite(args.sqlite))
+
+
+def _enviar(args) -> dict:
+    import httpx
+
+    def fragmentos():
+        with open(args.archivo, "rb") as archivo:
+            while True:
+                bloque = archivo.read(1 << 16)
+                if not bloque:
+                    return
+                yield bloque
+
+    respuesta = httpx.post(
+        args.url.rstrip("/") + "/importar/",
+        content=fragmentos(),
+        headers={"Content-Type": "application/x-ndjson"},
+        timeout=None
+    )
+    respuesta.raise_for_status()
+    return respuesta.json()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Importa libros, copias y lectores desde un archivo NDJSON")
+    parser.add_argument("archivo")
+    destino = parser.add_mutually_exclusive_group(required=True)
+    destino.add_argument("--url", help="API en ejecución, p. ej. http://localhost:8000")
+    destino.add_argument("--sqlite", help="Base SQLite local")
+    destino.add_argument("--datos", help="Directorio del registro de eventos local")
+    parser.add_argument("--tam-lote", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    if args.url:
+        resultado = _enviar(args)
+    else:
+        service = _biblioteca_local(args)
+        with open(args.archivo, "rb") as archivo:
+            resultado = ImportadorNDJSON(service, tam_lote=args.tam_lote).importar(archivo)
+        if service.registro is not None:
+            service.registro.cerrar()
+
+    print(f"procesadas: {resultado['procesadas']}, importadas: {resultado['importadas']}, "
+          f"errores: {resultado['cantidad_errores']}")
+    for error in resultado["errores"]:
+        print(f"  línea {error['linea']}: {error['error']}", file=sys.stderr)
+    return 1 if resultado["cantidad_errores"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,43 @@
-from fastapi import FastAPI, HTTPException
-from typing import List
-from datetime import date
-from models import Libro, Autor, Copia, Lector, EstadoCopia
-from service import BibliotecaService
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response
+from typing import Awaitable, Callable, Hashable, List, Optional
+from datetime import date, datetime
+from models import Libro, Copia, Lector, EstadoCopia
+from importacion import ImportadorNDJSON
+from service import LIMITE_PAGINA
+from configuracion import crear_biblioteca, cerrar_biblioteca, clave_servidor_estado
+from servidor_estado import ReplicaBiblioteca
+from cache import CacheRespuestas, CAPACIDAD_CACHE
+from metricas import MetricasHTTP, MiddlewareMetricas, TIPO_CONTENIDO
+from servicio_async import BibliotecaAsync
 from pydantic import BaseModel
 
-app = FastAPI(title="Sistema de Biblioteca")
-biblioteca = BibliotecaService()
+SERVIDOR_ESTADO = os.environ.get("BIBLIOTECA_SERVIDOR_ESTADO")
+
+if SERVIDOR_ESTADO:
+    biblioteca = ReplicaBiblioteca(SERVIDOR_ESTADO, clave_servidor_estado())
+else:
+    biblioteca = crear_biblioteca()
+
+servicio = BibliotecaAsync(biblioteca, ejecutor=run_in_threadpool)
+cache = CacheRespuestas(int(os.environ.get("BIBLIOTECA_CACHE_RESPUESTAS", CAPACIDAD_CACHE)))
+
+
+@asynccontextmanager
+async def ciclo_de_vida(app: FastAPI):
+    yield
+    if isinstance(biblioteca, ReplicaBiblioteca):
+        biblioteca.cerrar()
+    else:
+        cerrar_biblioteca(biblioteca)
+
+
+app = FastAPI(title="Sistema de Biblioteca", lifespan=ciclo_de_vida)
+metricas_http = MetricasHTTP()
+app.add_middleware(MiddlewareMetricas, metricas=metricas_http)
 
 
 class LibroRequest(BaseModel):
@@ -37,73 +68,186 @@ class DevolucionRequest(BaseModel):
     copia_id: str
 
 
+class PrestamoLoteRequest(BaseModel):
+    items: List[PrestamoRequest]
+
+
+class DevolucionLoteRequest(BaseModel):
+    items: List[DevolucionRequest]
+
+
 class SuscripcionRequest(BaseModel):
     lector_id: str
     libro_id: str
 
 
+class ReservaRequest(BaseModel):
+    lector_id: str
+    libro_id: str
+
+
+def _etag(*partes) -> str:
+    return '"' + "-".join(str(parte) for parte in partes) + '"'
+
+
+def _no_modificado(request: Request, etag: str) -> bool:
+    valor = request.headers.get("if-none-match")
+    if valor is None:
+        return False
+    return any(candidato.strip().removeprefix("W/") == etag for candidato in valor.split(","))
+
+
+async def _respuesta_condicional(
+    request: Request, clave: Hashable, etag: str, construir: Callable[[], Awaitable[dict]]
+) -> Response:
+    if _no_modificado(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    cuerpo = cache.obtener(clave, etag)
+    if cuerpo is None:
+        cuerpo = JSONResponse(await construir()).body
+        cache.guardar(clave, etag, cuerpo)
+    return Response(cuerpo, media_type="application/json", headers={"ETag": etag})
+
+
 @app.post("/libros/", response_model=dict)
-def crear_libro(libro_req: LibroRequest):
+async def crear_libro(libro_req: LibroRequest):
     try:
-        autor = Autor(
-            nombre=libro_req.autor_nombre,
-            fecha_nacimiento=date.fromisoformat(libro_req.autor_fecha_nacimiento)
+        autor = await servicio.registrar_autor(
+            libro_req.autor_nombre, date.fromisoformat(libro_req.autor_fecha_nacimiento)
         )
         libro = Libro(nombre=libro_req.nombre, anio=libro_req.anio, autor=autor)
-        biblioteca.agregar_libro(libro)
-        return {"mensaje": "Libro creado exitosamente", "libro_id": libro.id}
+        await servicio.agregar_libro(libro)
+        return {"mensaje": "Libro creado exitosamente", "libro_id": libro.id, "autor_id": libro.autor.id}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @app.post("/copias/", response_model=dict)
-def crear_copia(copia_req: CopiaRequest):
+async def crear_copia(copia_req: CopiaRequest):
     try:
-        if copia_req.libro_id not in biblioteca.libros:
+        libro = await servicio.obtener_libro(copia_req.libro_id)
+        if libro is None:
             raise ValueError("Libro no encontrado")
         
-        libro = biblioteca.libros[copia_req.libro_id]
         copia = Copia(id=copia_req.id, libro=libro)
-        biblioteca.agregar_copia(copia)
+        await servicio.agregar_copia(copia)
         return {"mensaje": "Copia creada exitosamente", "copia_id": copia.id}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @app.post("/lectores/", response_model=dict)
-def crear_lector(lector_req: LectorRequest):
+async def crear_lector(lector_req: LectorRequest):
     try:
         lector = Lector(id=lector_req.id, nombre=lector_req.nombre, email=lector_req.email)
-        biblioteca.agregar_lector(lector)
+        await servicio.agregar_lector(lector)
         return {"mensaje": "Lector creado exitosamente", "lector_id": lector.id}
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@app.get("/autores/")
+async def buscar_autores(nombre: str):
+    autores = await servicio.buscar_autores(nombre)
+    return {
+        "cantidad": len(autores),
+        "autores": [
+            {"id": a.id, "nombre": a.nombre, "fecha_nacimiento": a.fecha_nacimiento.isoformat()} for a in autores
+        ]
+    }
+
+
+@app.get("/autores/{autor_id}")
+async def obtener_autor(autor_id: str):
+    autor = await servicio.obtener_autor(autor_id)
+    if autor is None:
+        raise HTTPException(status_code=404, detail="Autor no encontrado")
+    libros = await servicio.obtener_libros_de_autor(autor_id)
+    return {
+        "id": autor.id,
+        "nombre": autor.nombre,
+        "fecha_nacimiento": autor.fecha_nacimiento.isoformat(),
+        "libros": [{"nombre": l.nombre, "anio": l.anio, "id": l.id} for l in libros]
+    }
+
+
 @app.get("/libros/autor/{nombre_autor}")
-def obtener_libros_autor(nombre_autor: str):
-    libros = biblioteca.obtener_libros_por_autor(nombre_autor)
+async def obtener_libros_autor(nombre_autor: str, limite: int = LIMITE_PAGINA, cursor: Optional[str] = None):
+    try:
+        libros, siguiente = await servicio.paginar_libros_por_autor(nombre_autor, limite, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return {
         "autor": nombre_autor,
-        "cantidad": len(libros),
-        "libros": [{"nombre": l.nombre, "anio": l.anio, "id": l.id} for l in libros]
+        "cantidad": await servicio.contar_libros_por_autor(nombre_autor),
+        "cantidad_pagina": len(libros),
+        "libros": [{"nombre": l.nombre, "anio": l.anio, "id": l.id} for l in libros],
+        "siguiente_cursor": siguiente
+    }
+
+
+@app.get("/libros/buscar")
+async def buscar_libros(q: str, limite: int = 20):
+    try:
+        resultados = await servicio.buscar_libros(q, limite)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "consulta": q,
+        "cantidad": len(resultados),
+        "libros": [
+            {"id": l.id, "nombre": l.nombre, "anio": l.anio, "autor": l.autor.nombre, "puntaje": round(puntaje, 4)}
+            for l, puntaje in resultados
+        ]
     }
 
 
 @app.get("/libros/{libro_id}/copias")
-def obtener_copias(libro_id: str):
-    copias = biblioteca.obtener_copias_libro(libro_id)
+async def obtener_copias(request: Request, libro_id: str, limite: int = LIMITE_PAGINA, cursor: Optional[str] = None):
+    async def construir():
+        try:
+            copias, siguiente = await servicio.paginar_copias_libro(libro_id, limite, cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return {
+            "libro_id": libro_id,
+            "cantidad_copias": await servicio.contar_copias_libro(libro_id),
+            "cantidad_pagina": len(copias),
+            "copias": [{"id": c.id, "estado": c.estado} for c in copias],
+            "siguiente_cursor": siguiente
+        }
+
+    etag = _etag(biblioteca.epoca, biblioteca.version("libro", libro_id))
+    return await _respuesta_condicional(request, ("copias", libro_id, limite, cursor), etag, construir)
+
+
+@app.get("/catalogo/disponibilidad")
+async def obtener_disponibilidad(limite: int = LIMITE_PAGINA, cursor: Optional[str] = None, filtro: Optional[str] = None):
+    try:
+        libros, siguiente = await servicio.paginar_disponibilidad(limite, cursor, filtro)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return {
-        "libro_id": libro_id,
-        "cantidad_copias": len(copias),
-        "copias": [{"id": c.id, "estado": c.estado} for c in copias]
+        "cantidad": len(libros),
+        "libros": [
+            {
+                "id": libro.id,
+                "nombre": libro.nombre,
+                "autor": libro.autor.nombre,
+                "total_copias": contadores.total,
+                "disponibles": contadores.disponibles,
+                "en_espera": contadores.en_espera
+            }
+            for libro, contadores in libros
+        ],
+        "siguiente_cursor": siguiente
     }
 
 
 @app.post("/prestamos/")
-def realizar_prestamo(prestamo_req: PrestamoRequest):
+async def realizar_prestamo(prestamo_req: PrestamoRequest):
     try:
-        prestamo = biblioteca.prestar_libro(prestamo_req.lector_id, prestamo_req.copia_id)
+        prestamo = await servicio.prestar_libro(prestamo_req.lector_id, prestamo_req.copia_id)
         return {
             "mensaje": "Préstamo realizado exitosamente",
             "fecha_devolucion": prestamo.fecha_devolucion_esperada.isoformat()
@@ -112,45 +256,229 @@ def realizar_prestamo(prestamo_req: PrestamoRequest):
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@app.get("/prestamos/vencidos")
+async def obtener_prestamos_vencidos(limite: int = LIMITE_PAGINA, cursor: Optional[str] = None):
+    ahora = biblioteca.reloj.ahora()
+    try:
+        prestamos, siguiente = await servicio.paginar_prestamos_vencidos(limite, cursor, ahora)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "cantidad": len(prestamos),
+        "prestamos": [
+            {
+                "lector_id": lector_id,
+                "copia_id": p.copia.id,
+                "libro_id": p.copia.libro.id,
+                "fecha_prestamo": p.fecha_prestamo.isoformat(),
+                "fecha_devolucion_esperada": p.fecha_devolucion_esperada.isoformat(),
+                "dias_retraso": (ahora - p.fecha_devolucion_esperada).days
+            }
+            for p, lector_id in prestamos
+        ],
+        "siguiente_cursor": siguiente
+    }
+
+
 @app.post("/devoluciones/")
-def realizar_devolucion(devolucion_req: DevolucionRequest):
+async def realizar_devolucion(devolucion_req: DevolucionRequest):
     try:
-        resultado = biblioteca.devolver_libro(devolucion_req.lector_id, devolucion_req.copia_id)
+        resultado = await servicio.devolver_libro(devolucion_req.lector_id, devolucion_req.copia_id)
         return {
             "mensaje": "Devolución realizada exitosamente",
             "dias_retraso": resultado["dias_retraso"],
             "multa_dias": resultado["multa_aplicada"],
-            "notificaciones_enviadas": len(resultado["emails_notificados"])
+            "notificaciones_enviadas": len(resultado["emails_notificados"]),
+            "notificacion_encolada": resultado["notificacion_encolada"],
+            "reservada_para": resultado["reservada_para"]
         }
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@app.post("/prestamos/lote")
+async def realizar_prestamos_lote(lote_req: PrestamoLoteRequest):
+    resultados = await servicio.prestar_lote([(item.lector_id, item.copia_id) for item in lote_req.items])
+    items = []
+    for resultado in resultados:
+        item = {"lector_id": resultado["lector_id"], "copia_id": resultado["copia_id"], "exito": "error" not in resultado}
+        if item["exito"]:
+            item["fecha_devolucion"] = resultado["prestamo"].fecha_devolucion_esperada.isoformat()
+        else:
+            item["error"] = resultado["error"]
+        items.append(item)
+    return {"prestamos_realizados": sum(1 for item in items if item["exito"]), "resultados": items}
+
+
+@app.post("/devoluciones/lote")
+async def realizar_devoluciones_lote(lote_req: DevolucionLoteRequest):
+    lote = await servicio.devolver_lote([(item.lector_id, item.copia_id) for item in lote_req.items])
+    items = []
+    for resultado in lote["resultados"]:
+        item = {"lector_id": resultado["lector_id"], "copia_id": resultado["copia_id"], "exito": "error" not in resultado}
+        if item["exito"]:
+            item["dias_retraso"] = resultado["dias_retraso"]
+            item["multa_dias"] = resultado["multa_aplicada"]
+        else:
+            item["error"] = resultado["error"]
+        items.append(item)
+    return {
+        "devoluciones_realizadas": sum(1 for item in items if item["exito"]),
+        "resultados": items,
+        "notificaciones_enviadas": {libro_id: len(emails) for libro_id, emails in lote["notificaciones"].items()}
+    }
+
+
 @app.post("/suscripciones/")
-def crear_suscripcion(suscripcion_req: SuscripcionRequest):
+async def crear_suscripcion(suscripcion_req: SuscripcionRequest):
     try:
-        biblioteca.suscribir_lector(suscripcion_req.lector_id, suscripcion_req.libro_id)
-        return {"mensaje": "Suscripción realizada exitosamente en BioAlert"}
+        nueva = await servicio.suscribir_lector(suscripcion_req.lector_id, suscripcion_req.libro_id)
+        return {"mensaje": "Suscripción realizada exitosamente en BioAlert", "nueva": nueva}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@app.delete("/suscripciones/{lector_id}/{libro_id}")
+async def eliminar_suscripcion(lector_id: str, libro_id: str):
+    if not await servicio.desuscribir_lector(lector_id, libro_id):
+        raise HTTPException(status_code=404, detail="Suscripción no encontrada")
+    return {"mensaje": "Suscripción eliminada de BioAlert"}
+
+
+@app.post("/reservas/")
+async def crear_reserva(reserva_req: ReservaRequest):
+    try:
+        reserva = await servicio.reservar_libro(reserva_req.lector_id, reserva_req.libro_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "mensaje": "Reserva registrada exitosamente",
+        "lector_id": reserva.lector_id,
+        "libro_id": reserva.libro_id,
+        "prioridad": reserva.prioridad,
+        "fecha_reserva": reserva.fecha_reserva.isoformat()
+    }
+
+
+@app.get("/reservas/{libro_id}")
+async def obtener_reservas(libro_id: str):
+    try:
+        pendientes = await servicio.reservas_pendientes(libro_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {
+        "libro_id": libro_id,
+        "pendientes": [
+            {"lector_id": r.lector_id, "prioridad": r.prioridad, "fecha_reserva": r.fecha_reserva.isoformat()}
+            for r in pendientes
+        ]
+    }
+
+
+@app.delete("/reservas/{lector_id}/{libro_id}")
+async def eliminar_reserva(lector_id: str, libro_id: str):
+    if not await servicio.cancelar_reserva(lector_id, libro_id):
+        raise HTTPException(status_code=404, detail="Reserva no encontrada")
+    return {"mensaje": "Reserva cancelada"}
+
+
 @app.get("/lectores/{lector_id}")
-def obtener_lector(lector_id: str):
-    if lector_id not in biblioteca.lectores:
-        raise HTTPException(status_code=404, detail="Lector no encontrado")
-    
-    lector = biblioteca.lectores[lector_id]
+async def obtener_lector(request: Request, lector_id: str):
+    async def construir():
+        lector = await servicio.obtener_lector(lector_id)
+        if lector is None:
+            raise HTTPException(status_code=404, detail="Lector no encontrado")
+
+        return {
+            "id": lector.id,
+            "nombre": lector.nombre,
+            "email": lector.email,
+            "prestamos_activos": len(lector.prestamos_activos),
+            "suspendido": lector.esta_suspendido(hoy),
+            "fecha_fin_suspension": lector.fecha_fin_suspension.isoformat() if lector.fecha_fin_suspension else None
+        }
+
+    hoy = biblioteca.reloj.hoy()
+    etag = _etag(biblioteca.epoca, biblioteca.version("lector", lector_id), hoy.isoformat())
+    return await _respuesta_condicional(request, ("lector", lector_id), etag, construir)
+
+
+async def _lineas(request: Request):
+    resto = b""
+    async for fragmento in request.stream():
+        resto += fragmento
+        *lineas, resto = resto.split(b"\n")
+        for linea in lineas:
+            yield linea
+    if resto:
+        yield resto
+
+
+@app.post("/importar/")
+async def importar(request: Request):
+    importador = ImportadorNDJSON(biblioteca)
+    lote = []
+    numero = 0
+    async for linea in _lineas(request):
+        numero += 1
+        if not linea.strip():
+            continue
+        lote.append((numero, linea))
+        if len(lote) >= importador.tam_lote:
+            await run_in_threadpool(importador.procesar_lote, lote)
+            lote = []
+    if lote:
+        await run_in_threadpool(importador.procesar_lote, lote)
+    return importador.resultado()
+
+
+@app.get("/estadisticas/libros-mas-prestados")
+async def obtener_libros_mas_prestados(
+    limite: int = 10,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None
+):
+    try:
+        ranking = await servicio.libros_mas_prestados(limite, desde, hasta)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return {
-        "id": lector.id,
-        "nombre": lector.nombre,
-        "email": lector.email,
-        "prestamos_activos": len(lector.prestamos_activos),
-        "suspendido": lector.esta_suspendido(),
-        "fecha_fin_suspension": lector.fecha_fin_suspension.isoformat() if lector.fecha_fin_suspension else None
+        "libros": [
+            {"id": libro.id, "nombre": libro.nombre, "autor": libro.autor.nombre, "prestamos": prestamos}
+            for libro, prestamos in ranking
+        ]
     }
 
 
+@app.get("/estadisticas/autores")
+async def obtener_autores_mas_prestados(limite: int = 10):
+    try:
+        return {"autores": await servicio.autores_mas_prestados(limite)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/estadisticas/autores/{nombre_autor}")
+async def obtener_circulacion_autor(nombre_autor: str):
+    circulacion = await servicio.circulacion_autor(nombre_autor)
+    if circulacion is None:
+        raise HTTPException(status_code=404, detail="Autor sin préstamos registrados")
+    return circulacion
+
+
+@app.get("/estadisticas/circulacion")
+async def obtener_resumen_circulacion():
+    return await servicio.resumen_circulacion()
+
+
+@app.get("/metrics")
+async def metricas():
+    lineas = metricas_http.exponer()
+    if not SERVIDOR_ESTADO:
+        lineas += biblioteca.metricas.exponer(biblioteca.despachador, biblioteca.reloj.hoy())
+    return Response("\n".join(lineas) + "\n", media_type=TIPO_CONTENIDO)
+
+
 @app.get("/")
-def root():
+async def root():
     return {"mensaje": "Sistema de Biblioteca API - Activo"}
\ No newline at end of file
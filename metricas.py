@@ -0,0 +1,214 @@
+import heapq
+import threading
+import time
+from bisect import bisect_left
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from models import EstadoCopia, Lector
+
+LIMITES_LATENCIA = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TIPO_CONTENIDO = "text/plain; version=0.0.4; charset=utf-8"
+RUTA_DESCONOCIDA = "desconocida"
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas(**etiquetas) -> str:
+    pares = ",".join(f'{nombre}="{_escapar(valor)}"' for nombre, valor in etiquetas.items())
+    return "{" + pares + "}" if pares else ""
+
+
+def _encabezado(nombre: str, tipo: str, ayuda: str) -> List[str]:
+    return [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} {tipo}"]
+
+
+class Histograma:
+    __slots__ = ("limites", "cuentas", "suma", "total")
+
+    def __init__(self, limites: Tuple[float, ...] = LIMITES_LATENCIA):
+        self.limites = limites
+        self.cuentas = [0] * (len(limites) + 1)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float):
+        self.cuentas[bisect_left(self.limites, valor)] += 1
+        self.suma += valor
+        self.total += 1
+
+    def lineas(self, nombre: str, **etiquetas) -> Iterable[str]:
+        acumulado = 0
+        for limite, cuenta in zip(self.limites, self.cuentas):
+            acumulado += cuenta
+            yield f"{nombre}_bucket{_etiquetas(**etiquetas, le=limite)} {acumulado}"
+        yield f"{nombre}_bucket{_etiquetas(**etiquetas, le='+Inf')} {self.total}"
+        yield f"{nombre}_sum{_etiquetas(**etiquetas)} {self.suma}"
+        yield f"{nombre}_count{_etiquetas(**etiquetas)} {self.total}"
+
+
+class MetricasHTTP:
+    def __init__(self):
+        self.latencias: Dict[Tuple[str, str], Histograma] = {}
+        self.respuestas: Dict[Tuple[str, str, int], int] = {}
+
+    def observar(self, metodo: str, ruta: str, estado: int, segundos: float):
+        clave = (metodo, ruta)
+        histograma = self.latencias.get(clave)
+        if histograma is None:
+            histograma = self.latencias[clave] = Histograma()
+        histograma.observar(segundos)
+        clave_estado = (metodo, ruta, estado)
+        self.respuestas[clave_estado] = self.respuestas.get(clave_estado, 0) + 1
+
+    def exponer(self) -> List[str]:
+        lineas = _encabezado(
+            "biblioteca_peticiones_segundos", "histogram", "Latencia de las peticiones HTTP por ruta"
+        )
+        for (metodo, ruta), histograma in sorted(self.latencias.items()):
+            lineas.extend(histograma.lineas("biblioteca_peticiones_segundos", metodo=metodo, ruta=ruta))
+        lineas += _encabezado("biblioteca_peticiones_total", "counter", "Peticiones HTTP por ruta y código de estado")
+        for (metodo, ruta, estado), cantidad in sorted(self.respuestas.items()):
+            lineas.append(f"biblioteca_peticiones_total{_etiquetas(metodo=metodo, ruta=ruta, estado=estado)} {cantidad}")
+        return lineas
+
+
+class MiddlewareMetricas:
+    def __init__(self, app, metricas: MetricasHTTP):
+        self.app = app
+        self.metricas = metricas
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        estado = 500
+
+        async def enviar(mensaje):
+            nonlocal estado
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+            await send(mensaje)
+
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            ruta = scope.get("route")
+            self.metricas.observar(
+                scope["method"],
+                ruta.path if ruta is not None else RUTA_DESCONOCIDA,
+                estado,
+                time.perf_counter() - inicio
+            )
+
+
+class MetricasBiblioteca:
+    def __init__(self):
+        self.prestamos = 0
+        self.devoluciones = 0
+        self.notificaciones = 0
+        self.rechazos: Dict[Tuple[str, str], int] = {}
+        self.prestamos_activos = 0
+        self.copias: Dict[EstadoCopia, int] = {estado: 0 for estado in EstadoCopia}
+        self._suspensiones: Dict[date, int] = {}
+        self._fechas_suspension: List[date] = []
+        self._suspendidos = 0
+        self._lock = threading.Lock()
+
+    def reiniciar_contadores(self):
+        with self._lock:
+            self.prestamos = 0
+            self.devoluciones = 0
+            self.notificaciones = 0
+            self.rechazos = {}
+
+    def prestamo(self, estado_anterior: EstadoCopia = EstadoCopia.DISPONIBLE):
+        with self._lock:
+            self.prestamos += 1
+            self.prestamos_activos += 1
+            self.copias[estado_anterior] -= 1
+            self.copias[EstadoCopia.PRESTADA] += 1
+
+    def devolucion(self, estado_anterior: EstadoCopia, nuevo_estado: EstadoCopia = EstadoCopia.DISPONIBLE):
+        with self._lock:
+            self.devoluciones += 1
+            self.prestamos_activos -= 1
+            self.copias[estado_anterior] -= 1
+            self.copias[nuevo_estado] += 1
+
+    def rechazo(self, operacion: str, motivo: str):
+        clave = (operacion, motivo)
+        with self._lock:
+            self.rechazos[clave] = self.rechazos.get(clave, 0) + 1
+
+    def notificadas(self, cantidad: int):
+        if cantidad:
+            with self._lock:
+                self.notificaciones += cantidad
+
+    def copia(self, anterior: Optional[EstadoCopia], nuevo: Optional[EstadoCopia]):
+        with self._lock:
+            if anterior is not None:
+                self.copias[anterior] -= 1
+            if nuevo is not None:
+                self.copias[nuevo] += 1
+
+    def lector(self, anterior: Optional[Lector], nuevo: Lector):
+        with self._lock:
+            if anterior is not None:
+                self.prestamos_activos -= len(anterior.prestamos_activos)
+                self._mover_suspension(anterior.fecha_fin_suspension, None)
+            self.prestamos_activos += len(nuevo.prestamos_activos)
+            self._mover_suspension(None, nuevo.fecha_fin_suspension)
+
+    def suspension(self, anterior: Optional[date], nueva: Optional[date]):
+        if anterior != nueva:
+            with self._lock:
+                self._mover_suspension(anterior, nueva)
+
+    def _mover_suspension(self, anterior: Optional[date], nueva: Optional[date]):
+        if anterior is not None and anterior in self._suspensiones:
+            self._suspensiones[anterior] -= 1
+            self._suspendidos -= 1
+        if nueva is not None:
+            if nueva not in self._suspensiones:
+                self._suspensiones[nueva] = 0
+                heapq.heappush(self._fechas_suspension, nueva)
+            self._suspensiones[nueva] += 1
+            self._suspendidos += 1
+
+    def lectores_suspendidos(self, hoy: Optional[date] = None) -> int:
+        hoy = hoy or date.today()
+        with self._lock:
+            while self._fechas_suspension and self._fechas_suspension[0] < hoy:
+                self._suspendidos -= self._suspensiones.pop(heapq.heappop(self._fechas_suspension))
+            return self._suspendidos
+
+    def exponer(self, despachador=None, hoy: Optional[date] = None) -> List[str]:
+        enviadas = self.notificaciones
+        fallidas = 0
+        if despachador is not None:
+            enviadas += despachador.estadisticas["enviadas"]
+            fallidas = despachador.estadisticas["fallidas"]
+        lineas = _encabezado("biblioteca_prestamos_total", "counter", "Préstamos realizados")
+        lineas.append(f"biblioteca_prestamos_total {self.prestamos}")
+        lineas += _encabezado("biblioteca_devoluciones_total", "counter", "Devoluciones realizadas")
+        lineas.append(f"biblioteca_devoluciones_total {self.devoluciones}")
+        lineas += _encabezado("biblioteca_rechazos_total", "counter", "Operaciones rechazadas por motivo")
+        for (operacion, motivo), cantidad in sorted(self.rechazos.items()):
+            lineas.append(f"biblioteca_rechazos_total{_etiquetas(operacion=operacion, motivo=motivo)} {cantidad}")
+        lineas += _encabezado("biblioteca_notificaciones_enviadas_total", "counter", "Avisos de BioAlert enviados")
+        lineas.append(f"biblioteca_notificaciones_enviadas_total {enviadas}")
+        lineas += _encabezado("biblioteca_notificaciones_fallidas_total", "counter", "Avisos de BioAlert descartados")
+        lineas.append(f"biblioteca_notificaciones_fallidas_total {fallidas}")
+        lineas += _encabezado("biblioteca_prestamos_activos", "gauge", "Préstamos sin devolver")
+        lineas.append(f"biblioteca_prestamos_activos {self.prestamos_activos}")
+        lineas += _encabezado("biblioteca_lectores_suspendidos", "gauge", "Lectores con suspensión vigente")
+        lineas.append(f"biblioteca_lectores_suspendidos {self.lectores_suspendidos(hoy)}")
+        lineas += _encabezado("biblioteca_copias", "gauge", "Copias por estado")
+        for estado, cantidad in self.copias.items():
+            lineas.append(f"biblioteca_copias{_etiquetas(estado=estado.value)} {cantidad}")
+        return lineas
@@ -1,7 +1,9 @@
+import threading
+from dataclasses import dataclass, field
 from datetime import datetime, date, timedelta
 from enum import Enum
+from itertools import islice
 from typing import List, Optional, Dict
-from pydantic import BaseModel, Field
 
 
 class EstadoCopia(str, Enum):
@@ -12,108 +14,151 @@ class EstadoCopia(str, Enum):
     EN_REPARACION = "en_reparacion"
 
 
-class Autor(BaseModel):
+@dataclass(slots=True, weakref_slot=True)
+class Autor:
     nombre: str
     fecha_nacimiento: date
+    id: Optional[str] = field(default=None, compare=False)
 
 
-class Libro(BaseModel):
+@dataclass(slots=True, weakref_slot=True)
+class Libro:
     nombre: str
     anio: int
     autor: Autor
     id: Optional[str] = None
 
-    def __init__(self, **data):
-        super().__init__(**data)
+    def __post_init__(self):
         if self.id is None:
             self.id = f"{self.nombre}_{self.autor.nombre}_{self.anio}".replace(" ", "_")
 
 
-class Copia(BaseModel):
+@dataclass(slots=True, weakref_slot=True)
+class Copia:
     id: str
     libro: Libro
     estado: EstadoCopia = EstadoCopia.DISPONIBLE
 
 
-class Prestamo(BaseModel):
+@dataclass(slots=True, weakref_slot=True)
+class Prestamo:
     copia: Copia
     fecha_prestamo: datetime
     fecha_devolucion_esperada: datetime
     fecha_devolucion_real: Optional[datetime] = None
 
-    def calcular_dias_retraso(self) -> int:
-        fecha_comparacion = self.fecha_devolucion_real or datetime.now()
+    def calcular_dias_retraso(self, ahora: Optional[datetime] = None) -> int:
+        fecha_comparacion = self.fecha_devolucion_real or ahora or datetime.now()
         if fecha_comparacion > self.fecha_devolucion_esperada:
             return (fecha_comparacion - self.fecha_devolucion_esperada).days
         return 0
 
-    def esta_retrasado(self) -> bool:
-        return self.calcular_dias_retraso() > 0
+    def esta_retrasado(self, ahora: Optional[datetime] = None) -> bool:
+        return self.calcular_dias_retraso(ahora) > 0
 
 
-class Lector(BaseModel):
+@dataclass(slots=True, weakref_slot=True)
+class Lector:
     id: str
     nombre: str
     email: str
-    prestamos_activos: List[Prestamo] = Field(default_factory=list)
+    prestamos_activos: List[Prestamo] = field(default_factory=list)
     dias_suspension: int = 0
     fecha_fin_suspension: Optional[date] = None
 
-    def puede_prestar(self) -> bool:
-        if self.esta_suspendido():
+    def puede_prestar(self, hoy: Optional[date] = None) -> bool:
+        if self.esta_suspendido(hoy):
             return False
         return len(self.prestamos_activos) < 3
 
-    def esta_suspendido(self) -> bool:
+    def esta_suspendido(self, hoy: Optional[date] = None) -> bool:
         if self.fecha_fin_suspension is None:
             return False
-        return date.today() <= self.fecha_fin_suspension
+        return (hoy or date.today()) <= self.fecha_fin_suspension
 
-    def aplicar_multa(self, dias_retraso: int):
+    def aplicar_multa(self, dias_retraso: int, hoy: Optional[date] = None):
         dias_multa = dias_retraso * 2
         self.dias_suspension += dias_multa
         if self.fecha_fin_suspension is None:
-            self.fecha_fin_suspension = date.today() + timedelta(days=dias_multa)
+            self.fecha_fin_suspension = (hoy or date.today()) + timedelta(days=dias_multa)
         else:
             self.fecha_fin_suspension += timedelta(days=dias_multa)
 
 
-class Suscripcion(BaseModel):
+@dataclass(slots=True)
+class Suscripcion:
     lector: Lector
     libro_id: str
-    fecha_suscripcion: datetime = Field(default_factory=datetime.now)
+    fecha_suscripcion: datetime = field(default_factory=datetime.now)
+
+
+@dataclass(slots=True)
+class Reserva:
+    lector_id: str
+    libro_id: str
+    fecha_reserva: datetime
+    prioridad: int = 0
+    copia_id: Optional[str] = None
+    fecha_vencimiento: Optional[datetime] = None
 
 
 class BioAlert:
     _instance = None
-    _suscripciones: Dict[str, List[Suscripcion]] = {}
+    _suscripciones: Dict[str, Dict[str, Suscripcion]] = {}
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(BioAlert, cls).__new__(cls)
             cls._instance._suscripciones = {}
+            cls._instance._lock = threading.Lock()
         return cls._instance
 
-    def suscribir(self, lector: Lector, libro_id: str):
-        if libro_id not in self._suscripciones:
-            self._suscripciones[libro_id] = []
-        
-        suscripcion = Suscripcion(lector=lector, libro_id=libro_id)
-        self._suscripciones[libro_id].append(suscripcion)
-
-    def notificar_disponibilidad(self, libro_id: str) -> List[str]:
-        if libro_id not in self._suscripciones:
-            return []
-        
-        emails_notificados = []
-        for suscripcion in self._suscripciones[libro_id]:
-            emails_notificados.append(suscripcion.lector.email)
-        
-        return emails_notificados
+    def suscribir(self, lector: Lector, libro_id: str, fecha: Optional[datetime] = None) -> bool:
+        with self._lock:
+            suscriptores = self._suscripciones.setdefault(libro_id, {})
+            if lector.id in suscriptores:
+                return False
+            suscriptores[lector.id] = Suscripcion(
+                lector=lector, libro_id=libro_id, fecha_suscripcion=fecha or datetime.now()
+            )
+            return True
+
+    def desuscribir(self, lector_id: str, libro_id: str) -> bool:
+        with self._lock:
+            suscriptores = self._suscripciones.get(libro_id)
+            if not suscriptores or suscriptores.pop(lector_id, None) is None:
+                return False
+            if not suscriptores:
+                del self._suscripciones[libro_id]
+            return True
+
+    def esta_suscrito(self, lector_id: str, libro_id: str) -> bool:
+        return lector_id in self._suscripciones.get(libro_id, ())
+
+    def contar_suscripciones(self, libro_id: str) -> int:
+        return len(self._suscripciones.get(libro_id, ()))
+
+    def retirar_suscriptores(self, libro_id: str, limite: Optional[int] = None) -> List[Suscripcion]:
+        with self._lock:
+            suscriptores = self._suscripciones.get(libro_id)
+            if not suscriptores:
+                return []
+            if limite is None or limite >= len(suscriptores):
+                del self._suscripciones[libro_id]
+                return list(suscriptores.values())
+            notificados = list(islice(suscriptores, limite))
+            return [suscriptores.pop(lector_id) for lector_id in notificados]
+
+    def notificar_disponibilidad(self, libro_id: str, limite: Optional[int] = None) -> List[str]:
+        return [suscripcion.lector.email for suscripcion in self.retirar_suscriptores(libro_id, limite)]
 
     def obtener_suscripciones(self, libro_id: str) -> List[Suscripcion]:
-        return self._suscripciones.get(libro_id, [])
+        return list(self._suscripciones.get(libro_id, {}).values())
+
+    def todas_las_suscripciones(self) -> List[Suscripcion]:
+        with self._lock:
+            return [s for suscriptores in self._suscripciones.values() for s in suscriptores.values()]
 
     def limpiar_suscripciones(self, libro_id: str):
-        if libro_id in self._suscripciones:
-            del self._suscripciones[libro_id]
\ No newline at end of file
+        with self._lock:
+            self._suscripciones.pop(libro_id, None)
@@ -0,0 +1,184 @@
+import heapq
+import logging
+import queue
+import random
+import smtplib
+import threading
+import time
+from abc import ABC, abstractmethod
+from email.message import EmailMessage
+from typing import Dict, List, Optional, Tuple
+
+from models import BioAlert
+
+ASUNTO = "BioAlert: libro disponible"
+
+logger = logging.getLogger(__name__)
+
+
+class Transporte(ABC):
+    @abstractmethod
+    def enviar(self, destinatario: str, asunto: str, cuerpo: str):
+        ...
+
+
+class TransporteSMTP(Transporte):
+    def __init__(self, host: str, puerto: int = 25, remitente: str = "bioalert@biblioteca.local", timeout: float = 10):
+        self.host = host
+        self.puerto = puerto
+        self.remitente = remitente
+        self.timeout = timeout
+
+    def enviar(self, destinatario: str, asunto: str, cuerpo: str):
+        mensaje = EmailMessage()
+        mensaje["From"] = self.remitente
+        mensaje["To"] = destinatario
+        mensaje["Subject"] = asunto
+        mensaje.set_content(cuerpo)
+        with smtplib.SMTP(self.host, self.puerto, timeout=self.timeout) as smtp:
+            smtp.send_message(mensaje)
+
+
+class TransporteMemoria(Transporte):
+    def __init__(self, fallos: int = 0):
+        self.enviados: List[Tuple[str, str, str]] = []
+        self._fallos = fallos
+        self._lock = threading.Lock()
+
+    def enviar(self, destinatario: str, asunto: str, cuerpo: str):
+        with self._lock:
+            if self._fallos > 0:
+                self._fallos -= 1
+                raise ConnectionError("Fallo simulado del transporte")
+            self.enviados.append((destinatario, asunto, cuerpo))
+
+
+class DespachadorNotificaciones:
+    def __init__(
+        self,
+        transporte: Transporte,
+        bio_alert: Optional[BioAlert] = None,
+        trabajadores: int = 4,
+        max_intentos: int = 5,
+        espera_inicial: float = 0.5,
+        espera_maxima: float = 60.0
+    ):
+        self.transporte = transporte
+        self.bio_alert = bio_alert or BioAlert()
+        self.max_intentos = max_intentos
+        self.espera_inicial = espera_inicial
+        self.espera_maxima = espera_maxima
+        self.estadisticas: Dict[str, int] = {"enviadas": 0, "reintentos": 0, "fallidas": 0}
+        self._cola: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._libros_pendientes: Dict[str, Optional[int]] = {}
+        self._reintentos: List[Tuple[float, int, tuple]] = []
+        self._secuencia = 0
+        self._en_curso = 0
+        self._condicion = threading.Condition()
+        self._cerrado = False
+        self._hilos = [
+            threading.Thread(target=self._trabajar, name=f"bioalert-{i}", daemon=True)
+            for i in range(trabajadores)
+        ]
+        self._hilos.append(threading.Thread(target=self._programar_reintentos, name="bioalert-reintentos", daemon=True))
+        for hilo in self._hilos:
+            hilo.start()
+
+    def encolar(self, libro_id: str, limite: Optional[int] = None):
+        with self._condicion:
+            if self._cerrado:
+                return
+            if libro_id in self._libros_pendientes:
+                actual = self._libros_pendientes[libro_id]
+                self._libros_pendientes[libro_id] = None if actual is None or limite is None else actual + limite
+                return
+            self._libros_pendientes[libro_id] = limite
+            self._en_curso += 1
+        self._cola.put(("libro", libro_id))
+
+    def encolar_envio(self, email: str, libro_id: str):
+        with self._condicion:
+            if self._cerrado:
+                return
+            self._en_curso += 1
+        self._cola.put(("envio", email, libro_id, 1))
+
+    def _trabajar(self):
+        while True:
+            tarea = self._cola.get()
+            if tarea is None:
+                return
+            try:
+                if tarea[0] == "libro":
+                    self._resolver(tarea[1])
+                else:
+                    self._entregar(*tarea[1:])
+            except Exception:
+                logger.exception("Error procesando notificación %s", tarea)
+
+    def _resolver(self, libro_id: str):
+        with self._condicion:
+            limite = self._libros_pendientes.pop(libro_id, None)
+        emails: List[str] = []
+        try:
+            emails = self.bio_alert.notificar_disponibilidad(libro_id, limite)
+        finally:
+            with self._condicion:
+                self._en_curso += len(emails) - 1
+                self._condicion.notify_all()
+        for email in emails:
+            self._cola.put(("envio", email, libro_id, 1))
+
+    def _entregar(self, email: str, libro_id: str, intento: int):
+        try:
+            self.transporte.enviar(email, ASUNTO, f"El libro {libro_id} tiene copias disponibles.")
+        except Exception:
+            with self._condicion:
+                if intento < self.max_intentos:
+                    self.estadisticas["reintentos"] += 1
+                    espera = min(self.espera_maxima, self.espera_inicial * 2 ** (intento - 1))
+                    self._secuencia += 1
+                    heapq.heappush(self._reintentos, (
+                        time.monotonic() + random.uniform(espera / 2, espera),
+                        self._secuencia,
+                        ("envio", email, libro_id, intento + 1)
+                    ))
+                else:
+                    self.estadisticas["fallidas"] += 1
+                    self._en_curso -= 1
+                self._condicion.notify_all()
+            return
+        with self._condicion:
+            self.estadisticas["enviadas"] += 1
+            self._en_curso -= 1
+            self._condicion.notify_all()
+
+    def _programar_reintentos(self):
+        with self._condicion:
+            while not self._cerrado:
+                if not self._reintentos:
+                    self._condicion.wait()
+                    continue
+                momento = self._reintentos[0][0]
+                ahora = time.monotonic()
+                if momento > ahora:
+                    self._condicion.wait(momento - ahora)
+                    continue
+                _, _, tarea = heapq.heappop(self._reintentos)
+                self._cola.put(tarea)
+
+    def esperar(self):
+        with self._condicion:
+            while self._en_curso:
+                self._condicion.wait()
+
+    def cerrar(self, esperar: bool = True):
+        if esperar:
+            self.esperar()
+        with self._condicion:
+            self._cerrado = True
+            self._condicion.notify_all()
+        for _ in range(len(self._hilos) - 1):
+            self._cola.put(None)
+        for hilo in self._hilos:
+            hilo.join()
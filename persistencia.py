@@ -0,0 +1,314 @@
+import json
+import os
+import threading
+import time
+from datetime import date, datetime
+from json.encoder import c_make_encoder, encode_basestring_ascii
+from typing import Iterator, List, Tuple
+
+from models import Lector, Prestamo, Reserva
+from service import BibliotecaService
+
+ARCHIVO_INSTANTANEA = "instantanea.json"
+PREFIJO_SEGMENTO = "eventos-"
+SUFIJO_SEGMENTO = ".log"
+EVENTOS_POR_INSTANTANEA = 100_000
+
+_codificador = json.JSONEncoder(separators=(",", ":"))
+if c_make_encoder is not None:
+    _iterar_json = c_make_encoder(None, _codificador.default, encode_basestring_ascii, None, ":", ",", False, False, True)
+
+    def _codificar(evento: dict) -> str:
+        return "".join(_iterar_json(evento, 0))
+else:
+    _codificar = _codificador.encode
+
+
+def _nombre_segmento(seq_inicio: int) -> str:
+    return f"{PREFIJO_SEGMENTO}{seq_inicio:020d}{SUFIJO_SEGMENTO}"
+
+
+def _segmentos(directorio: str) -> List[str]:
+    nombres = sorted(
+        nombre for nombre in os.listdir(directorio)
+        if nombre.startswith(PREFIJO_SEGMENTO) and nombre.endswith(SUFIJO_SEGMENTO)
+    )
+    return [os.path.join(directorio, nombre) for nombre in nombres]
+
+
+def _sincronizar_directorio(directorio: str):
+    descriptor = os.open(directorio, os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+class RegistroEventos:
+    def __init__(
+        self,
+        directorio: str,
+        seq_inicial: int = 0,
+        intervalo_fsync: float = 0.005,
+        eventos_por_instantanea: int = EVENTOS_POR_INSTANTANEA,
+        durable: bool = False
+    ):
+        os.makedirs(directorio, exist_ok=True)
+        self.directorio = directorio
+        self.intervalo_fsync = intervalo_fsync
+        self.eventos_por_instantanea = eventos_por_instantanea
+        self.durable = durable
+        self._seq = seq_inicial
+        self._seq_escrito = seq_inicial
+        self._eventos_desde_instantanea = 0
+        self._pendientes: List[Tuple[int, dict]] = []
+        lock = threading.RLock()
+        self._condicion = threading.Condition(lock)
+        self._hay_pendientes = threading.Condition(lock)
+        self._hay_esperas = threading.Condition(lock)
+        self._esperando = 0
+        self._lock_archivo = threading.Lock()
+        self._cerrado = False
+        self._archivo = open(os.path.join(directorio, _nombre_segmento(seq_inicial + 1)), "a", encoding="utf-8")
+        self._hilo = threading.Thread(target=self._escribir_en_lotes, name="registro-eventos", daemon=True)
+        self._hilo.start()
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    def registrar(self, evento: dict) -> int:
+        with self._condicion:
+            if self._cerrado:
+                raise ValueError("Registro de eventos cerrado")
+            self._seq += 1
+            seq = self._seq
+            self._pendientes.append((seq, evento))
+            self._eventos_desde_instantanea += 1
+            if len(self._pendientes) == 1:
+                self._hay_pendientes.notify()
+        return seq
+
+    def esperar(self, seq: int):
+        with self._condicion:
+            if self._seq_escrito >= seq:
+                return
+            self._esperando += 1
+            self._hay_esperas.notify()
+            try:
+                while self._seq_escrito < seq:
+                    self._condicion.wait()
+            finally:
+                self._esperando -= 1
+
+    def requiere_instantanea(self) -> bool:
+        return self._eventos_desde_instantanea >= self.eventos_por_instantanea
+
+    def _escribir_en_lotes(self):
+        while True:
+            with self._condicion:
+                while not self._pendientes and not self._cerrado:
+                    self._hay_pendientes.wait()
+                if not self._pendientes:
+                    return
+            inicio = time.monotonic()
+            self._volcar()
+            with self._condicion:
+                restante = self.intervalo_fsync - (time.monotonic() - inicio)
+                if restante > 0 and not self._cerrado and not self._esperando:
+                    self._hay_esperas.wait(restante)
+
+    def _volcar(self):
+        with self._lock_archivo:
+            with self._condicion:
+                lote, self._pendientes = self._pendientes, []
+                hasta = self._seq
+            if lote:
+                self._escribir(lote)
+                self._archivo.flush()
+                os.fsync(self._archivo.fileno())
+            with self._condicion:
+                self._seq_escrito = max(self._seq_escrito, hasta)
+                self._condicion.notify_all()
+
+    def _escribir(self, lote: List[Tuple[int, dict]]):
+        self._archivo.write("".join(f'{{"seq":{seq},{_codificar(evento)[1:]}\n' for seq, evento in lote))
+
+    def guardar_instantanea(self, service: BibliotecaService):
+        with self._lock_archivo:
+            with self._condicion:
+                lote, self._pendientes = self._pendientes, []
+                seq = self._seq
+                self._eventos_desde_instantanea = 0
+            if lote:
+                self._escribir(lote)
+            self._archivo.flush()
+            os.fsync(self._archivo.fileno())
+            self._archivo.close()
+            nuevo_segmento = os.path.join(self.directorio, _nombre_segmento(seq + 1))
+            self._archivo = open(nuevo_segmento, "a", encoding="utf-8")
+
+            ruta = os.path.join(self.directorio, ARCHIVO_INSTANTANEA)
+            temporal = ruta + ".tmp"
+            with open(temporal, "w", encoding="utf-8") as archivo:
+                json.dump(instantanea(service, seq), archivo, separators=(",", ":"))
+                archivo.flush()
+                os.fsync(archivo.fileno())
+            os.replace(temporal, ruta)
+            _sincronizar_directorio(self.directorio)
+
+            for segmento in _segmentos(self.directorio):
+                if segmento != nuevo_segmento:
+                    os.remove(segmento)
+            with self._condicion:
+                self._seq_escrito = max(self._seq_escrito, seq)
+                self._condicion.notify_all()
+
+    def cerrar(self):
+        with self._condicion:
+            self._cerrado = True
+            self._hay_pendientes.notify()
+            self._hay_esperas.notify()
+        self._hilo.join()
+        with self._lock_archivo:
+            self._archivo.close()
+
+
+def instantanea(service: BibliotecaService, seq: int) -> dict:
+    suscripciones = [
+        {"lector_id": s.lector.id, "libro_id": s.libro_id, "fecha": s.fecha_suscripcion.isoformat()}
+        for s in service.bio_alert.todas_las_suscripciones()
+    ]
+    return {
+        "seq": seq,
+        "libros": [
+            {
+                "id": libro.id,
+                "nombre": libro.nombre,
+                "anio": libro.anio,
+                "autor_nombre": libro.autor.nombre,
+                "autor_fecha_nacimiento": libro.autor.fecha_nacimiento.isoformat()
+            }
+            for libro in service.libros.values()
+        ],
+        "copias": [
+            {"id": copia.id, "libro_id": copia.libro.id, "estado": copia.estado.value}
+            for copia in service.copias.values()
+        ],
+        "lectores": [
+            {
+                "id": lector.id,
+                "nombre": lector.nombre,
+                "email": lector.email,
+                "dias_suspension": lector.dias_suspension,
+                "fecha_fin_suspension": lector.fecha_fin_suspension.isoformat() if lector.fecha_fin_suspension else None,
+                "prestamos": [
+                    {
+                        "copia_id": p.copia.id,
+                        "fecha_prestamo": p.fecha_prestamo.isoformat(),
+                        "fecha_devolucion_esperada": p.fecha_devolucion_esperada.isoformat()
+                    }
+                    for p in lector.prestamos_activos
+                ]
+            }
+            for lector in service.lectores.values()
+        ],
+        "suscripciones": suscripciones,
+        "reservas": [_reserva(reserva) for reserva in service.reservas.todas_las_pendientes()],
+        "reservas_asignadas": [_reserva(reserva) for reserva in service.reservas.asignadas()],
+        "historial": service.historial.exportar()
+    }
+
+
+def _reserva(reserva: Reserva) -> dict:
+    return {
+        "lector_id": reserva.lector_id,
+        "libro_id": reserva.libro_id,
+        "fecha": reserva.fecha_reserva.isoformat(),
+        "prioridad": reserva.prioridad,
+        "copia_id": reserva.copia_id,
+        "vencimiento": reserva.fecha_vencimiento.isoformat() if reserva.fecha_vencimiento else None
+    }
+
+
+def _restaurar_reserva(datos: dict) -> Reserva:
+    return Reserva(
+        lector_id=datos["lector_id"],
+        libro_id=datos["libro_id"],
+        fecha_reserva=datetime.fromisoformat(datos["fecha"]),
+        prioridad=datos["prioridad"]
+    )
+
+
+def restaurar_instantanea(service: BibliotecaService, datos: dict):
+    for libro in datos["libros"]:
+        service.aplicar_evento({"tipo": "libro", **libro})
+    for copia in datos["copias"]:
+        service.aplicar_evento({"tipo": "copia", **copia})
+    for registro in datos["lectores"]:
+        fecha_fin = registro["fecha_fin_suspension"]
+        lector = Lector(
+            id=registro["id"],
+            nombre=registro["nombre"],
+            email=registro["email"],
+            dias_suspension=registro["dias_suspension"],
+            fecha_fin_suspension=date.fromisoformat(fecha_fin) if fecha_fin else None
+        )
+        for prestamo in registro["prestamos"]:
+            lector.prestamos_activos.append(Prestamo(
+                copia=service.copias[prestamo["copia_id"]],
+                fecha_prestamo=datetime.fromisoformat(prestamo["fecha_prestamo"]),
+                fecha_devolucion_esperada=datetime.fromisoformat(prestamo["fecha_devolucion_esperada"])
+            ))
+        service.agregar_lector(lector)
+    for suscripcion in datos["suscripciones"]:
+        service.aplicar_evento({"tipo": "suscripcion", **suscripcion})
+    for reserva in datos.get("reservas", ()):
+        service.reservas.agregar(_restaurar_reserva(reserva))
+    for reserva in datos.get("reservas_asignadas", ()):
+        service.reservas.asignar(
+            _restaurar_reserva(reserva), reserva["copia_id"], datetime.fromisoformat(reserva["vencimiento"])
+        )
+    if "historial" in datos:
+        service.historial.importar(datos["historial"])
+
+
+def leer_eventos(ruta: str) -> Iterator[dict]:
+    with open(ruta, "r+b") as archivo:
+        desplazamiento = 0
+        for linea in archivo:
+            try:
+                evento = json.loads(linea)
+            except ValueError:
+                if archivo.read(1):
+                    raise ValueError(f"Registro de eventos corrupto en {ruta}:{desplazamiento}")
+                archivo.truncate(desplazamiento)
+                return
+            if not linea.endswith(b"\n"):
+                archivo.truncate(desplazamiento)
+                return
+            desplazamiento += len(linea)
+            yield evento
+
+
+def cargar_biblioteca(directorio: str, **opciones) -> BibliotecaService:
+    os.makedirs(directorio, exist_ok=True)
+    service = BibliotecaService()
+    seq = 0
+    ruta = os.path.join(directorio, ARCHIVO_INSTANTANEA)
+    if os.path.exists(ruta):
+        with open(ruta, encoding="utf-8") as archivo:
+            datos = json.load(archivo)
+        restaurar_instantanea(service, datos)
+        seq = datos["seq"]
+
+    for segmento in _segmentos(directorio):
+        for evento in leer_eventos(segmento):
+            if evento["seq"] <= seq:
+                continue
+            service.aplicar_evento(evento)
+            seq = evento["seq"]
+
+    service.metricas.reiniciar_contadores()
+    service.registro = RegistroEventos(directorio, seq_inicial=seq, **opciones)
+    return service
@@ -0,0 +1,32 @@
+import threading
+from datetime import date, datetime, timedelta
+
+
+class Reloj:
+    def ahora(self) -> datetime:
+        return datetime.now()
+
+    def hoy(self) -> date:
+        return date.today()
+
+
+class RelojVirtual(Reloj):
+    def __init__(self, inicio: datetime):
+        self._ahora = inicio
+        self._lock = threading.Lock()
+
+    def ahora(self) -> datetime:
+        return self._ahora
+
+    def hoy(self) -> date:
+        return self._ahora.date()
+
+    def avanzar(self, intervalo: timedelta) -> datetime:
+        if intervalo < timedelta(0):
+            raise ValueError("El reloj virtual no puede retroceder")
+        with self._lock:
+            self._ahora += intervalo
+            return self._ahora
+
+
+RELOJ_SISTEMA = Reloj()
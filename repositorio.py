@@ -0,0 +1,534 @@
+import sqlite3
+import threading
+import weakref
+from abc import ABC, abstractmethod
+from collections.abc import Mapping
+from contextlib import contextmanager, nullcontext
+from datetime import date, datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from models import Autor, Libro, Copia, Lector, Prestamo, EstadoCopia
+
+
+SIN_TRANSACCION = nullcontext()
+
+
+def clave_autor(nombre: str) -> str:
+    return nombre.casefold()
+
+
+class IndiceOrdenado:
+    def __init__(self):
+        self._ids: List[Optional[str]] = []
+        self._posiciones: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._posiciones)
+
+    def __iter__(self) -> Iterator[str]:
+        return (id_ for id_ in self._ids if id_ is not None)
+
+    def agregar(self, id_: str):
+        if id_ not in self._posiciones:
+            self._posiciones[id_] = len(self._ids)
+            self._ids.append(id_)
+
+    def quitar(self, id_: str):
+        posicion = self._posiciones.pop(id_, None)
+        if posicion is None:
+            return
+        self._ids[posicion] = None
+        while self._ids and self._ids[-1] is None:
+            self._ids.pop()
+        if len(self._ids) > 2 * len(self._posiciones) + 32:
+            self._ids = list(self)
+            self._posiciones = {id_: i for i, id_ in enumerate(self._ids)}
+
+    def pagina(self, despues: Optional[str], limite: int) -> Tuple[List[str], Optional[str]]:
+        inicio = 0
+        if despues is not None:
+            if despues not in self._posiciones:
+                raise ValueError("Cursor inválido")
+            inicio = self._posiciones[despues] + 1
+        ids = []
+        posicion = inicio
+        while posicion < len(self._ids) and len(ids) < limite:
+            if self._ids[posicion] is not None:
+                ids.append(self._ids[posicion])
+            posicion += 1
+        return ids, ids[-1] if ids and posicion < len(self._ids) else None
+
+
+class Repositorio(ABC):
+    libros: Mapping
+    copias: Mapping
+    lectores: Mapping
+    autores = None
+
+    @abstractmethod
+    def transaccion(self):
+        ...
+
+    @abstractmethod
+    def guardar_libro(self, libro: Libro):
+        ...
+
+    @abstractmethod
+    def guardar_copia(self, copia: Copia):
+        ...
+
+    @abstractmethod
+    def guardar_lector(self, lector: Lector):
+        ...
+
+    @abstractmethod
+    def libros_por_autor(self, nombre_autor: str) -> List[Libro]:
+        ...
+
+    @abstractmethod
+    def pagina_libros_por_autor(self, nombre_autor: str, despues: Optional[str], limite: int) -> Tuple[List[Libro], Optional[str]]:
+        ...
+
+    @abstractmethod
+    def contar_libros_autor(self, nombre_autor: str) -> int:
+        ...
+
+    @abstractmethod
+    def contar_copias(self, libro_id: str) -> int:
+        ...
+
+    @abstractmethod
+    def contar_copias_estado(self, libro_id: str, estado: EstadoCopia) -> int:
+        ...
+
+    @abstractmethod
+    def copias_de_libro(self, libro_id: str) -> List[Copia]:
+        ...
+
+    @abstractmethod
+    def pagina_copias_de_libro(self, libro_id: str, despues: Optional[str], limite: int) -> Tuple[List[Copia], Optional[str]]:
+        ...
+
+    @abstractmethod
+    def copias_en_estado(self, libro_id: str, estado: EstadoCopia) -> List[Copia]:
+        ...
+
+    @abstractmethod
+    def actualizar_estado_copia(self, copia: Copia, nuevo_estado: EstadoCopia):
+        ...
+
+    @abstractmethod
+    def registrar_prestamo(self, lector: Lector, prestamo: Prestamo):
+        ...
+
+    @abstractmethod
+    def finalizar_prestamo(self, lector: Lector, prestamo: Prestamo):
+        ...
+
+
+class RepositorioMemoria(Repositorio):
+    def __init__(self):
+        self.libros: Dict[str, Libro] = {}
+        self.copias: Dict[str, Copia] = {}
+        self.lectores: Dict[str, Lector] = {}
+        self._libros_por_autor: Dict[str, IndiceOrdenado] = {}
+        self._copias_por_libro: Dict[str, IndiceOrdenado] = {}
+        self._copias_por_estado: Dict[str, Dict[EstadoCopia, Dict[str, None]]] = {}
+        self._lock = threading.Lock()
+
+    def transaccion(self):
+        return SIN_TRANSACCION
+
+    def guardar_libro(self, libro: Libro):
+        with self._lock:
+            anterior = self.libros.get(libro.id)
+            if anterior is not None:
+                self._desindexar_autor(anterior)
+            self.libros[libro.id] = libro
+            self._libros_por_autor.setdefault(clave_autor(libro.autor.nombre), IndiceOrdenado()).agregar(libro.id)
+
+    def _desindexar_autor(self, libro: Libro):
+        clave = clave_autor(libro.autor.nombre)
+        ids = self._libros_por_autor.get(clave)
+        if ids is None:
+            return
+        ids.quitar(libro.id)
+        if not ids:
+            del self._libros_por_autor[clave]
+
+    def guardar_copia(self, copia: Copia):
+        with self._lock:
+            anterior = self.copias.get(copia.id)
+            if anterior is not None:
+                self._copias_por_libro[anterior.libro.id].quitar(anterior.id)
+                self._copias_por_estado[anterior.libro.id][anterior.estado].pop(anterior.id, None)
+            self.copias[copia.id] = copia
+            self._copias_por_libro.setdefault(copia.libro.id, IndiceOrdenado()).agregar(copia.id)
+            self._bucket_estado(copia.libro.id, copia.estado)[copia.id] = None
+
+    def _bucket_estado(self, libro_id: str, estado: EstadoCopia) -> Dict[str, None]:
+        return self._copias_por_estado.setdefault(libro_id, {}).setdefault(estado, {})
+
+    def guardar_lector(self, lector: Lector):
+        self.lectores[lector.id] = lector
+
+    def libros_por_autor(self, nombre_autor: str) -> List[Libro]:
+        with self._lock:
+            ids = self._libros_por_autor.get(clave_autor(nombre_autor), ())
+            return [self.libros[libro_id] for libro_id in ids]
+
+    def pagina_libros_por_autor(self, nombre_autor: str, despues: Optional[str], limite: int) -> Tuple[List[Libro], Optional[str]]:
+        with self._lock:
+            indice = self._libros_por_autor.get(clave_autor(nombre_autor))
+            if indice is None:
+                return self._pagina_vacia(despues)
+            ids, siguiente = indice.pagina(despues, limite)
+            return [self.libros[libro_id] for libro_id in ids], siguiente
+
+    def contar_libros_autor(self, nombre_autor: str) -> int:
+        return len(self._libros_por_autor.get(clave_autor(nombre_autor), ()))
+
+    def contar_copias(self, libro_id: str) -> int:
+        return len(self._copias_por_libro.get(libro_id, ()))
+
+    def contar_copias_estado(self, libro_id: str, estado: EstadoCopia) -> int:
+        return len(self._copias_por_estado.get(libro_id, {}).get(estado, ()))
+
+    def copias_de_libro(self, libro_id: str) -> List[Copia]:
+        with self._lock:
+            return [self.copias[copia_id] for copia_id in self._copias_por_libro.get(libro_id, ())]
+
+    def pagina_copias_de_libro(self, libro_id: str, despues: Optional[str], limite: int) -> Tuple[List[Copia], Optional[str]]:
+        with self._lock:
+            indice = self._copias_por_libro.get(libro_id)
+            if indice is None:
+                return self._pagina_vacia(despues)
+            ids, siguiente = indice.pagina(despues, limite)
+            return [self.copias[copia_id] for copia_id in ids], siguiente
+
+    @staticmethod
+    def _pagina_vacia(despues: Optional[str]) -> Tuple[list, None]:
+        if despues is not None:
+            raise ValueError("Cursor inválido")
+        return [], None
+
+    def copias_en_estado(self, libro_id: str, estado: EstadoCopia) -> List[Copia]:
+        with self._lock:
+            ids = self._copias_por_estado.get(libro_id, {}).get(estado, ())
+            return [self.copias[copia_id] for copia_id in ids]
+
+    def actualizar_estado_copia(self, copia: Copia, nuevo_estado: EstadoCopia):
+        with self._lock:
+            self._copias_por_estado[copia.libro.id][copia.estado].pop(copia.id, None)
+            copia.estado = nuevo_estado
+            self._bucket_estado(copia.libro.id, nuevo_estado)[copia.id] = None
+
+    def registrar_prestamo(self, lector: Lector, prestamo: Prestamo):
+        lector.prestamos_activos.append(prestamo)
+
+    def finalizar_prestamo(self, lector: Lector, prestamo: Prestamo):
+        lector.prestamos_activos.remove(prestamo)
+
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS libros (
+    id TEXT PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    anio INTEGER NOT NULL,
+    autor_nombre TEXT NOT NULL,
+    autor_fecha_nacimiento TEXT NOT NULL,
+    autor_clave TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS libros_autor ON libros (autor_clave);
+
+CREATE TABLE IF NOT EXISTS copias (
+    id TEXT PRIMARY KEY,
+    libro_id TEXT NOT NULL,
+    estado TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS copias_libro ON copias (libro_id);
+CREATE INDEX IF NOT EXISTS copias_libro_estado ON copias (libro_id, estado);
+
+CREATE TABLE IF NOT EXISTS lectores (
+    id TEXT PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    email TEXT NOT NULL,
+    dias_suspension INTEGER NOT NULL,
+    fecha_fin_suspension TEXT
+);
+
+CREATE TABLE IF NOT EXISTS prestamos (
+    copia_id TEXT PRIMARY KEY,
+    lector_id TEXT NOT NULL,
+    fecha_prestamo TEXT NOT NULL,
+    fecha_devolucion_esperada TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS prestamos_lector ON prestamos (lector_id);
+"""
+
+SQL_LIBRO = "SELECT id, nombre, anio, autor_nombre, autor_fecha_nacimiento FROM libros WHERE id = ?"
+SQL_LIBROS_AUTOR = (
+    "SELECT id, nombre, anio, autor_nombre, autor_fecha_nacimiento FROM libros "
+    "WHERE autor_clave = ? ORDER BY rowid"
+)
+SQL_PAGINA_LIBROS_AUTOR = (
+    "SELECT id, nombre, anio, autor_nombre, autor_fecha_nacimiento, rowid FROM libros "
+    "WHERE autor_clave = ? AND rowid > ? ORDER BY rowid LIMIT ?"
+)
+SQL_GUARDAR_LIBRO = (
+    "INSERT OR REPLACE INTO libros (id, nombre, anio, autor_nombre, autor_fecha_nacimiento, autor_clave) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+SQL_COPIA = "SELECT id, libro_id, estado FROM copias WHERE id = ?"
+SQL_COPIAS_LIBRO = "SELECT id, libro_id, estado FROM copias WHERE libro_id = ? ORDER BY rowid"
+SQL_PAGINA_COPIAS_LIBRO = (
+    "SELECT id, libro_id, estado, rowid FROM copias WHERE libro_id = ? AND rowid > ? ORDER BY rowid LIMIT ?"
+)
+SQL_COPIAS_ESTADO = "SELECT id, libro_id, estado FROM copias WHERE libro_id = ? AND estado = ? ORDER BY rowid"
+SQL_CONTAR_LIBROS_AUTOR = "SELECT COUNT(*) FROM libros WHERE autor_clave = ?"
+SQL_CONTAR_COPIAS = "SELECT COUNT(*) FROM copias WHERE libro_id = ?"
+SQL_CONTAR_COPIAS_ESTADO = "SELECT COUNT(*) FROM copias WHERE libro_id = ? AND estado = ?"
+SQL_GUARDAR_COPIA = "INSERT OR REPLACE INTO copias (id, libro_id, estado) VALUES (?, ?, ?)"
+SQL_ESTADO_COPIA = "UPDATE copias SET estado = ? WHERE id = ?"
+SQL_LECTOR = "SELECT id, nombre, email, dias_suspension, fecha_fin_suspension FROM lectores WHERE id = ?"
+SQL_GUARDAR_LECTOR = (
+    "INSERT OR REPLACE INTO lectores (id, nombre, email, dias_suspension, fecha_fin_suspension) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+SQL_SUSPENSION_LECTOR = "UPDATE lectores SET dias_suspension = ?, fecha_fin_suspension = ? WHERE id = ?"
+SQL_PRESTAMOS_LECTOR = (
+    "SELECT copia_id, fecha_prestamo, fecha_devolucion_esperada FROM prestamos "
+    "WHERE lector_id = ? ORDER BY rowid"
+)
+SQL_GUARDAR_PRESTAMO = (
+    "INSERT OR REPLACE INTO prestamos (copia_id, lector_id, fecha_prestamo, fecha_devolucion_esperada) "
+    "VALUES (?, ?, ?, ?)"
+)
+SQL_ELIMINAR_PRESTAMO = "DELETE FROM prestamos WHERE copia_id = ?"
+
+
+def _rowid(despues: Optional[str]) -> int:
+    if despues is None:
+        return 0
+    try:
+        return int(despues)
+    except ValueError:
+        raise ValueError("Cursor inválido") from None
+
+
+def _siguiente(filas: list, limite: int) -> Optional[str]:
+    return str(filas[limite - 1][-1]) if len(filas) > limite else None
+
+
+class _Tabla(Mapping):
+    def __init__(self, repositorio: "RepositorioSQLite", tabla: str, cargar):
+        self._repositorio = repositorio
+        self._tabla = tabla
+        self._cargar = cargar
+        self._sql_existe = f"SELECT 1 FROM {tabla} WHERE id = ?"
+        self._sql_contar = f"SELECT COUNT(*) FROM {tabla}"
+        self._sql_ids = f"SELECT id FROM {tabla} ORDER BY rowid"
+
+    def __getitem__(self, clave: str):
+        entidad = self._cargar(clave)
+        if entidad is None:
+            raise KeyError(clave)
+        return entidad
+
+    def get(self, clave: str, defecto=None):
+        entidad = self._cargar(clave)
+        return defecto if entidad is None else entidad
+
+    def __contains__(self, clave) -> bool:
+        return self._repositorio._uno(self._sql_existe, (clave,)) is not None
+
+    def __len__(self) -> int:
+        return self._repositorio._uno(self._sql_contar, ())[0]
+
+    def __iter__(self) -> Iterator[str]:
+        with self._repositorio._lock:
+            ids = [fila[0] for fila in self._repositorio._conexion.execute(self._sql_ids)]
+        return iter(ids)
+
+
+class RepositorioSQLite(Repositorio):
+    def __init__(self, ruta: str):
+        self._lock = threading.RLock()
+        self._profundidad = 0
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False, cached_statements=256)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        self._conexion.execute("PRAGMA foreign_keys=OFF")
+        self._conexion.executescript(ESQUEMA)
+        self._libros = weakref.WeakValueDictionary()
+        self._copias = weakref.WeakValueDictionary()
+        self._lectores = weakref.WeakValueDictionary()
+        self.libros = _Tabla(self, "libros", self._cargar_libro)
+        self.copias = _Tabla(self, "copias", self._cargar_copia)
+        self.lectores = _Tabla(self, "lectores", self._cargar_lector)
+
+    def cerrar(self):
+        with self._lock:
+            self._conexion.close()
+
+    @contextmanager
+    def transaccion(self):
+        with self._lock:
+            if self._profundidad:
+                yield
+                return
+            self._profundidad += 1
+            try:
+                with self._conexion:
+                    yield
+            finally:
+                self._profundidad -= 1
+
+    def _uno(self, sql: str, parametros: tuple):
+        with self._lock:
+            return self._conexion.execute(sql, parametros).fetchone()
+
+    def _todas(self, sql: str, parametros: tuple) -> list:
+        with self._lock:
+            return self._conexion.execute(sql, parametros).fetchall()
+
+    def _libro_desde_fila(self, fila) -> Libro:
+        libro = self._libros.get(fila[0])
+        if libro is None:
+            if self.autores is not None:
+                autor = self.autores.obtener_o_crear(fila[3], date.fromisoformat(fila[4]))
+            else:
+                autor = Autor(nombre=fila[3], fecha_nacimiento=date.fromisoformat(fila[4]))
+            libro = Libro(id=fila[0], nombre=fila[1], anio=fila[2], autor=autor)
+            self._libros[libro.id] = libro
+        return libro
+
+    def _cargar_libro(self, libro_id: str) -> Optional[Libro]:
+        libro = self._libros.get(libro_id)
+        if libro is not None:
+            return libro
+        with self._lock:
+            fila = self._uno(SQL_LIBRO, (libro_id,))
+            return None if fila is None else self._libro_desde_fila(fila)
+
+    def _copia_desde_fila(self, fila) -> Copia:
+        copia = self._copias.get(fila[0])
+        if copia is None:
+            copia = Copia(id=fila[0], libro=self._cargar_libro(fila[1]), estado=EstadoCopia(fila[2]))
+            self._copias[copia.id] = copia
+        return copia
+
+    def _cargar_copia(self, copia_id: str) -> Optional[Copia]:
+        copia = self._copias.get(copia_id)
+        if copia is not None:
+            return copia
+        with self._lock:
+            fila = self._uno(SQL_COPIA, (copia_id,))
+            return None if fila is None else self._copia_desde_fila(fila)
+
+    def _cargar_lector(self, lector_id: str) -> Optional[Lector]:
+        lector = self._lectores.get(lector_id)
+        if lector is not None:
+            return lector
+        with self._lock:
+            lector = self._lectores.get(lector_id)
+            if lector is not None:
+                return lector
+            fila = self._uno(SQL_LECTOR, (lector_id,))
+            if fila is None:
+                return None
+            lector = Lector(
+                id=fila[0],
+                nombre=fila[1],
+                email=fila[2],
+                dias_suspension=fila[3],
+                fecha_fin_suspension=date.fromisoformat(fila[4]) if fila[4] else None
+            )
+            for copia_id, fecha_prestamo, fecha_devolucion in self._todas(SQL_PRESTAMOS_LECTOR, (lector_id,)):
+                lector.prestamos_activos.append(Prestamo(
+                    copia=self._cargar_copia(copia_id),
+                    fecha_prestamo=datetime.fromisoformat(fecha_prestamo),
+                    fecha_devolucion_esperada=datetime.fromisoformat(fecha_devolucion)
+                ))
+            self._lectores[lector.id] = lector
+        return lector
+
+    def guardar_libro(self, libro: Libro):
+        self._conexion.execute(SQL_GUARDAR_LIBRO, (
+            libro.id,
+            libro.nombre,
+            libro.anio,
+            libro.autor.nombre,
+            libro.autor.fecha_nacimiento.isoformat(),
+            clave_autor(libro.autor.nombre)
+        ))
+        self._libros[libro.id] = libro
+
+    def guardar_copia(self, copia: Copia):
+        self._conexion.execute(SQL_GUARDAR_COPIA, (copia.id, copia.libro.id, copia.estado.value))
+        self._copias[copia.id] = copia
+
+    def guardar_lector(self, lector: Lector):
+        self._conexion.execute(SQL_GUARDAR_LECTOR, (
+            lector.id,
+            lector.nombre,
+            lector.email,
+            lector.dias_suspension,
+            lector.fecha_fin_suspension.isoformat() if lector.fecha_fin_suspension else None
+        ))
+        self._lectores[lector.id] = lector
+
+    def libros_por_autor(self, nombre_autor: str) -> List[Libro]:
+        with self._lock:
+            filas = self._todas(SQL_LIBROS_AUTOR, (clave_autor(nombre_autor),))
+            return [self._libro_desde_fila(fila) for fila in filas]
+
+    def pagina_libros_por_autor(self, nombre_autor: str, despues: Optional[str], limite: int) -> Tuple[List[Libro], Optional[str]]:
+        with self._lock:
+            filas = self._todas(SQL_PAGINA_LIBROS_AUTOR, (clave_autor(nombre_autor), _rowid(despues), limite + 1))
+            return [self._libro_desde_fila(fila) for fila in filas[:limite]], _siguiente(filas, limite)
+
+    def contar_libros_autor(self, nombre_autor: str) -> int:
+        return self._uno(SQL_CONTAR_LIBROS_AUTOR, (clave_autor(nombre_autor),))[0]
+
+    def contar_copias(self, libro_id: str) -> int:
+        return self._uno(SQL_CONTAR_COPIAS, (libro_id,))[0]
+
+    def contar_copias_estado(self, libro_id: str, estado: EstadoCopia) -> int:
+        return self._uno(SQL_CONTAR_COPIAS_ESTADO, (libro_id, estado.value))[0]
+
+    def copias_de_libro(self, libro_id: str) -> List[Copia]:
+        with self._lock:
+            return [self._copia_desde_fila(fila) for fila in self._todas(SQL_COPIAS_LIBRO, (libro_id,))]
+
+    def pagina_copias_de_libro(self, libro_id: str, despues: Optional[str], limite: int) -> Tuple[List[Copia], Optional[str]]:
+        with self._lock:
+            filas = self._todas(SQL_PAGINA_COPIAS_LIBRO, (libro_id, _rowid(despues), limite + 1))
+            return [self._copia_desde_fila(fila) for fila in filas[:limite]], _siguiente(filas, limite)
+
+    def copias_en_estado(self, libro_id: str, estado: EstadoCopia) -> List[Copia]:
+        with self._lock:
+            filas = self._todas(SQL_COPIAS_ESTADO, (libro_id, estado.value))
+            return [self._copia_desde_fila(fila) for fila in filas]
+
+    def actualizar_estado_copia(self, copia: Copia, nuevo_estado: EstadoCopia):
+        self._conexion.execute(SQL_ESTADO_COPIA, (nuevo_estado.value, copia.id))
+        copia.estado = nuevo_estado
+
+    def registrar_prestamo(self, lector: Lector, prestamo: Prestamo):
+        self._conexion.execute(SQL_GUARDAR_PRESTAMO, (
+            prestamo.copia.id,
+            lector.id,
+            prestamo.fecha_prestamo.isoformat(),
+            prestamo.fecha_devolucion_esperada.isoformat()
+        ))
+        lector.prestamos_activos.append(prestamo)
+
+    def finalizar_prestamo(self, lector: Lector, prestamo: Prestamo):
+        self._conexion.execute(SQL_ELIMINAR_PRESTAMO, (prestamo.copia.id,))
+        self._conexion.execute(SQL_SUSPENSION_LECTOR, (
+            lector.dias_suspension,
+            lector.fecha_fin_suspension.isoformat() if lector.fecha_fin_suspension else None,
+            lector.id
+        ))
+        lector.prestamos_activos.remove(prestamo)
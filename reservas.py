@@ -0,0 +1,136 @@
+import heapq
+import threading
+from datetime import datetime
+from itertools import count
+from typing import Callable, Dict, List, Optional, Tuple
+
+from models import Reserva
+
+Entrada = Tuple[int, datetime, int, Reserva]
+COMPACTAR_DESDE = 64
+
+
+class ColaReservas:
+    def __init__(self, al_cambiar: Optional[Callable[[str, int], None]] = None):
+        self._colas: Dict[str, List[Entrada]] = {}
+        self._pendientes: Dict[Tuple[str, str], Reserva] = {}
+        self._cantidades: Dict[str, int] = {}
+        self._al_cambiar = al_cambiar
+        self._asignadas: Dict[str, Reserva] = {}
+        self._descartadas: Dict[str, int] = {}
+        self._secuencia = count()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._pendientes)
+
+    def agregar(self, reserva: Reserva) -> bool:
+        clave = (reserva.libro_id, reserva.lector_id)
+        with self._lock:
+            if clave in self._pendientes:
+                return False
+            self._pendientes[clave] = reserva
+            heapq.heappush(
+                self._colas.setdefault(reserva.libro_id, []),
+                (reserva.prioridad, reserva.fecha_reserva, next(self._secuencia), reserva)
+            )
+            self._contar(reserva.libro_id, 1)
+            return True
+
+    def cancelar(self, libro_id: str, lector_id: str) -> Optional[Reserva]:
+        with self._lock:
+            reserva = self._pendientes.pop((libro_id, lector_id), None)
+            if reserva is not None:
+                self._contar(libro_id, -1)
+                self._descartar(libro_id)
+            return reserva
+
+    def _vigente(self, entrada: Entrada) -> bool:
+        reserva = entrada[3]
+        return self._pendientes.get((reserva.libro_id, reserva.lector_id)) is reserva
+
+    def _descartar(self, libro_id: str):
+        cola = self._colas[libro_id]
+        descartadas = self._descartadas.get(libro_id, 0) + 1
+        if descartadas >= COMPACTAR_DESDE and descartadas * 2 > len(cola):
+            cola[:] = [entrada for entrada in cola if self._vigente(entrada)]
+            heapq.heapify(cola)
+            descartadas = 0
+        if not cola:
+            del self._colas[libro_id]
+        if descartadas:
+            self._descartadas[libro_id] = descartadas
+        else:
+            self._descartadas.pop(libro_id, None)
+
+    def cantidad(self, libro_id: str) -> int:
+        return self._cantidades.get(libro_id, 0)
+
+    def _contar(self, libro_id: str, delta: int):
+        cantidad = self._cantidades.get(libro_id, 0) + delta
+        if cantidad:
+            self._cantidades[libro_id] = cantidad
+        else:
+            del self._cantidades[libro_id]
+        if self._al_cambiar is not None:
+            self._al_cambiar(libro_id, cantidad)
+
+    def esta_reservado(self, lector_id: str, libro_id: str) -> bool:
+        return (libro_id, lector_id) in self._pendientes
+
+    def siguiente(self, libro_id: str, elegible: Callable[[str], bool]) -> Optional[Reserva]:
+        with self._lock:
+            cola = self._colas.get(libro_id)
+            omitidas = []
+            reserva = None
+            while cola:
+                entrada = heapq.heappop(cola)
+                candidata = entrada[3]
+                if not self._vigente(entrada):
+                    self._descartadas[libro_id] -= 1
+                    continue
+                if not elegible(candidata.lector_id):
+                    omitidas.append(entrada)
+                    continue
+                del self._pendientes[(libro_id, candidata.lector_id)]
+                self._contar(libro_id, -1)
+                reserva = candidata
+                break
+            for entrada in omitidas:
+                heapq.heappush(cola, entrada)
+            if cola is not None and not cola:
+                del self._colas[libro_id]
+            if not self._descartadas.get(libro_id, 1):
+                del self._descartadas[libro_id]
+            return reserva
+
+    def pendientes(self, libro_id: str) -> List[Reserva]:
+        with self._lock:
+            return [
+                entrada[3] for entrada in sorted(self._colas.get(libro_id, ())) if self._vigente(entrada)
+            ]
+
+    def todas_las_pendientes(self) -> List[Reserva]:
+        with self._lock:
+            entradas = sorted(
+                (entrada for cola in self._colas.values() for entrada in cola),
+                key=lambda entrada: entrada[2]
+            )
+            return [entrada[3] for entrada in entradas if self._vigente(entrada)]
+
+    def asignar(self, reserva: Reserva, copia_id: str, vencimiento: datetime):
+        with self._lock:
+            reserva.copia_id = copia_id
+            reserva.fecha_vencimiento = vencimiento
+            self._asignadas[copia_id] = reserva
+
+    def asignada(self, copia_id: str) -> Optional[Reserva]:
+        return self._asignadas.get(copia_id)
+
+    def liberar(self, copia_id: str) -> Optional[Reserva]:
+        with self._lock:
+            return self._asignadas.pop(copia_id, None)
+
+    def asignadas(self) -> List[Reserva]:
+        with self._lock:
+            return list(self._asignadas.values())
@@ -1,60 +1,368 @@
-from datetime import datetime, timedelta
-from typing import List, Optional, Dict
-from models import Libro, Copia, Lector, Prestamo, EstadoCopia, BioAlert
+import base64
+import binascii
+import logging
+import secrets
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+from itertools import count
+from typing import List, Optional, Dict, Tuple
+from models import Autor, Libro, Copia, Lector, Prestamo, EstadoCopia, BioAlert, Reserva
+from repositorio import Repositorio, RepositorioMemoria
+from autores import RegistroAutores
+from busqueda import IndiceBusqueda
+from metricas import MetricasBiblioteca
+from vencimientos import IndiceVencimientos
+from historial import HistorialPrestamos
+from reservas import ColaReservas
+from disponibilidad import CatalogoDisponibilidad, DisponibilidadLibro
+from temporizador import RuedaTemporizadores
+from reloj import Reloj, RELOJ_SISTEMA
+
+FRANJAS_DE_BLOQUEO = 64
+LIMITE_PAGINA = 100
+LIMITE_PAGINA_MAXIMO = 1000
+INTERVALO_TEMPORIZADOR = 1.0
+PLAZO_RESERVA = timedelta(days=3)
+
+logger = logging.getLogger(__name__)
+
+
+def _instante(momento: datetime) -> int:
+    return int(momento.timestamp())
+
+
+def _fin_de_suspension(fecha_fin: date) -> int:
+    return _instante(datetime.combine(fecha_fin + timedelta(days=1), time.min))
+
+
+def _codificar_cursor(posicion: Optional[str]) -> Optional[str]:
+    if posicion is None:
+        return None
+    return base64.urlsafe_b64encode(posicion.encode()).decode().rstrip("=")
+
+
+def _decodificar_cursor(cursor: Optional[str]) -> Optional[str]:
+    if cursor is None:
+        return None
+    try:
+        return base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError("Cursor inválido") from None
+
+
+def _codificar_clave_vencimiento(clave: Optional[Tuple[datetime, str]]) -> Optional[str]:
+    if clave is None:
+        return None
+    return _codificar_cursor(f"{clave[0].isoformat()}|{clave[1]}")
+
+
+def _decodificar_clave_vencimiento(cursor: Optional[str]) -> Optional[Tuple[datetime, str]]:
+    posicion = _decodificar_cursor(cursor)
+    if posicion is None:
+        return None
+    fecha, separador, copia_id = posicion.partition("|")
+    try:
+        if not separador:
+            raise ValueError
+        return datetime.fromisoformat(fecha), copia_id
+    except ValueError:
+        raise ValueError("Cursor inválido") from None
+
+
+def _validar_limite(limite: int) -> int:
+    if not 1 <= limite <= LIMITE_PAGINA_MAXIMO:
+        raise ValueError(f"El límite debe estar entre 1 y {LIMITE_PAGINA_MAXIMO}")
+    return limite
 
 
 class BibliotecaService:
-    def __init__(self):
-        self.libros: Dict[str, Libro] = {}
-        self.copias: Dict[str, Copia] = {}
-        self.lectores: Dict[str, Lector] = {}
+    def __init__(
+        self,
+        registro=None,
+        repositorio: Optional[Repositorio] = None,
+        despachador=None,
+        limite_notificaciones: Optional[int] = None,
+        franjas: int = FRANJAS_DE_BLOQUEO,
+        reloj: Reloj = RELOJ_SISTEMA
+    ):
+        self.registro = registro
+        self.reloj = reloj
+        self.despachador = despachador
+        self.limite_notificaciones = limite_notificaciones
+        self.repositorio = repositorio if repositorio is not None else RepositorioMemoria()
+        self.libros = self.repositorio.libros
+        self.copias = self.repositorio.copias
+        self.lectores = self.repositorio.lectores
+        self.autores = RegistroAutores()
+        self.repositorio.autores = self.autores
         self.bio_alert = BioAlert()
+        self.busqueda = IndiceBusqueda()
+        for libro in self.libros.values():
+            libro.autor = self.autores.registrar(libro.autor)
+            self.busqueda.agregar(libro)
+        self.metricas = MetricasBiblioteca()
+        self.vencimientos = IndiceVencimientos()
+        self.historial = HistorialPrestamos()
+        self.disponibilidad = CatalogoDisponibilidad()
+        self.reservas = ColaReservas(al_cambiar=self.disponibilidad.espera)
+        for libro_id in self.libros:
+            self.disponibilidad.libro(libro_id)
+        for copia in self.copias.values():
+            self.metricas.copia(None, copia.estado)
+            self.disponibilidad.copia(None, copia.libro.id, copia.estado)
+        for lector in self.lectores.values():
+            self.metricas.lector(None, lector)
+            for prestamo in lector.prestamos_activos:
+                self.vencimientos.agregar(prestamo, lector.id)
+        self._franjas = [threading.RLock() for _ in range(franjas)]
+        self.temporizador: Optional[RuedaTemporizadores] = None
+        self._hilo_temporizador: Optional[threading.Thread] = None
+        self._detener_temporizador = threading.Event()
+        self.epoca = secrets.token_hex(4)
+        self._versiones: Dict[Tuple[str, str], int] = {}
+        self._contador_versiones = count(1)
+
+    def _bloquear(self, *claves: Tuple[str, str]):
+        return self._bloquear_franjas({hash(clave) % len(self._franjas) for clave in claves})
+
+    @contextmanager
+    def _bloquear_franjas(self, indices):
+        indices = sorted(indices)
+        for indice in indices:
+            self._franjas[indice].acquire()
+        try:
+            yield
+        finally:
+            for indice in reversed(indices):
+                self._franjas[indice].release()
+
+    @contextmanager
+    def _bloquear_copia(self, copia_id: str, *claves: Tuple[str, str]):
+        while True:
+            copia = self.copias.get(copia_id)
+            libro_id = copia.libro.id if copia is not None else None
+            with self._bloquear(*claves, ("copia", copia_id), ("libro", libro_id)):
+                copia = self.copias.get(copia_id)
+                if (copia.libro.id if copia is not None else None) == libro_id:
+                    yield
+                    return
+
+    def bloquear_todo(self):
+        return self._bloquear_franjas(range(len(self._franjas)))
+
+    def version(self, tipo: str, entidad_id: str) -> int:
+        return self._versiones.get((tipo, entidad_id), 0)
+
+    def _nueva_version(self, *claves: Tuple[str, str]):
+        for clave in claves:
+            self._versiones[clave] = next(self._contador_versiones)
 
     def agregar_libro(self, libro: Libro) -> Libro:
-        self.libros[libro.id] = libro
+        with self._bloquear(("libro", libro.id)):
+            seq = self._agregar_libro(libro)
+        self._confirmar(seq)
         return libro
 
+    def _agregar_libro(self, libro: Libro) -> int:
+        libro.autor = self.autores.registrar(libro.autor)
+        anterior = self.libros.get(libro.id)
+        with self.repositorio.transaccion():
+            self.repositorio.guardar_libro(libro)
+        if anterior is not None:
+            self.busqueda.quitar(anterior)
+        self.busqueda.agregar(libro)
+        self.disponibilidad.libro(libro.id)
+        self._nueva_version(("libro", libro.id))
+        return self._registrar(
+            "libro",
+            id=libro.id,
+            nombre=libro.nombre,
+            anio=libro.anio,
+            autor_nombre=libro.autor.nombre,
+            autor_fecha_nacimiento=libro.autor.fecha_nacimiento.isoformat()
+        )
+
     def agregar_copia(self, copia: Copia) -> Copia:
-        if copia.libro.id not in self.libros:
-            self.agregar_libro(copia.libro)
-        self.copias[copia.id] = copia
+        with self._bloquear(("copia", copia.id), ("libro", copia.libro.id)):
+            libro = self.libros.get(copia.libro.id)
+            if libro is None:
+                self._agregar_libro(copia.libro)
+            else:
+                copia.libro = libro
+            anterior = self.copias.get(copia.id)
+            with self.repositorio.transaccion():
+                self.repositorio.guardar_copia(copia)
+            self._nueva_version(("libro", copia.libro.id))
+            if anterior is not None and anterior.libro.id != copia.libro.id:
+                self._nueva_version(("libro", anterior.libro.id))
+            self.metricas.copia(anterior.estado if anterior is not None else None, copia.estado)
+            self.disponibilidad.copia(
+                (anterior.libro.id, anterior.estado) if anterior is not None else None, copia.libro.id, copia.estado
+            )
+            seq = self._registrar("copia", id=copia.id, libro_id=copia.libro.id, estado=copia.estado.value)
+        self._confirmar(seq)
         return copia
 
     def agregar_lector(self, lector: Lector) -> Lector:
-        self.lectores[lector.id] = lector
+        with self._bloquear(("lector", lector.id)):
+            anterior = self.lectores.get(lector.id)
+            with self.repositorio.transaccion():
+                self.repositorio.guardar_lector(lector)
+            self._nueva_version(("lector", lector.id))
+            self.metricas.lector(anterior, lector)
+            if anterior is not None:
+                for prestamo in anterior.prestamos_activos:
+                    self.vencimientos.quitar(prestamo)
+            for prestamo in lector.prestamos_activos:
+                self.vencimientos.agregar(prestamo, lector.id)
+                self._programar_vencimiento(prestamo)
+            self._programar_fin_suspension(lector)
+            seq = self._registrar(
+                "lector",
+                id=lector.id,
+                nombre=lector.nombre,
+                email=lector.email,
+                dias_suspension=lector.dias_suspension,
+                fecha_fin_suspension=lector.fecha_fin_suspension.isoformat() if lector.fecha_fin_suspension else None
+            )
+        self._confirmar(seq)
         return lector
 
+    def registrar_autor(self, nombre: str, fecha_nacimiento: date) -> Autor:
+        return self.autores.obtener_o_crear(nombre, fecha_nacimiento)
+
+    def obtener_autor(self, autor_id: str) -> Optional[Autor]:
+        return self.autores.obtener(autor_id)
+
+    def buscar_autores(self, nombre: str) -> List[Autor]:
+        return self.autores.buscar(nombre)
+
+    def obtener_libros_de_autor(self, autor_id: str) -> List[Libro]:
+        autor = self.autores.obtener(autor_id)
+        if autor is None:
+            raise ValueError("Autor no encontrado")
+        return [libro for libro in self.repositorio.libros_por_autor(autor.nombre) if libro.autor is autor]
+
     def obtener_libros_por_autor(self, nombre_autor: str) -> List[Libro]:
-        return [
-            libro for libro in self.libros.values()
-            if libro.autor.nombre.lower() == nombre_autor.lower()
-        ]
+        return self.repositorio.libros_por_autor(nombre_autor)
+
+    def contar_libros_por_autor(self, nombre_autor: str) -> int:
+        return self.repositorio.contar_libros_autor(nombre_autor)
+
+    def paginar_libros_por_autor(
+        self,
+        nombre_autor: str,
+        limite: int = LIMITE_PAGINA,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Libro], Optional[str]]:
+        libros, siguiente = self.repositorio.pagina_libros_por_autor(
+            nombre_autor, _decodificar_cursor(cursor), _validar_limite(limite)
+        )
+        return libros, _codificar_cursor(siguiente)
+
+    def buscar_libros(self, consulta: str, limite: int = 20) -> List[Tuple[Libro, float]]:
+        resultados = self.busqueda.buscar(consulta, _validar_limite(limite))
+        return [(self.libros[libro_id], puntaje) for libro_id, puntaje in resultados]
+
+    def obtener_libro(self, libro_id: str) -> Optional[Libro]:
+        return self.libros.get(libro_id)
+
+    def obtener_lector(self, lector_id: str) -> Optional[Lector]:
+        return self.lectores.get(lector_id)
 
     def contar_copias_libro(self, libro_id: str) -> int:
-        return sum(1 for copia in self.copias.values() if copia.libro.id == libro_id)
+        return self.repositorio.contar_copias(libro_id)
+
+    def contar_copias_estado(self, libro_id: str, estado: EstadoCopia) -> int:
+        return self.repositorio.contar_copias_estado(libro_id, estado)
+
+    def hay_copias_disponibles(self, libro_id: str) -> bool:
+        return self.contar_copias_estado(libro_id, EstadoCopia.DISPONIBLE) > 0
 
     def obtener_copias_libro(self, libro_id: str) -> List[Copia]:
-        return [copia for copia in self.copias.values() if copia.libro.id == libro_id]
+        return self.repositorio.copias_de_libro(libro_id)
+
+    def paginar_copias_libro(
+        self,
+        libro_id: str,
+        limite: int = LIMITE_PAGINA,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[Copia], Optional[str]]:
+        copias, siguiente = self.repositorio.pagina_copias_de_libro(
+            libro_id, _decodificar_cursor(cursor), _validar_limite(limite)
+        )
+        return copias, _codificar_cursor(siguiente)
+
+    def paginar_disponibilidad(
+        self,
+        limite: int = LIMITE_PAGINA,
+        cursor: Optional[str] = None,
+        filtro: Optional[str] = None
+    ) -> Tuple[List[Tuple[Libro, DisponibilidadLibro]], Optional[str]]:
+        resumen, siguiente = self.disponibilidad.pagina(_decodificar_cursor(cursor), _validar_limite(limite), filtro)
+        return [(self.libros[libro_id], contadores) for libro_id, contadores in resumen], _codificar_cursor(siguiente)
 
     def prestar_libro(self, lector_id: str, copia_id: str) -> Prestamo:
-        if lector_id not in self.lectores:
-            raise ValueError("Lector no encontrado")
-        
-        if copia_id not in self.copias:
-            raise ValueError("Copia no encontrada")
+        with self._bloquear(("lector", lector_id), ("copia", copia_id)):
+            prestamo = self._prestar(lector_id, copia_id, self.reloj.ahora())
+            seq = self._registrar(
+                "prestamo",
+                lector_id=lector_id,
+                copia_id=copia_id,
+                fecha=prestamo.fecha_prestamo.isoformat()
+            )
+        self._confirmar(seq)
+        return prestamo
+
+    def prestar_lote(self, pares: List[Tuple[str, str]]) -> List[dict]:
+        resultados = []
+        seq = 0
+        fecha_prestamo = self.reloj.ahora()
+        for lector_id, copia_id in pares:
+            resultado = {"lector_id": lector_id, "copia_id": copia_id}
+            with self._bloquear_copia(copia_id, ("lector", lector_id)):
+                try:
+                    resultado["prestamo"] = self._prestar(lector_id, copia_id, fecha_prestamo)
+                except ValueError as e:
+                    resultado["error"] = str(e)
+                else:
+                    seq = self._registrar(
+                        "prestamo",
+                        lector_id=lector_id,
+                        copia_id=copia_id,
+                        fecha=fecha_prestamo.isoformat()
+                    )
+            resultados.append(resultado)
+        self._confirmar(seq)
+        return resultados
+
+    def _prestar(self, lector_id: str, copia_id: str, fecha_prestamo: datetime) -> Prestamo:
+        lector = self.lectores.get(lector_id)
+        if lector is None:
+            raise self._rechazo("prestamo", "lector_no_encontrado", "Lector no encontrado")
         
-        lector = self.lectores[lector_id]
-        copia = self.copias[copia_id]
+        copia = self.copias.get(copia_id)
+        if copia is None:
+            raise self._rechazo("prestamo", "copia_no_encontrada", "Copia no encontrada")
 
-        if not lector.puede_prestar():
-            if lector.esta_suspendido():
-                raise ValueError(f"Lector suspendido hasta {lector.fecha_fin_suspension}")
-            raise ValueError("Lector tiene el máximo de préstamos (3)")
+        hoy = fecha_prestamo.date()
+        if not lector.puede_prestar(hoy):
+            if lector.esta_suspendido(hoy):
+                raise self._rechazo(
+                    "prestamo", "lector_suspendido", f"Lector suspendido hasta {lector.fecha_fin_suspension}"
+                )
+            raise self._rechazo("prestamo", "maximo_prestamos", "Lector tiene el máximo de préstamos (3)")
 
-        if copia.estado != EstadoCopia.DISPONIBLE:
-            raise ValueError(f"Copia no disponible. Estado: {copia.estado}")
+        estado_anterior = copia.estado
+        reserva = None
+        if estado_anterior == EstadoCopia.RESERVADA:
+            reserva = self.reservas.asignada(copia_id)
+            if reserva is None or reserva.lector_id != lector_id:
+                raise self._rechazo("prestamo", "copia_reservada", "Copia no disponible. Reservada para otro lector")
+        elif estado_anterior != EstadoCopia.DISPONIBLE:
+            raise self._rechazo("prestamo", "copia_no_disponible", f"Copia no disponible. Estado: {copia.estado}")
 
-        fecha_prestamo = datetime.now()
         fecha_devolucion = fecha_prestamo + timedelta(days=30)
 
         prestamo = Prestamo(
@@ -63,16 +371,100 @@ class BibliotecaService:
             fecha_devolucion_esperada=fecha_devolucion
         )
 
-        copia.estado = EstadoCopia.PRESTADA
-        lector.prestamos_activos.append(prestamo)
+        with self.repositorio.transaccion():
+            self.repositorio.actualizar_estado_copia(copia, EstadoCopia.PRESTADA)
+            self.repositorio.registrar_prestamo(lector, prestamo)
+        self._nueva_version(("lector", lector_id), ("libro", copia.libro.id))
+        self.metricas.prestamo(estado_anterior)
+        self.disponibilidad.estado(copia.libro.id, estado_anterior, EstadoCopia.PRESTADA)
+        if reserva is not None:
+            self.reservas.liberar(copia_id)
+            if self.temporizador is not None:
+                self.temporizador.cancelar(("reserva", copia_id))
+        self.vencimientos.agregar(prestamo, lector_id)
+        self._programar_vencimiento(prestamo)
 
         return prestamo
 
+    def paginar_prestamos_vencidos(
+        self,
+        limite: int = LIMITE_PAGINA,
+        cursor: Optional[str] = None,
+        ahora: Optional[datetime] = None
+    ) -> Tuple[List[Tuple[Prestamo, str]], Optional[str]]:
+        prestamos, siguiente = self.vencimientos.vencidos(
+            ahora or self.reloj.ahora(), _decodificar_clave_vencimiento(cursor), _validar_limite(limite)
+        )
+        return prestamos, _codificar_clave_vencimiento(siguiente)
+
+    def libros_mas_prestados(
+        self,
+        limite: int = 10,
+        desde: Optional[datetime] = None,
+        hasta: Optional[datetime] = None
+    ) -> List[Tuple[Libro, int]]:
+        if desde is not None and hasta is not None and desde >= hasta:
+            raise ValueError("El inicio del período debe ser anterior al fin")
+        ranking = self.historial.mas_prestados(_validar_limite(limite), desde, hasta)
+        return [(self.libros[libro_id], prestamos) for libro_id, prestamos in ranking if libro_id in self.libros]
+
+    def circulacion_autor(self, nombre_autor: str) -> Optional[dict]:
+        return self.historial.circulacion_autor(nombre_autor)
+
+    def autores_mas_prestados(self, limite: int = 10) -> List[dict]:
+        return self.historial.autores_mas_prestados(_validar_limite(limite))
+
+    def resumen_circulacion(self) -> dict:
+        return self.historial.resumen()
+
     def devolver_libro(self, lector_id: str, copia_id: str) -> dict:
-        if lector_id not in self.lectores:
-            raise ValueError("Lector no encontrado")
+        with self._bloquear_copia(copia_id, ("lector", lector_id)):
+            fecha_devolucion = self.reloj.ahora()
+            resultado = self._devolver(lector_id, copia_id, fecha_devolucion)
+            seq = self._registrar(
+                "devolucion",
+                lector_id=lector_id,
+                copia_id=copia_id,
+                fecha=fecha_devolucion.isoformat()
+            )
+        self._confirmar(seq)
+        return resultado
+
+    def devolver_lote(self, pares: List[Tuple[str, str]]) -> dict:
+        resultados = []
+        libros_devueltos: Dict[str, None] = {}
+        seq = 0
+        fecha_devolucion = self.reloj.ahora()
+        for lector_id, copia_id in pares:
+            resultado = {"lector_id": lector_id, "copia_id": copia_id}
+            with self._bloquear_copia(copia_id, ("lector", lector_id)):
+                try:
+                    resultado.update(self._devolver(lector_id, copia_id, fecha_devolucion, notificar=False))
+                except ValueError as e:
+                    resultado["error"] = str(e)
+                else:
+                    if resultado["reservada_para"] is None:
+                        libros_devueltos[self.copias[copia_id].libro.id] = None
+                    seq = self._registrar(
+                        "devolucion",
+                        lector_id=lector_id,
+                        copia_id=copia_id,
+                        fecha=fecha_devolucion.isoformat()
+                    )
+            resultados.append(resultado)
+        notificaciones = {}
+        for libro_id in libros_devueltos:
+            with self._bloquear(("libro", libro_id)):
+                notificaciones[libro_id], seq_notificacion = self._notificar(libro_id)
+            seq = seq_notificacion or seq
+        self._confirmar(seq)
+        return {"resultados": resultados, "notificaciones": notificaciones}
+
+    def _devolver(self, lector_id: str, copia_id: str, fecha_devolucion: datetime, notificar: bool = True) -> dict:
+        lector = self.lectores.get(lector_id)
+        if lector is None:
+            raise self._rechazo("devolucion", "lector_no_encontrado", "Lector no encontrado")
 
-        lector = self.lectores[lector_id]
         prestamo_encontrado = None
 
         for prestamo in lector.prestamos_activos:
@@ -81,46 +473,318 @@ class BibliotecaService:
                 break
 
         if prestamo_encontrado is None:
-            raise ValueError("Préstamo no encontrado")
+            raise self._rechazo("devolucion", "prestamo_no_encontrado", "Préstamo no encontrado")
 
-        prestamo_encontrado.fecha_devolucion_real = datetime.now()
+        prestamo_encontrado.fecha_devolucion_real = fecha_devolucion
         dias_retraso = prestamo_encontrado.calcular_dias_retraso()
 
         if dias_retraso > 0:
-            lector.aplicar_multa(dias_retraso)
-            prestamo_encontrado.copia.estado = EstadoCopia.CON_RETRASO
-        
-        prestamo_encontrado.copia.estado = EstadoCopia.DISPONIBLE
-        lector.prestamos_activos.remove(prestamo_encontrado)
+            fin_anterior = lector.fecha_fin_suspension
+            lector.aplicar_multa(dias_retraso, hoy=fecha_devolucion.date())
+            self.metricas.suspension(fin_anterior, lector.fecha_fin_suspension)
+            self._programar_fin_suspension(lector)
 
-        emails_notificados = self.bio_alert.notificar_disponibilidad(
-            prestamo_encontrado.copia.libro.id
-        )
+        copia = prestamo_encontrado.copia
+        reserva = self.reservas.siguiente(copia.libro.id, lambda titular: self._puede_retirar(titular, fecha_devolucion))
+        estado_anterior = copia.estado
+        nuevo_estado = EstadoCopia.RESERVADA if reserva is not None else EstadoCopia.DISPONIBLE
+        with self.repositorio.transaccion():
+            self.repositorio.actualizar_estado_copia(copia, nuevo_estado)
+            self.repositorio.finalizar_prestamo(lector, prestamo_encontrado)
+        self._nueva_version(("lector", lector_id), ("libro", copia.libro.id))
+        self.metricas.devolucion(estado_anterior, nuevo_estado)
+        self.disponibilidad.estado(copia.libro.id, estado_anterior, nuevo_estado)
+        self.vencimientos.quitar(prestamo_encontrado)
+        self.historial.registrar(prestamo_encontrado, lector_id, dias_retraso)
+        if self.temporizador is not None:
+            self.temporizador.cancelar(("vencimiento", copia_id))
+
+        emails_notificados = []
+        if reserva is not None:
+            emails_notificados = self._asignar_reserva(reserva, copia, fecha_devolucion)
+        elif notificar:
+            emails_notificados, _ = self._notificar(copia.libro.id)
 
         return {
             "dias_retraso": dias_retraso,
             "multa_aplicada": dias_retraso * 2 if dias_retraso > 0 else 0,
-            "emails_notificados": emails_notificados
+            "emails_notificados": emails_notificados,
+            "notificacion_encolada": (notificar or reserva is not None) and self.despachador is not None,
+            "reservada_para": reserva.lector_id if reserva is not None else None
         }
 
-    def suscribir_lector(self, lector_id: str, libro_id: str):
-        if lector_id not in self.lectores:
+    def _puede_retirar(self, lector_id: str, fecha: datetime) -> bool:
+        lector = self.lectores.get(lector_id)
+        return lector is not None and lector.puede_prestar(fecha.date())
+
+    def _asignar_reserva(self, reserva: Reserva, copia: Copia, fecha: datetime) -> List[str]:
+        self.reservas.asignar(reserva, copia.id, fecha + PLAZO_RESERVA)
+        self._programar_reserva(reserva)
+        email = self.lectores[reserva.lector_id].email
+        if self.despachador is not None:
+            self.despachador.encolar_envio(email, copia.libro.id)
+            return []
+        self.metricas.notificadas(1)
+        return [email]
+
+    def _vencer_reserva(self, copia: Copia, fecha: datetime, notificar: bool = True) -> bool:
+        reserva = self.reservas.asignada(copia.id)
+        if reserva is None or copia.estado != EstadoCopia.RESERVADA or reserva.fecha_vencimiento > fecha:
+            return False
+        self.reservas.liberar(copia.id)
+        siguiente = self.reservas.siguiente(copia.libro.id, lambda titular: self._puede_retirar(titular, fecha))
+        if siguiente is not None:
+            self._nueva_version(("libro", copia.libro.id))
+            self._asignar_reserva(siguiente, copia, fecha)
+        else:
+            self._actualizar_estado(copia, EstadoCopia.DISPONIBLE)
+            if notificar:
+                self._notificar(copia.libro.id)
+        return True
+
+    def _notificar(self, libro_id: str) -> Tuple[List[str], int]:
+        suscripciones = self.bio_alert.retirar_suscriptores(libro_id, self.limite_notificaciones)
+        if not suscripciones:
+            return [], 0
+        seq = self._registrar("notificacion", libro_id=libro_id, lectores=[s.lector.id for s in suscripciones])
+        emails = [suscripcion.lector.email for suscripcion in suscripciones]
+        if self.despachador is not None:
+            for email in emails:
+                self.despachador.encolar_envio(email, libro_id)
+            return [], seq
+        self.metricas.notificadas(len(emails))
+        return emails, seq
+
+    def _rechazo(self, operacion: str, motivo: str, mensaje: str) -> ValueError:
+        self.metricas.rechazo(operacion, motivo)
+        return ValueError(mensaje)
+
+    def suscribir_lector(self, lector_id: str, libro_id: str) -> bool:
+        seq = 0
+        with self._bloquear(("lector", lector_id), ("libro", libro_id)):
+            fecha = self.reloj.ahora()
+            nueva = self._suscribir(lector_id, libro_id, fecha)
+            if nueva:
+                seq = self._registrar("suscripcion", lector_id=lector_id, libro_id=libro_id, fecha=fecha.isoformat())
+        self._confirmar(seq)
+        return nueva
+
+    def desuscribir_lector(self, lector_id: str, libro_id: str) -> bool:
+        seq = 0
+        with self._bloquear(("lector", lector_id), ("libro", libro_id)):
+            eliminada = self.bio_alert.desuscribir(lector_id, libro_id)
+            if eliminada:
+                seq = self._registrar("desuscripcion", lector_id=lector_id, libro_id=libro_id)
+        self._confirmar(seq)
+        return eliminada
+
+    def _suscribir(self, lector_id: str, libro_id: str, fecha: datetime) -> bool:
+        lector = self.lectores.get(lector_id)
+        if lector is None:
             raise ValueError("Lector no encontrado")
         
         if libro_id not in self.libros:
             raise ValueError("Libro no encontrado")
 
-        lector = self.lectores[lector_id]
-        self.bio_alert.suscribir(lector, libro_id)
+        return self.bio_alert.suscribir(lector, libro_id, fecha)
+
+    def reservar_libro(self, lector_id: str, libro_id: str, prioridad: int = 0) -> Reserva:
+        with self._bloquear(("lector", lector_id), ("libro", libro_id)):
+            fecha = self.reloj.ahora()
+            reserva = self._reservar(lector_id, libro_id, fecha, prioridad)
+            seq = self._registrar(
+                "reserva", lector_id=lector_id, libro_id=libro_id, fecha=fecha.isoformat(), prioridad=prioridad
+            )
+        self._confirmar(seq)
+        return reserva
+
+    def _reservar(self, lector_id: str, libro_id: str, fecha: datetime, prioridad: int) -> Reserva:
+        if lector_id not in self.lectores:
+            raise ValueError("Lector no encontrado")
+
+        if libro_id not in self.libros:
+            raise ValueError("Libro no encontrado")
+
+        if self.hay_copias_disponibles(libro_id):
+            raise ValueError("Hay copias disponibles, no es necesario reservar")
+
+        reserva = Reserva(lector_id=lector_id, libro_id=libro_id, fecha_reserva=fecha, prioridad=prioridad)
+        if not self.reservas.agregar(reserva):
+            raise ValueError("El lector ya tiene una reserva para este libro")
+        return reserva
+
+    def reservas_pendientes(self, libro_id: str) -> List[Reserva]:
+        if libro_id not in self.libros:
+            raise ValueError("Libro no encontrado")
+        return self.reservas.pendientes(libro_id)
+
+    def cancelar_reserva(self, lector_id: str, libro_id: str) -> bool:
+        seq = 0
+        with self._bloquear(("lector", lector_id), ("libro", libro_id)):
+            cancelada = self.reservas.cancelar(libro_id, lector_id) is not None
+            if cancelada:
+                seq = self._registrar("cancelacion_reserva", lector_id=lector_id, libro_id=libro_id)
+        self._confirmar(seq)
+        return cancelada
 
     def cambiar_estado_copia(self, copia_id: str, nuevo_estado: EstadoCopia):
-        if copia_id not in self.copias:
-            raise ValueError("Copia no encontrada")
-        
-        self.copias[copia_id].estado = nuevo_estado
+        with self._bloquear_copia(copia_id):
+            copia = self.copias.get(copia_id)
+            if copia is None:
+                raise ValueError("Copia no encontrada")
+            
+            seq = self._cambiar_estado(copia, nuevo_estado)
+        self._confirmar(seq)
+
+    def _cambiar_estado(self, copia: Copia, nuevo_estado: EstadoCopia) -> int:
+        if copia.estado == EstadoCopia.RESERVADA and nuevo_estado != EstadoCopia.RESERVADA:
+            self.reservas.liberar(copia.id)
+            if self.temporizador is not None:
+                self.temporizador.cancelar(("reserva", copia.id))
+        self._actualizar_estado(copia, nuevo_estado)
+        return self._registrar("estado_copia", copia_id=copia.id, estado=nuevo_estado.value)
+
+    def _actualizar_estado(self, copia: Copia, nuevo_estado: EstadoCopia):
+        estado_anterior = copia.estado
+        with self.repositorio.transaccion():
+            self.repositorio.actualizar_estado_copia(copia, nuevo_estado)
+        self._nueva_version(("libro", copia.libro.id))
+        self.metricas.copia(estado_anterior, nuevo_estado)
+        self.disponibilidad.estado(copia.libro.id, estado_anterior, nuevo_estado)
+
+    def activar_temporizador(self, ahora: Optional[datetime] = None):
+        with self.bloquear_todo():
+            self.temporizador = RuedaTemporizadores(_instante(ahora or self.reloj.ahora()))
+            for prestamo, _ in self.vencimientos:
+                self._programar_vencimiento(prestamo)
+            for lector in self.lectores.values():
+                self._programar_fin_suspension(lector)
+            for reserva in self.reservas.asignadas():
+                self._programar_reserva(reserva)
+
+    def iniciar_temporizador(self, intervalo: float = INTERVALO_TEMPORIZADOR):
+        self.activar_temporizador()
+        self._detener_temporizador.clear()
+        self._hilo_temporizador = threading.Thread(
+            target=self._ejecutar_temporizador, args=(intervalo,), name="temporizador", daemon=True
+        )
+        self._hilo_temporizador.start()
+
+    def detener_temporizador(self):
+        if self._hilo_temporizador is not None:
+            self._detener_temporizador.set()
+            self._hilo_temporizador.join()
+            self._hilo_temporizador = None
+
+    def _ejecutar_temporizador(self, intervalo: float):
+        while not self._detener_temporizador.wait(intervalo):
+            try:
+                self.procesar_temporizadores()
+            except Exception:
+                logger.exception("Error procesando temporizadores")
+
+    def _programar_vencimiento(self, prestamo: Prestamo):
+        if self.temporizador is not None:
+            self.temporizador.programar(
+                ("vencimiento", prestamo.copia.id), _instante(prestamo.fecha_devolucion_esperada)
+            )
+
+    def _programar_fin_suspension(self, lector: Lector):
+        if self.temporizador is not None and lector.fecha_fin_suspension is not None:
+            self.temporizador.programar(("suspension", lector.id), _fin_de_suspension(lector.fecha_fin_suspension))
+
+    def _programar_reserva(self, reserva: Reserva):
+        if self.temporizador is not None:
+            self.temporizador.programar(("reserva", reserva.copia_id), _instante(reserva.fecha_vencimiento))
+
+    def procesar_temporizadores(self, ahora: Optional[datetime] = None) -> Dict[str, int]:
+        ahora = ahora or self.reloj.ahora()
+        resultado = {"copias_con_retraso": 0, "suspensiones_finalizadas": 0, "reservas_vencidas": 0}
+        if self.temporizador is None:
+            return resultado
+        seq = 0
+        for (tipo, entidad_id), _ in self.temporizador.avanzar(_instante(ahora)):
+            if tipo == "vencimiento":
+                with self._bloquear(("copia", entidad_id)):
+                    copia = self.copias.get(entidad_id)
+                    if copia is not None and copia.estado == EstadoCopia.PRESTADA:
+                        seq = self._cambiar_estado(copia, EstadoCopia.CON_RETRASO) or seq
+                        resultado["copias_con_retraso"] += 1
+            elif tipo == "reserva":
+                with self._bloquear_copia(entidad_id):
+                    copia = self.copias.get(entidad_id)
+                    if copia is not None and self._vencer_reserva(copia, ahora):
+                        seq = self._registrar("vencimiento_reserva", copia_id=entidad_id, fecha=ahora.isoformat())
+                        resultado["reservas_vencidas"] += 1
+            else:
+                self._nueva_version(("lector", entidad_id))
+                resultado["suspensiones_finalizadas"] += 1
+        if resultado["suspensiones_finalizadas"]:
+            self.metricas.lectores_suspendidos(ahora.date())
+        self._confirmar(seq)
+        return resultado
 
     def obtener_copias_disponibles(self, libro_id: str) -> List[Copia]:
-        return [
-            copia for copia in self.copias.values()
-            if copia.libro.id == libro_id and copia.estado == EstadoCopia.DISPONIBLE
-        ]
\ No newline at end of file
+        return self.repositorio.copias_en_estado(libro_id, EstadoCopia.DISPONIBLE)
+
+    def _registrar(self, tipo: str, **datos) -> int:
+        if self.registro is None:
+            return 0
+        return self.registro.registrar({"tipo": tipo, **datos})
+
+    def _confirmar(self, seq: int):
+        if not seq:
+            return
+        if self.registro.requiere_instantanea():
+            with self.bloquear_todo():
+                if self.registro.requiere_instantanea():
+                    self.registro.guardar_instantanea(self)
+        if self.registro.durable:
+            self.registro.esperar(seq)
+
+    def aplicar_evento(self, evento: dict):
+        tipo = evento["tipo"]
+        if tipo == "libro":
+            autor = self.autores.obtener_o_crear(
+                evento["autor_nombre"], date.fromisoformat(evento["autor_fecha_nacimiento"])
+            )
+            self.agregar_libro(Libro(id=evento["id"], nombre=evento["nombre"], anio=evento["anio"], autor=autor))
+        elif tipo == "copia":
+            libro = self.libros[evento["libro_id"]]
+            self.agregar_copia(Copia(id=evento["id"], libro=libro, estado=EstadoCopia(evento["estado"])))
+        elif tipo == "lector":
+            fecha_fin = evento["fecha_fin_suspension"]
+            self.agregar_lector(Lector(
+                id=evento["id"],
+                nombre=evento["nombre"],
+                email=evento["email"],
+                dias_suspension=evento["dias_suspension"],
+                fecha_fin_suspension=date.fromisoformat(fecha_fin) if fecha_fin else None
+            ))
+        elif tipo == "prestamo":
+            self._prestar(evento["lector_id"], evento["copia_id"], datetime.fromisoformat(evento["fecha"]))
+        elif tipo == "devolucion":
+            self._devolver(
+                evento["lector_id"], evento["copia_id"], datetime.fromisoformat(evento["fecha"]), notificar=False
+            )
+        elif tipo == "estado_copia":
+            self.cambiar_estado_copia(evento["copia_id"], EstadoCopia(evento["estado"]))
+        elif tipo == "suscripcion":
+            self._suscribir(evento["lector_id"], evento["libro_id"], datetime.fromisoformat(evento["fecha"]))
+        elif tipo == "desuscripcion":
+            self.bio_alert.desuscribir(evento["lector_id"], evento["libro_id"])
+        elif tipo == "notificacion":
+            for lector_id in evento["lectores"]:
+                self.bio_alert.desuscribir(lector_id, evento["libro_id"])
+        elif tipo == "reserva":
+            self._reservar(
+                evento["lector_id"], evento["libro_id"], datetime.fromisoformat(evento["fecha"]), evento["prioridad"]
+            )
+        elif tipo == "cancelacion_reserva":
+            self.reservas.cancelar(evento["libro_id"], evento["lector_id"])
+        elif tipo == "vencimiento_reserva":
+            self._vencer_reserva(
+                self.copias[evento["copia_id"]], datetime.fromisoformat(evento["fecha"]), notificar=False
+            )
+        else:
+            raise ValueError(f"Evento desconocido: {tipo}")
@@ -0,0 +1,20 @@
+import asyncio
+from functools import partial
+from typing import Any, Awaitable, Callable
+
+Ejecutor = Callable[..., Awaitable[Any]]
+
+
+class BibliotecaAsync:
+    def __init__(self, service, ejecutor: Ejecutor = asyncio.to_thread):
+        self.service = service
+        self.ejecutor = ejecutor
+
+    def __getattr__(self, nombre: str):
+        atributo = getattr(self.service, nombre)
+        if not callable(atributo):
+            return atributo
+        return partial(self.ejecutar, nombre)
+
+    async def ejecutar(self, metodo: str, *args, **kwargs):
+        return await self.ejecutor(getattr(self.service, metodo), *args, **kwargs)
@@ -0,0 +1,303 @@
+import argparse
+import os
+import queue
+import signal
+import socket
+import sys
+import threading
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing.connection import Client, Listener
+from typing import List, Optional
+
+from configuracion import crear_biblioteca, cerrar_biblioteca, clave_servidor_estado
+from metricas import TIPO_CONTENIDO
+from persistencia import instantanea, restaurar_instantanea
+from service import BibliotecaService
+
+ESCRITURAS = frozenset({
+    "agregar_libro",
+    "agregar_copia",
+    "agregar_lector",
+    "prestar_libro",
+    "prestar_lote",
+    "devolver_libro",
+    "devolver_lote",
+    "suscribir_lector",
+    "desuscribir_lector",
+    "reservar_libro",
+    "cancelar_reserva",
+    "cambiar_estado_copia",
+})
+
+
+def _validar_clave(clave: Optional[bytes]):
+    if not clave:
+        raise ValueError("El servidor de estado requiere una clave de autenticación")
+
+
+class DifusorEventos:
+    def __init__(self, registro=None):
+        self.registro = registro
+        self._seq = registro.seq if registro is not None else 0
+        self._lock = threading.Lock()
+        self._suscriptores: List[queue.SimpleQueue] = []
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    @property
+    def durable(self) -> bool:
+        return self.registro is not None and self.registro.durable
+
+    def registrar(self, evento: dict) -> int:
+        with self._lock:
+            seq = self.registro.registrar(evento) if self.registro is not None else self._seq + 1
+            self._seq = seq
+            evento = {"seq": seq, **evento}
+            for cola in self._suscriptores:
+                cola.put(evento)
+        return seq
+
+    def esperar(self, seq: int):
+        if self.registro is not None:
+            self.registro.esperar(seq)
+
+    def requiere_instantanea(self) -> bool:
+        return self.registro is not None and self.registro.requiere_instantanea()
+
+    def guardar_instantanea(self, service: BibliotecaService):
+        self.registro.guardar_instantanea(service)
+
+    def suscribir(self) -> queue.SimpleQueue:
+        cola = queue.SimpleQueue()
+        with self._lock:
+            self._suscriptores.append(cola)
+        return cola
+
+    def desuscribir(self, cola: queue.SimpleQueue):
+        with self._lock:
+            if cola in self._suscriptores:
+                self._suscriptores.remove(cola)
+
+    def cerrar(self):
+        with self._lock:
+            for cola in self._suscriptores:
+                cola.put(None)
+            self._suscriptores = []
+
+
+class ServidorEstado:
+    def __init__(self, service: BibliotecaService, direccion: str, clave: bytes):
+        _validar_clave(clave)
+        self.service = service
+        self._direccion = direccion
+        self._clave = clave
+        self._cerrado = False
+        self._listener = Listener(direccion, family="AF_UNIX", authkey=clave)
+        os.chmod(direccion, 0o600)
+        self.difusor = DifusorEventos(service.registro)
+        service.registro = self.difusor
+        self._hilo = threading.Thread(target=self._aceptar, name="servidor-estado", daemon=True)
+
+    def iniciar(self) -> "ServidorEstado":
+        self._hilo.start()
+        return self
+
+    def _aceptar(self):
+        while True:
+            try:
+                conexion = self._listener.accept()
+            except OSError:
+                return
+            except Exception:
+                continue
+            if self._cerrado:
+                conexion.close()
+                return
+            threading.Thread(target=self._atender, args=(conexion,), daemon=True).start()
+
+    def _atender(self, conexion):
+        with conexion:
+            try:
+                while True:
+                    mensaje = conexion.recv()
+                    if mensaje[0] == "suscribir":
+                        self._difundir(conexion)
+                        return
+                    if mensaje[0] == "seq":
+                        conexion.send(self.difusor.seq)
+                    else:
+                        conexion.send(self._ejecutar(*mensaje[1:]))
+            except (EOFError, OSError):
+                return
+
+    def _ejecutar(self, metodo: str, args: tuple, kwargs: dict) -> tuple:
+        if metodo not in ESCRITURAS:
+            return "error", ValueError(f"Operación no permitida: {metodo}"), self.difusor.seq
+        try:
+            resultado = getattr(self.service, metodo)(*args, **kwargs)
+        except Exception as e:
+            return "error", e, self.difusor.seq
+        return "ok", resultado, self.difusor.seq
+
+    def _difundir(self, conexion):
+        with self.service.bloquear_todo():
+            datos = instantanea(self.service, self.difusor.seq)
+            cola = self.difusor.suscribir()
+        configuracion = {"limite_notificaciones": self.service.limite_notificaciones}
+        try:
+            conexion.send(("instantanea", datos, configuracion))
+            while True:
+                evento = cola.get()
+                if evento is None:
+                    return
+                conexion.send(("evento", evento))
+        finally:
+            self.difusor.desuscribir(cola)
+
+    def cerrar(self):
+        self._cerrado = True
+        Client(self._direccion, family="AF_UNIX", authkey=self._clave).close()
+        self._hilo.join()
+        self._listener.close()
+        self.service.registro = self.difusor.registro
+        self.difusor.cerrar()
+
+
+class ReplicaBiblioteca:
+    def __init__(self, direccion: str, clave: bytes):
+        _validar_clave(clave)
+        self.local = BibliotecaService()
+        self._direccion = direccion
+        self._clave = clave
+        self._conexiones: queue.SimpleQueue = queue.SimpleQueue()
+        self._condicion = threading.Condition()
+        self._desconectada = False
+        self._eventos = self._conectar()
+        self._eventos.send(("suscribir",))
+        _, datos, configuracion = self._eventos.recv()
+        self.local.limite_notificaciones = configuracion["limite_notificaciones"]
+        restaurar_instantanea(self.local, datos)
+        self._seq_aplicado = datos["seq"]
+        self._hilo = threading.Thread(target=self._aplicar_eventos, name="replica-biblioteca", daemon=True)
+        self._hilo.start()
+
+    def __getattr__(self, nombre: str):
+        if nombre in ESCRITURAS:
+            return partial(self._llamar, nombre)
+        return getattr(self.local, nombre)
+
+    @property
+    def seq_aplicado(self) -> int:
+        return self._seq_aplicado
+
+    def _conectar(self):
+        return Client(self._direccion, family="AF_UNIX", authkey=self._clave)
+
+    def _enviar(self, mensaje: tuple):
+        try:
+            conexion = self._conexiones.get_nowait()
+        except queue.Empty:
+            conexion = self._conectar()
+        try:
+            conexion.send(mensaje)
+            respuesta = conexion.recv()
+        except BaseException:
+            conexion.close()
+            raise
+        self._conexiones.put(conexion)
+        return respuesta
+
+    def _llamar(self, metodo: str, *args, **kwargs):
+        estado, resultado, seq = self._enviar(("llamar", metodo, args, kwargs))
+        self.esperar(seq)
+        if estado == "error":
+            raise resultado
+        return resultado
+
+    def _aplicar_eventos(self):
+        try:
+            while True:
+                _, evento = self._eventos.recv()
+                self.local.aplicar_evento(evento)
+                with self._condicion:
+                    self._seq_aplicado = evento["seq"]
+                    self._condicion.notify_all()
+        except (EOFError, OSError):
+            with self._condicion:
+                self._desconectada = True
+                self._condicion.notify_all()
+
+    def esperar(self, seq: int):
+        with self._condicion:
+            while self._seq_aplicado < seq:
+                if self._desconectada:
+                    raise ConnectionError("Conexión con el servidor de estado perdida")
+                self._condicion.wait()
+
+    def sincronizar(self):
+        self.esperar(self._enviar(("seq",)))
+
+    def cerrar(self):
+        with socket.socket(fileno=os.dup(self._eventos.fileno())) as conexion:
+            conexion.shutdown(socket.SHUT_RDWR)
+        self._hilo.join()
+        self._eventos.close()
+        while True:
+            try:
+                self._conexiones.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def servir_metricas(service: BibliotecaService, host: str, puerto: int) -> ThreadingHTTPServer:
+    class ManejadorMetricas(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            lineas = service.metricas.exponer(service.despachador, service.reloj.hoy())
+            cuerpo = ("\n".join(lineas) + "\n").encode()
+            self.send_response(200)
+            self.send_header("Content-Type", TIPO_CONTENIDO)
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer((host, puerto), ManejadorMetricas)
+    threading.Thread(target=servidor.serve_forever, name="metricas-estado", daemon=True).start()
+    return servidor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Proceso dueño del estado compartido entre workers de la API")
+    parser.add_argument("socket", help="ruta del socket Unix en el que escuchar")
+    parser.add_argument("--metricas-puerto", type=int, help="exponer las métricas de dominio en /metrics por HTTP")
+    parser.add_argument("--metricas-host", default="127.0.0.1")
+    args = parser.parse_args()
+
+    if os.path.exists(args.socket):
+        os.remove(args.socket)
+    biblioteca = crear_biblioteca()
+    servidor = ServidorEstado(biblioteca, args.socket, clave_servidor_estado()).iniciar()
+    metricas = servir_metricas(biblioteca, args.metricas_host, args.metricas_puerto) if args.metricas_puerto else None
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        signal.pause()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if metricas is not None:
+            metricas.shutdown()
+            metricas.server_close()
+        servidor.cerrar()
+        cerrar_biblioteca(biblioteca)
+
+
+if __name__ == "__main__":
+    main()
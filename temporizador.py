@@ -0,0 +1,92 @@
+import threading
+from typing import Any, Dict, Hashable, List, Tuple
+
+RANURAS = 64
+NIVELES = 5
+
+
+class RuedaTemporizadores:
+    def __init__(self, actual: int, ranuras: int = RANURAS, niveles: int = NIVELES):
+        self._ranuras = ranuras
+        self._niveles = niveles
+        self._actual = actual
+        self._ruedas: List[List[List[Tuple[int, Hashable]]]] = [
+            [[] for _ in range(ranuras)] for _ in range(niveles)
+        ]
+        self._cantidades = [0] * niveles
+        self._inmediatos: List[Tuple[int, Hashable]] = []
+        self._pendientes: Dict[Hashable, Tuple[int, Any]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._pendientes)
+
+    @property
+    def actual(self) -> int:
+        return self._actual
+
+    def programar(self, clave: Hashable, vencimiento: int, datos: Any = None):
+        with self._lock:
+            self._pendientes[clave] = (vencimiento, datos)
+            self._insertar(vencimiento, clave)
+
+    def cancelar(self, clave: Hashable) -> bool:
+        with self._lock:
+            return self._pendientes.pop(clave, None) is not None
+
+    def _insertar(self, vencimiento: int, clave: Hashable):
+        delta = vencimiento - self._actual
+        if delta <= 0:
+            self._inmediatos.append((vencimiento, clave))
+            return
+        nivel = 0
+        alcance = self._ranuras
+        while delta >= alcance and nivel < self._niveles - 1:
+            nivel += 1
+            alcance *= self._ranuras
+        ranura = (vencimiento // (alcance // self._ranuras)) % self._ranuras
+        self._ruedas[nivel][ranura].append((vencimiento, clave))
+        self._cantidades[nivel] += 1
+
+    def avanzar(self, hasta: int) -> List[Tuple[Hashable, Any]]:
+        with self._lock:
+            vencidas, self._inmediatos = self._inmediatos, []
+            while self._actual < hasta:
+                self._actual = self._proximo(hasta)
+                self._cascada()
+                if self._inmediatos:
+                    vencidas.extend(self._inmediatos)
+                    self._inmediatos = []
+                ranura = self._actual % self._ranuras
+                entradas = self._ruedas[0][ranura]
+                if entradas:
+                    self._ruedas[0][ranura] = []
+                    self._cantidades[0] -= len(entradas)
+                    vencidas.extend(entradas)
+            disparadas = []
+            for vencimiento, clave in vencidas:
+                pendiente = self._pendientes.get(clave)
+                if pendiente is not None and pendiente[0] == vencimiento:
+                    del self._pendientes[clave]
+                    disparadas.append((clave, pendiente[1]))
+            return disparadas
+
+    def _proximo(self, hasta: int) -> int:
+        paso = 1
+        for cantidad in self._cantidades:
+            if cantidad:
+                return min(hasta, (self._actual // paso + 1) * paso)
+            paso *= self._ranuras
+        return hasta
+
+    def _cascada(self):
+        paso = self._ranuras ** (self._niveles - 1)
+        for nivel in range(self._niveles - 1, 0, -1):
+            if self._actual % paso == 0 and self._cantidades[nivel]:
+                ranura = (self._actual // paso) % self._ranuras
+                entradas = self._ruedas[nivel][ranura]
+                self._ruedas[nivel][ranura] = []
+                self._cantidades[nivel] -= len(entradas)
+                for vencimiento, clave in entradas:
+                    self._insertar(vencimiento, clave)
+            paso //= self._ranuras
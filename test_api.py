@@ -553,4 +553,280 @@ def test_multiples_prestamos_mismo_lector(biblioteca, lector_test, libro_se, aut
     biblioteca.prestar_libro(lector_test.id, copia1.id)
     biblioteca.prestar_libro(lector_test.id, copia2.id)
     
-    assert len(lector_test.prestamos_activos) == 2
\ No newline at end of file
+    assert len(lector_test.prestamos_activos) == 2
+
+def test_api_importar_ndjson():
+    from fastapi.testclient import TestClient
+    from main import app
+
+    cuerpo = (
+        b'{"tipo": "libro", "id": "IMP1", "nombre": "Libro", "anio": 2020, '
+        b'"autor_nombre": "Importado", "autor_fecha_nacimiento": "1950-01-01"}\n'
+        b'{"tipo": "copia", "id": "IMP-C1", "libro_id": "IMP1"}\n'
+        b'{"tipo": "copia", "id": "IMP-C2", "libro_id": "IMP1", "estado": "rota"}\n'
+        b'{"tipo": "lector", "id": "IMP-L1", "nombre": "Juan", "email": "juan@example.com"}'
+    )
+    respuesta = TestClient(app).post("/importar/", content=cuerpo)
+
+    assert respuesta.status_code == 200
+    datos = respuesta.json()
+    assert datos["importadas"] == {"libro": 1, "copia": 1, "lector": 1}
+    assert [e["linea"] for e in datos["errores"]] == [3]
+
+
+def test_api_prestamos_y_devoluciones_en_lote():
+    from fastapi.testclient import TestClient
+    from main import app
+
+    client = TestClient(app)
+    libro_id = client.post("/libros/", json={
+        "nombre": "Lote", "anio": 2020, "autor_nombre": "Autor Lote", "autor_fecha_nacimiento": "1950-01-01"
+    }).json()["libro_id"]
+    for copia_id in ("LOTE-C1", "LOTE-C2"):
+        client.post("/copias/", json={"id": copia_id, "libro_id": libro_id})
+    client.post("/lectores/", json={"id": "LOTE-L1", "nombre": "Juan", "email": "juan@example.com"})
+
+    prestamos = client.post("/prestamos/lote", json={"items": [
+        {"lector_id": "LOTE-L1", "copia_id": "LOTE-C1"},
+        {"lector_id": "LOTE-L1", "copia_id": "LOTE-C1"},
+        {"lector_id": "LOTE-L1", "copia_id": "LOTE-C2"},
+    ]}).json()
+    assert prestamos["prestamos_realizados"] == 2
+    assert [r["exito"] for r in prestamos["resultados"]] == [True, False, True]
+
+    devoluciones = client.post("/devoluciones/lote", json={"items": [
+        {"lector_id": "LOTE-L1", "copia_id": "LOTE-C1"},
+        {"lector_id": "LOTE-L1", "copia_id": "LOTE-C2"},
+    ]}).json()
+    assert devoluciones["devoluciones_realizadas"] == 2
+    assert devoluciones["notificaciones_enviadas"] == {libro_id: 0}
+
+
+def test_api_paginar_copias_libro():
+    from fastapi.testclient import TestClient
+    from main import app
+
+    client = TestClient(app)
+    libro_id = client.post("/libros/", json={
+        "nombre": "Paginado", "anio": 2020, "autor_nombre": "Autor Paginado", "autor_fecha_nacimiento": "1950-01-01"
+    }).json()["libro_id"]
+    for i in range(5):
+        client.post("/copias/", json={"id": f"PAG-C{i}", "libro_id": libro_id})
+
+    vistas = []
+    cursor = None
+    while True:
+        parametros = {"limite": 2} if cursor is None else {"limite": 2, "cursor": cursor}
+        datos = client.get(f"/libros/{libro_id}/copias", params=parametros).json()
+        vistas.extend(c["id"] for c in datos["copias"])
+        cursor = datos["siguiente_cursor"]
+        if cursor is None:
+            break
+
+    assert vistas == [f"PAG-C{i}" for i in range(5)]
+    primera = client.get(f"/libros/{libro_id}/copias", params={"limite": 2}).json()
+    assert (primera["cantidad_copias"], primera["cantidad_pagina"]) == (5, 2)
+    client.post("/libros/", json={
+        "nombre": "Paginado II", "anio": 2021, "autor_nombre": "Autor Paginado", "autor_fecha_nacimiento": "1950-01-01"
+    })
+    autor = client.get("/libros/autor/Autor Paginado", params={"limite": 1}).json()
+    assert (autor["cantidad"], autor["cantidad_pagina"]) == (2, 1)
+    assert client.get(f"/libros/{libro_id}/copias", params={"limite": 5000}).status_code == 400
+
+
+def test_api_autores_registrados():
+    from fastapi.testclient import TestClient
+    from main import app
+
+    client = TestClient(app)
+    creados = [
+        client.post("/libros/", json={
+            "nombre": f"Edición {i}", "anio": 2000 + i, "autor_nombre": nombre, "autor_fecha_nacimiento": "1931-07-03"
+        }).json()
+        for i, nombre in enumerate(["Autora Registrada", "autora registrada"])
+    ]
+    autor_id = creados[0]["autor_id"]
+    assert creados[1]["autor_id"] == autor_id
+
+    autor = client.get(f"/autores/{autor_id}").json()
+    assert autor["nombre"] == "Autora Registrada"
+    assert sorted(l["id"] for l in autor["libros"]) == sorted(c["libro_id"] for c in creados)
+    assert [a["id"] for a in client.get("/autores/", params={"nombre": "AUTORA REGISTRADA"}).json()["autores"]] == [autor_id]
+    assert client.get("/autores/inexistente").status_code == 404
+
+
+def test_api_buscar_libros():
+    from fastapi.testclient import TestClient
+    from main import app
+
+    client = TestClient(app)
+    client.post("/libros/", json={
+        "nombre": "Introducción a la Búsqueda", "anio": 2021,
+        "autor_nombre": "Autor Buscador", "autor_fecha_nacimiento": "1950-01-01"
+    })
+
+    datos = client.get("/libros/buscar", params={"q": "introduccion busq"}).json()
+
+    assert [l["nombre"] for l in datos["libros"]] == ["Introducción a la Búsqueda"]
+    assert datos["libros"][0]["puntaje"] > 0
+    assert client.get("/libros/buscar", params={"q": "x", "limite": 0}).status_code == 400
+
+
+def test_api_get_condicional_con_etag():
+    from fastapi.testclient import TestClient
+    from main import app, cache
+
+    client = TestClient(app)
+    libro_id = client.post("/libros/", json={
+        "nombre": "Condicional", "anio": 2022, "autor_nombre": "Autor ETag", "autor_fecha_nacimiento": "1950-01-01"
+    }).json()["libro_id"]
+    client.post("/copias/", json={"id": "ETAG-C1", "libro_id": libro_id})
+    client.post("/lectores/", json={"id": "ETAG-L1", "nombre": "Juan", "email": "juan@example.com"})
+
+    primera = client.get(f"/libros/{libro_id}/copias")
+    etag = primera.headers["etag"]
+    aciertos = cache.aciertos
+    assert client.get(f"/libros/{libro_id}/copias").json() == primera.json()
+    assert cache.aciertos == aciertos + 1
+
+    no_modificada = client.get(f"/libros/{libro_id}/copias", headers={"If-None-Match": f"W/{etag}"})
+    assert no_modificada.status_code == 304
+    assert no_modificada.headers["etag"] == etag
+
+    lector_etag = client.get("/lectores/ETAG-L1").headers["etag"]
+    assert client.get("/lectores/ETAG-L1", headers={"If-None-Match": lector_etag}).status_code == 304
+
+    client.post("/prestamos/", json={"lector_id": "ETAG-L1", "copia_id": "ETAG-C1"})
+
+    copias = client.get(f"/libros/{libro_id}/copias", headers={"If-None-Match": etag})
+    assert copias.status_code == 200
+    assert copias.json()["copias"] == [{"id": "ETAG-C1", "estado": "prestada"}]
+    lector = client.get("/lectores/ETAG-L1", headers={"If-None-Match": lector_etag})
+    assert lector.status_code == 200
+    assert lector.json()["prestamos_activos"] == 1
+    assert client.get("/lectores/ETAG-NO-EXISTE").status_code == 404
+
+
+def test_api_metricas_prometheus():
+    from fastapi.testclient import TestClient
+    from main import app
+
+    client = TestClient(app)
+    client.post("/lectores/", json={"id": "MET-L1", "nombre": "Juan", "email": "juan@example.com"})
+    client.get("/lectores/MET-L1")
+    client.post("/prestamos/", json={"lector_id": "MET-L1", "copia_id": "MET-NO-EXISTE"})
+
+    respuesta = client.get("/metrics")
+    texto = respuesta.text
+
+    assert respuesta.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'biblioteca_peticiones_segundos_count{metodo="GET",ruta="/lectores/{lector_id}"}' in texto
+    assert 'biblioteca_peticiones_total{metodo="POST",ruta="/prestamos/",estado="400"}' in texto
+    assert 'biblioteca_rechazos_total{operacion="prestamo",motivo="copia_no_encontrada"}' in texto
+    assert 'biblioteca_copias{estado="disponible"}' in texto
+    assert "# TYPE biblioteca_prestamos_activos gauge" in texto
+
+
+def test_api_prestamos_vencidos(monkeypatch):
+    from datetime import datetime, timedelta
+    from fastapi.testclient import TestClient
+    from reloj import RelojVirtual
+    import main
+
+    client = TestClient(main.app)
+    libro_id = client.post("/libros/", json={
+        "nombre": "Vencido", "anio": 2020, "autor_nombre": "Autor Vencido", "autor_fecha_nacimiento": "1950-01-01"
+    }).json()["libro_id"]
+    client.post("/copias/", json={"id": "VENC-C1", "libro_id": libro_id})
+    client.post("/lectores/", json={"id": "VENC-L1", "nombre": "Juan", "email": "juan@example.com"})
+    client.post("/prestamos/", json={"lector_id": "VENC-L1", "copia_id": "VENC-C1"})
+
+    monkeypatch.setattr(main.biblioteca, "reloj", RelojVirtual(datetime.now() + timedelta(days=3650)))
+    datos = client.get("/prestamos/vencidos", params={"limite": 1000}).json()
+
+    vencido = next(p for p in datos["prestamos"] if p["copia_id"] == "VENC-C1")
+    assert vencido["lector_id"] == "VENC-L1"
+    assert vencido["libro_id"] == libro_id
+    assert vencido["dias_retraso"] >= 3619
+    assert client.get("/prestamos/vencidos", params={"cursor": "%%%"}).status_code == 400
+
+
+def test_api_estadisticas_de_circulacion():
+    from fastapi.testclient import TestClient
+    from main import app
+
+    client = TestClient(app)
+    libro_id = client.post("/libros/", json={
+        "nombre": "Circulado", "anio": 2020, "autor_nombre": "Autor Estadisticas", "autor_fecha_nacimiento": "1950-01-01"
+    }).json()["libro_id"]
+    client.post("/copias/", json={"id": "EST-C1", "libro_id": libro_id})
+    client.post("/lectores/", json={"id": "EST-L1", "nombre": "Juan", "email": "juan@example.com"})
+    for _ in range(3):
+        client.post("/prestamos/", json={"lector_id": "EST-L1", "copia_id": "EST-C1"})
+        client.post("/devoluciones/", json={"lector_id": "EST-L1", "copia_id": "EST-C1"})
+
+    autor = client.get("/estadisticas/autores/autor estadisticas").json()
+    assert autor == {"autor": "Autor Estadisticas", "prestamos": 3, "devoluciones_con_retraso": 0, "tasa_retraso": 0.0}
+    libros = client.get("/estadisticas/libros-mas-prestados", params={"limite": 1000}).json()["libros"]
+    assert {"id": libro_id, "nombre": "Circulado", "autor": "Autor Estadisticas", "prestamos": 3} in libros
+    assert client.get("/estadisticas/circulacion").json()["prestamos"] >= 3
+    assert client.get("/estadisticas/autores/Nadie").status_code == 404
+    assert client.get("/estadisticas/autores", params={"limite": 0}).status_code == 400
+
+
+def test_api_reservas():
+    from fastapi.testclient import TestClient
+    from main import app
+
+    client = TestClient(app)
+    libro_id = client.post("/libros/", json={
+        "nombre": "Reservado", "anio": 2020, "autor_nombre": "Autor Reservas", "autor_fecha_nacimiento": "1950-01-01"
+    }).json()["libro_id"]
+    client.post("/copias/", json={"id": "RES-C1", "libro_id": libro_id})
+    for lector_id in ("RES-L1", "RES-L2", "RES-L3"):
+        client.post("/lectores/", json={"id": lector_id, "nombre": "Juan", "email": f"{lector_id}@example.com"})
+
+    assert client.post("/reservas/", json={"lector_id": "RES-L2", "libro_id": libro_id}).status_code == 400
+    client.post("/prestamos/", json={"lector_id": "RES-L1", "copia_id": "RES-C1"})
+    assert client.post("/reservas/", json={"lector_id": "RES-L2", "libro_id": libro_id}).status_code == 200
+    assert client.post(
+        "/reservas/", json={"lector_id": "RES-L3", "libro_id": libro_id, "prioridad": -10}
+    ).json()["prioridad"] == 0
+    assert client.delete(f"/reservas/RES-L3/{libro_id}").status_code == 200
+    assert client.delete(f"/reservas/RES-L3/{libro_id}").status_code == 404
+    assert [r["lector_id"] for r in client.get(f"/reservas/{libro_id}").json()["pendientes"]] == ["RES-L2"]
+
+    devolucion = client.post("/devoluciones/", json={"lector_id": "RES-L1", "copia_id": "RES-C1"}).json()
+    assert devolucion["reservada_para"] == "RES-L2"
+    assert client.post("/prestamos/", json={"lector_id": "RES-L1", "copia_id": "RES-C1"}).status_code == 400
+    assert client.post("/prestamos/", json={"lector_id": "RES-L2", "copia_id": "RES-C1"}).status_code == 200
+
+
+def test_api_disponibilidad_del_catalogo():
+    from fastapi.testclient import TestClient
+    from main import app
+
+    client = TestClient(app)
+    libro_id = client.post("/libros/", json={
+        "nombre": "Catalogado", "anio": 2020, "autor_nombre": "Autor Catalogo", "autor_fecha_nacimiento": "1950-01-01"
+    }).json()["libro_id"]
+    client.post("/copias/", json={"id": "CAT-C1", "libro_id": libro_id})
+    client.post("/copias/", json={"id": "CAT-C2", "libro_id": libro_id})
+    client.post("/lectores/", json={"id": "CAT-L1", "nombre": "Juan", "email": "juan@example.com"})
+    client.post("/prestamos/", json={"lector_id": "CAT-L1", "copia_id": "CAT-C1"})
+
+    libros, cursor = [], None
+    while True:
+        params = {"limite": 1000, "filtro": "disponibles", **({"cursor": cursor} if cursor else {})}
+        datos = client.get("/catalogo/disponibilidad", params=params).json()
+        libros += datos["libros"]
+        cursor = datos["siguiente_cursor"]
+        if cursor is None:
+            break
+
+    assert {
+        "id": libro_id, "nombre": "Catalogado", "autor": "Autor Catalogo",
+        "total_copias": 2, "disponibles": 1, "en_espera": 0
+    } in libros
+    assert client.get("/catalogo/disponibilidad", params={"filtro": "otro"}).status_code == 400
+    assert client.get("/catalogo/disponibilidad", params={"cursor": "%%%"}).status_code == 400
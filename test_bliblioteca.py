@@ -1,7 +1,21 @@
 import pytest
+import random
+import sys
+import threading
+import time
+from collections import Counter
 from datetime import date, datetime, timedelta
 from models import Autor, Libro, Copia, Lector, EstadoCopia, BioAlert, Prestamo, Suscripcion
 from service import BibliotecaService
+from repositorio import IndiceOrdenado
+import busqueda
+import reservas
+from cache import CacheRespuestas
+from vencimientos import IndiceVencimientos
+from temporizador import RuedaTemporizadores
+from reloj import RelojVirtual
+from historial import HistorialPrestamos
+from disponibilidad import DisponibilidadLibro
 
 
 @pytest.fixture
@@ -164,6 +178,38 @@ def test_obtener_libros_autor_inexistente(biblioteca):
     assert len(libros) == 0
 
 
+def test_libros_comparten_autor_registrado(biblioteca, autor_somerville):
+    ediciones = [
+        Libro(nombre=f"Software Engineering {i}", anio=2000 + i,
+              autor=Autor(nombre=nombre, fecha_nacimiento=date(1950, 1, 1)))
+        for i, nombre in enumerate(["Somerville", "somerville", "  SOMERVILLE "])
+    ]
+    homonimo = Libro(nombre="Otro", anio=2020, autor=Autor(nombre="Somerville", fecha_nacimiento=date(1970, 1, 1)))
+    for libro in [*ediciones, homonimo]:
+        biblioteca.agregar_libro(libro)
+
+    autor = biblioteca.libros[ediciones[0].id].autor
+    assert all(biblioteca.libros[libro.id].autor is autor for libro in ediciones)
+    assert biblioteca.libros[homonimo.id].autor is not autor
+    assert autor == autor_somerville
+    assert biblioteca.registrar_autor("SomerVille", date(1950, 1, 1)) is autor
+    assert biblioteca.obtener_autor(autor.id) is autor
+    assert len(biblioteca.buscar_autores("somerville")) == 2
+    assert sorted(l.id for l in biblioteca.obtener_libros_de_autor(autor.id)) == sorted(l.id for l in ediciones)
+    assert len(biblioteca.obtener_libros_por_autor("Somerville")) == 4
+    with pytest.raises(ValueError, match="Autor no encontrado"):
+        biblioteca.obtener_libros_de_autor("inexistente")
+
+
+def test_registro_autores_distingue_nombres_con_guion_bajo(biblioteca):
+    con_espacio = biblioteca.registrar_autor("Jean Paul", date(1905, 6, 21))
+    con_guion = biblioteca.registrar_autor("Jean_Paul", date(1905, 6, 21))
+
+    assert con_espacio.id != con_guion.id
+    assert biblioteca.obtener_autor(con_espacio.id) is con_espacio
+    assert biblioteca.obtener_autor(con_guion.id) is con_guion
+
+
 def test_agregar_lector(biblioteca, lector_test):
     biblioteca.agregar_lector(lector_test)
     assert lector_test.id in biblioteca.lectores
@@ -553,4 +599,813 @@ def test_multiples_prestamos_mismo_lector(biblioteca, lector_test, libro_se, aut
     biblioteca.prestar_libro(lector_test.id, copia1.id)
     biblioteca.prestar_libro(lector_test.id, copia2.id)
     
-    assert len(lector_test.prestamos_activos) == 2
\ No newline at end of file
+    assert len(lector_test.prestamos_activos) == 2
+
+def test_obtener_libros_por_autor_casefold(biblioteca):
+    autor = Autor(nombre="Straße", fecha_nacimiento=date(1960, 1, 1))
+    biblioteca.agregar_libro(Libro(nombre="Libro", anio=2020, autor=autor))
+
+    assert len(biblioteca.obtener_libros_por_autor("STRASSE")) == 1
+
+
+def test_indice_autor_actualizado_al_reemplazar_libro(biblioteca, autor_somerville, autor_pressman):
+    biblioteca.agregar_libro(Libro(nombre="Libro", anio=2020, autor=autor_somerville, id="X1"))
+    biblioteca.agregar_libro(Libro(nombre="Libro", anio=2020, autor=autor_pressman, id="X1"))
+
+    assert biblioteca.obtener_libros_por_autor("Somerville") == []
+    assert [l.id for l in biblioteca.obtener_libros_por_autor("Pressman")] == ["X1"]
+
+
+def test_agregar_copia_indexa_autor(biblioteca, libro_se):
+    biblioteca.agregar_copia(Copia(id="C001", libro=libro_se))
+
+    libros = biblioteca.obtener_libros_por_autor("somerville")
+    assert [l.id for l in libros] == [libro_se.id]
+
+
+def test_indice_copias_sigue_cambios_de_estado(biblioteca, lector_test, libro_se):
+    biblioteca.agregar_lector(lector_test)
+    biblioteca.agregar_copia(Copia(id="C001", libro=libro_se))
+    biblioteca.agregar_copia(Copia(id="C002", libro=libro_se))
+
+    biblioteca.prestar_libro(lector_test.id, "C001")
+    assert biblioteca.contar_copias_estado(libro_se.id, EstadoCopia.PRESTADA) == 1
+    assert [c.id for c in biblioteca.obtener_copias_disponibles(libro_se.id)] == ["C002"]
+
+    biblioteca.cambiar_estado_copia("C002", EstadoCopia.EN_REPARACION)
+    assert biblioteca.hay_copias_disponibles(libro_se.id) is False
+
+    biblioteca.devolver_libro(lector_test.id, "C001")
+    assert biblioteca.contar_copias_estado(libro_se.id, EstadoCopia.PRESTADA) == 0
+    assert [c.id for c in biblioteca.obtener_copias_disponibles(libro_se.id)] == ["C001"]
+    assert biblioteca.contar_copias_libro(libro_se.id) == 2
+
+
+def test_reemplazar_copia_actualiza_indice(biblioteca, libro_se, libro_se_10th):
+    biblioteca.agregar_copia(Copia(id="C001", libro=libro_se))
+    biblioteca.agregar_copia(Copia(id="C001", libro=libro_se_10th, estado=EstadoCopia.EN_REPARACION))
+
+    assert biblioteca.contar_copias_libro(libro_se.id) == 0
+    assert biblioteca.contar_copias_estado(libro_se_10th.id, EstadoCopia.EN_REPARACION) == 1
+
+
+def test_importar_ndjson_reporta_errores_por_linea(biblioteca):
+    from importacion import ImportadorNDJSON
+    lineas = [
+        b'{"tipo": "libro", "id": "X1", "nombre": "Libro", "anio": 2020, '
+        b'"autor_nombre": "Somerville", "autor_fecha_nacimiento": "1950-01-01"}',
+        b'{"tipo": "copia", "id": "C001", "libro_id": "X1"}',
+        b'{"tipo": "copia", "id": "C002", "libro_id": "NO_EXISTE"}',
+        b'',
+        b'{"tipo": "lector", "id": "L001", "nombre": "Juan"}',
+        b'{no es json',
+        b'{"tipo": "lector", "id": "L002", "nombre": "Maria", "email": "maria@example.com"}',
+    ]
+
+    resultado = ImportadorNDJSON(biblioteca, tam_lote=2).importar(lineas)
+
+    assert resultado["procesadas"] == 6
+    assert resultado["importadas"] == {"libro": 1, "copia": 1, "lector": 1}
+    assert [e["linea"] for e in resultado["errores"]] == [3, 5, 6]
+    assert "Libro no encontrado" in resultado["errores"][0]["error"]
+    assert "email" in resultado["errores"][1]["error"]
+    assert biblioteca.contar_copias_libro("X1") == 1
+    assert "L002" in biblioteca.lectores
+
+
+def test_importar_ndjson_rechaza_lineas_con_varios_registros(biblioteca):
+    from importacion import ImportadorNDJSON
+    lector = b'{"tipo": "lector", "id": "%s", "nombre": "Juan", "email": "juan@example.com"}'
+    lineas = [lector % b"A" + b"," + lector % b"B", lector % b"C", lector % b"D"]
+
+    resultado = ImportadorNDJSON(biblioteca, tam_lote=3).importar(lineas)
+
+    assert resultado["importadas"]["lector"] == 2
+    assert [e["linea"] for e in resultado["errores"]] == [1]
+    assert {"C", "D"} <= set(biblioteca.lectores) and "A" not in biblioteca.lectores
+
+
+def test_importar_ndjson_rechaza_registro_partido_en_dos_lineas(biblioteca):
+    from importacion import ImportadorNDJSON
+    lineas = [
+        b'{"tipo": "libro", "id": "B", "nombre": "Libro", "anio": 2020, '
+        b'"autor_nombre": "Somerville", "autor_fecha_nacimiento": "1950-01-01"},'
+        b'{"tipo": "copia", "id": "C001", "libro_id": "B"',
+        b'"estado": "disponible"}',
+    ]
+
+    resultado = ImportadorNDJSON(biblioteca).importar(lineas)
+
+    assert resultado["importadas"] == {"libro": 0, "copia": 0, "lector": 0}
+    assert [e["linea"] for e in resultado["errores"]] == [1, 2]
+    assert "B" not in biblioteca.libros and "C001" not in biblioteca.copias
+
+
+def test_prestar_lote_resultado_por_item(biblioteca, lector_test, libro_se):
+    biblioteca.agregar_lector(lector_test)
+    for i in range(1, 5):
+        biblioteca.agregar_copia(Copia(id=f"C00{i}", libro=libro_se))
+
+    resultados = biblioteca.prestar_lote([
+        (lector_test.id, "C001"), (lector_test.id, "C999"), (lector_test.id, "C002"),
+        (lector_test.id, "C003"), (lector_test.id, "C004"),
+    ])
+
+    assert [r["copia_id"] for r in resultados if "prestamo" in r] == ["C001", "C002", "C003"]
+    assert resultados[1]["error"] == "Copia no encontrada"
+    assert "máximo de préstamos" in resultados[4]["error"]
+    assert len(lector_test.prestamos_activos) == 3
+
+
+def test_devolver_lote_agrupa_notificaciones_por_libro(biblioteca, lector_test, lector_test2, libro_se):
+    biblioteca.agregar_lector(lector_test)
+    biblioteca.agregar_lector(lector_test2)
+    biblioteca.agregar_copia(Copia(id="C001", libro=libro_se))
+    biblioteca.agregar_copia(Copia(id="C002", libro=libro_se))
+    biblioteca.prestar_lote([(lector_test.id, "C001"), (lector_test.id, "C002")])
+    biblioteca.suscribir_lector(lector_test2.id, libro_se.id)
+
+    lote = biblioteca.devolver_lote([(lector_test.id, "C001"), (lector_test.id, "C002"), (lector_test.id, "C001")])
+
+    assert [r.get("error") for r in lote["resultados"]] == [None, None, "Préstamo no encontrado"]
+    assert lote["notificaciones"] == {libro_se.id: [lector_test2.email]}
+    assert lector_test.prestamos_activos == []
+
+
+def test_devolver_lote_no_notifica_copias_reservadas(biblioteca, lector_test, lector_test2, libro_se):
+    lector_3 = Lector(id="L003", nombre="Ana Gomez", email="ana@example.com")
+    for lector in (lector_test, lector_test2, lector_3):
+        biblioteca.agregar_lector(lector)
+    biblioteca.agregar_copia(Copia(id="C001", libro=libro_se))
+    biblioteca.prestar_libro(lector_test.id, "C001")
+    biblioteca.reservar_libro(lector_test2.id, libro_se.id)
+    biblioteca.suscribir_lector(lector_3.id, libro_se.id)
+
+    lote = biblioteca.devolver_lote([(lector_test.id, "C001")])
+
+    assert lote["resultados"][0]["reservada_para"] == lector_test2.id
+    assert lote["resultados"][0]["emails_notificados"] == [lector_test2.email]
+    assert lote["notificaciones"] == {}
+    assert biblioteca.copias["C001"].estado == EstadoCopia.RESERVADA
+    assert biblioteca.bio_alert.esta_suscrito(lector_3.id, libro_se.id)
+
+
+def test_suscripcion_duplicada_se_ignora(biblioteca, lector_test, libro_se):
+    biblioteca.agregar_lector(lector_test)
+    biblioteca.agregar_libro(libro_se)
+
+    assert biblioteca.suscribir_lector(lector_test.id, libro_se.id) is True
+    assert biblioteca.suscribir_lector(lector_test.id, libro_se.id) is False
+    assert len(biblioteca.bio_alert.obtener_suscripciones(libro_se.id)) == 1
+    assert biblioteca.bio_alert.esta_suscrito(lector_test.id, libro_se.id) is True
+
+
+def test_desuscribir_lector(biblioteca, lector_test, libro_se):
+    biblioteca.agregar_lector(lector_test)
+    biblioteca.agregar_libro(libro_se)
+    biblioteca.suscribir_lector(lector_test.id, libro_se.id)
+
+    assert biblioteca.desuscribir_lector(lector_test.id, libro_se.id) is True
+    assert biblioteca.desuscribir_lector(lector_test.id, libro_se.id) is False
+    assert biblioteca.bio_alert.esta_suscrito(lector_test.id, libro_se.id) is False
+    assert libro_se.id not in biblioteca.bio_alert._suscripciones
+
+
+def test_notificar_primeros_n_en_orden_fifo(biblioteca, libro_se):
+    biblioteca.agregar_libro(libro_se)
+    for i in range(5):
+        biblioteca.agregar_lector(Lector(id=f"F{i}", nombre=f"Lector {i}", email=f"f{i}@example.com"))
+        biblioteca.suscribir_lector(f"F{i}", libro_se.id)
+
+    assert biblioteca.bio_alert.notificar_disponibilidad(libro_se.id, limite=2) == ["f0@example.com", "f1@example.com"]
+    assert biblioteca.bio_alert.contar_suscripciones(libro_se.id) == 3
+    assert biblioteca.bio_alert.notificar_disponibilidad(libro_se.id) == [
+        "f2@example.com", "f3@example.com", "f4@example.com"
+    ]
+    assert libro_se.id not in biblioteca.bio_alert._suscripciones
+
+
+def test_devolucion_notifica_solo_limite(biblioteca, lector_test, libro_se):
+    biblioteca.limite_notificaciones = 1
+    biblioteca.agregar_lector(lector_test)
+    biblioteca.agregar_copia(Copia(id="C001", libro=libro_se))
+    for i in range(3):
+        biblioteca.agregar_lector(Lector(id=f"F{i}", nombre=f"Lector {i}", email=f"f{i}@example.com"))
+        biblioteca.suscribir_lector(f"F{i}", libro_se.id)
+    biblioteca.prestar_libro(lector_test.id, "C001")
+
+    resultado = biblioteca.devolver_libro(lector_test.id, "C001")
+
+    assert resultado["emails_notificados"] == ["f0@example.com"]
+    assert biblioteca.bio_alert.contar_suscripciones(libro_se.id) == 2
+
+
+def test_entidades_sin_diccionario_de_instancia(libro_se, lector_test):
+    copia = Copia(id="C001", libro=libro_se)
+    prestamo = Prestamo(copia=copia, fecha_prestamo=datetime.now(), fecha_devolucion_esperada=datetime.now())
+    for entidad in (libro_se.autor, libro_se, copia, prestamo, lector_test, Suscripcion(lector=lector_test, libro_id=libro_se.id)):
+        assert not hasattr(entidad, "__dict__")
+    assert libro_se.id == "Software_Engineering_Somerville_2020"
+
+
+@pytest.fixture
+def ventana_de_carrera(biblioteca, monkeypatch):
+    actualizar = biblioteca.repositorio.actualizar_estado_copia
+
+    def actualizar_con_pausa(copia, nuevo_estado):
+        time.sleep(0.0005)
+        actualizar(copia, nuevo_estado)
+
+    monkeypatch.setattr(biblioteca.repositorio, "actualizar_estado_copia", actualizar_con_pausa)
+    intervalo = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    yield
+    sys.setswitchinterval(intervalo)
+
+
+def ejecutar_en_hilos(cantidad, objetivo):
+    barrera = threading.Barrier(cantidad)
+
+    def ejecutar(indice):
+        barrera.wait()
+        objetivo(indice)
+
+    hilos = [threading.Thread(target=ejecutar, args=(i,)) for i in range(cantidad)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+
+def test_misma_copia_se_presta_una_sola_vez(biblioteca, libro_se, ventana_de_carrera):
+    biblioteca.agregar_copia(Copia(id="C001", libro=libro_se))
+    for i in range(16):
+        biblioteca.agregar_lector(Lector(id=f"H{i}", nombre=f"Lector {i}", email=f"h{i}@example.com"))
+    exitos = []
+
+    def prestar(indice):
+        try:
+            biblioteca.prestar_libro(f"H{indice}", "C001")
+        except ValueError:
+            return
+        exitos.append(indice)
+
+    ejecutar_en_hilos(16, prestar)
+
+    assert len(exitos) == 1
+    assert biblioteca.copias["C001"].estado == EstadoCopia.PRESTADA
+
+
+def test_prestamos_concurrentes_mantienen_invariantes(biblioteca, libro_se, ventana_de_carrera):
+    copias = [f"SC{i}" for i in range(20)]
+    lectores = [f"S{i}" for i in range(30)]
+    for copia_id in copias:
+        biblioteca.agregar_copia(Copia(id=copia_id, libro=libro_se))
+    for lector_id in lectores:
+        biblioteca.agregar_lector(Lector(id=lector_id, nombre=lector_id, email=f"{lector_id}@example.com"))
+
+    def operar(indice):
+        aleatorio = random.Random(indice)
+        for _ in range(200):
+            lector_id = aleatorio.choice(lectores)
+            copia_id = aleatorio.choice(copias)
+            try:
+                if aleatorio.random() < 0.6:
+                    biblioteca.prestar_libro(lector_id, copia_id)
+                else:
+                    biblioteca.devolver_libro(lector_id, copia_id)
+            except ValueError:
+                pass
+
+    ejecutar_en_hilos(8, operar)
+
+    prestadas = {}
+    for lector_id in lectores:
+        lector = biblioteca.lectores[lector_id]
+        assert len(lector.prestamos_activos) <= 3
+        for prestamo in lector.prestamos_activos:
+            assert prestamo.copia.id not in prestadas
+            prestadas[prestamo.copia.id] = lector_id
+    for copia_id in copias:
+        esperado = EstadoCopia.PRESTADA if copia_id in prestadas else EstadoCopia.DISPONIBLE
+        assert biblioteca.copias[copia_id].estado == esperado
+    assert biblioteca.contar_copias_estado(libro_se.id, EstadoCopia.PRESTADA) == len(prestadas)
+
+
+def test_paginar_copias_libro_recorre_todas(biblioteca, libro_se):
+    for i in range(25):
+        biblioteca.agregar_copia(Copia(id=f"P{i:02d}", libro=libro_se))
+
+    paginas = []
+    cursor = None
+    while True:
+        copias, cursor = biblioteca.paginar_copias_libro(libro_se.id, limite=10, cursor=cursor)
+        paginas.append([c.id for c in copias])
+        if cursor is None:
+            break
+
+    assert [len(p) for p in paginas] == [10, 10, 5]
+    assert sum(paginas, []) == [f"P{i:02d}" for i in range(25)]
+
+
+def test_paginar_libros_por_autor_estable_ante_inserciones(biblioteca, autor_somerville):
+    for i in range(3):
+        biblioteca.agregar_libro(Libro(nombre=f"Libro {i}", anio=2000, autor=autor_somerville, id=f"X{i}"))
+
+    primera, cursor = biblioteca.paginar_libros_por_autor("somerville", limite=2)
+    biblioteca.agregar_libro(Libro(nombre="Libro 3", anio=2000, autor=autor_somerville, id="X3"))
+    segunda, fin = biblioteca.paginar_libros_por_autor("SOMERVILLE", limite=2, cursor=cursor)
+
+    assert [l.id for l in primera] == ["X0", "X1"]
+    assert [l.id for l in segunda] == ["X2", "X3"]
+    assert fin is None
+
+
+def test_paginar_valida_limite_y_cursor(biblioteca, libro_se):
+    biblioteca.agregar_copia(Copia(id="C001", libro=libro_se))
+
+    with pytest.raises(ValueError, match="límite"):
+        biblioteca.paginar_copias_libro(libro_se.id, limite=0)
+    with pytest.raises(ValueError, match="Cursor inválido"):
+        biblioteca.paginar_copias_libro(libro_se.id, cursor="no es un cursor!")
+
+
+def test_indice_ordenado_compacta_sin_invalidar_cursores():
+    indice = IndiceOrdenado()
+    for i in range(200):
+        indice.agregar(f"I{i}")
+    for i in range(0, 150):
+        if i != 120:
+            indice.quitar(f"I{i}")
+
+    ids, cursor = indice.pagina(None, 1)
+
+    assert ids == ["I120"]
+    assert len(indice._ids) < 100
+    assert indice.pagina(cursor, 3) == (["I150", "I151", "I152"], "I152")
+
+
+def test_buscar_libros_por_palabras_del_titulo(biblioteca, libro_se, libro_se_10th):
+    biblioteca.agregar_libro(libro_se)
+    biblioteca.agregar_libro(libro_se_10th)
+    biblioteca.agregar_libro(Libro(nombre="Cien años de soledad", anio=1967,
+                                   autor=Autor(nombre="Gabriel García Márquez", fecha_nacimiento=date(1927, 3, 6))))
+
+    assert {l.id for l, _ in biblioteca.buscar_libros("software engineering ")} == {libro_se.id, libro_se_10th.id}
+    assert [l.id for l, _ in biblioteca.buscar_libros("SOFTWARE 10th ")] == [libro_se_10th.id]
+    assert [l.nombre for l, _ in biblioteca.buscar_libros("anos SOLEDAD ")] == ["Cien años de soledad"]
+    assert [l.nombre for l, _ in biblioteca.buscar_libros("garcia marq")] == ["Cien años de soledad"]
+    assert biblioteca.buscar_libros("software soledad ") == []
+
+
+def test_buscar_libros_prefijo_y_ranking(biblioteca, autor_pressman, autor_somerville):
+    biblioteca.agregar_libro(Libro(nombre="Notas", anio=2000, autor=autor_pressman, id="B1"))
+    biblioteca.agregar_libro(Libro(nombre="Pressman comentado", anio=2001, autor=autor_somerville, id="B2"))
+    biblioteca.agregar_libro(Libro(nombre="Presentaciones", anio=2002, autor=autor_somerville, id="B3"))
+
+    assert [l.id for l, _ in biblioteca.buscar_libros("pressman ")] == ["B2", "B1"]
+    assert [l.id for l, _ in biblioteca.buscar_libros("pres")] == ["B3", "B2", "B1"]
+    assert [l.id for l, _ in biblioteca.buscar_libros("pres", limite=1)] == ["B3"]
+
+
+def test_prefijo_corto_expande_los_terminos_mas_frecuentes(biblioteca, autor_pressman):
+    for i in range(200):
+        biblioteca.agregar_libro(Libro(nombre=f"Software Engineering {i}", anio=2000, autor=autor_pressman, id=f"S{i}"))
+    letras = "abcdefghij"
+    for i in range(busqueda.MAX_EXPANSIONES + 6):
+        raro = f"soa{letras[i // 10]}{letras[i % 10]}"
+        biblioteca.agregar_libro(Libro(nombre=raro, anio=2000, autor=autor_pressman, id=f"R{i}"))
+
+    encontrados = {l.id for l, _ in biblioteca.buscar_libros("so", limite=1000)}
+    assert {f"S{i}" for i in range(200)} <= encontrados
+    assert len(encontrados) == 200 + busqueda.MAX_EXPANSIONES - 1
+    assert len(biblioteca.buscar_libros("engineering so", limite=5)) == 5
+    assert {l.id for l, _ in biblioteca.buscar_libros("soaa")} == {f"R{i}" for i in range(10)}
+
+
+def test_buscar_libros_reindexa_al_reemplazar(biblioteca, autor_somerville):
+    biblioteca.agregar_libro(Libro(nombre="Titulo viejo", anio=2000, autor=autor_somerville, id="R1"))
+    biblioteca.agregar_libro(Libro(nombre="Titulo nuevo", anio=2000, autor=autor_somerville, id="R1"))
+
+    assert biblioteca.buscar_libros("viejo ") == []
+    assert [l.id for l, _ in biblioteca.buscar_libros("nuevo ")] == ["R1"]
+    assert len(biblioteca.busqueda) == 1
+
+
+def test_busqueda_combinada_coincide_con_interseccion_completa(monkeypatch):
+    aleatorio = random.Random(7)
+    palabras = [f"pal{i}" for i in range(12)]
+    indice = busqueda.IndiceBusqueda()
+    for i in range(400):
+        autor = Autor(nombre=aleatorio.choice(palabras), fecha_nacimiento=date(1950, 1, 1))
+        nombre = " ".join(aleatorio.choices(palabras, k=aleatorio.randint(1, 4)))
+        indice.agregar(Libro(nombre=nombre, anio=2000, autor=autor, id=f"B{i}"))
+    consultas = ["pal1 pal2 ", "pal3 pal1", "pal4 pal5 pal6 ", "pal1 pal"]
+
+    monkeypatch.setattr(busqueda, "DIVISOR_PRESUPUESTO", 1e-9)
+    combinadas = [[round(p, 9) for _, p in indice.buscar(c, limite=15)] for c in consultas]
+    monkeypatch.setattr(busqueda, "_mejores_combinados", lambda expansiones, limite: None)
+    completas = [[round(p, 9) for _, p in indice.buscar(c, limite=15)] for c in consultas]
+
+    assert combinadas == completas
+    assert all(combinadas)
+
+
+def test_busqueda_invalida_solo_prefijos_de_terminos_modificados():
+    indice = busqueda.IndiceBusqueda()
+    autor = Autor(nombre="Anonimo", fecha_nacimiento=date(1950, 1, 1))
+    for i in range(2 * busqueda.MAX_EXPANSIONES):
+        indice.agregar(Libro(nombre=f"alfa{i} beta{i}", anio=2000, autor=autor, id=f"B{i}"))
+    indice.buscar("alfa")
+    indice.buscar("beta")
+    assert set(indice._completados) == {"alfa", "beta"}
+
+    libro = Libro(nombre="alfa7 alfa7 alfa7", anio=2000, autor=autor, id="N1")
+    indice.agregar(libro)
+    assert set(indice._completados) == {"beta"}
+    assert indice.buscar("alfa", limite=1)[0][0] == "N1"
+
+    indice.buscar("alfa")
+    indice.quitar(libro)
+    assert set(indice._completados) == {"beta"}
+
+
+def test_versiones_cambian_solo_con_mutaciones_relevantes(biblioteca, lector_test, lector_test2, libro_se, libro_se_10th):
+    biblioteca.agregar_lector(lector_test)
+    biblioteca.agregar_lector(lector_test2)
+    biblioteca.agregar_copia(Copia(id="C001", libro=libro_se))
+    biblioteca.agregar_copia(Copia(id="C002", libro=libro_se_10th))
+
+    def versiones():
+        return (
+            biblioteca.version("libro", libro_se.id),
+            biblioteca.version("libro", libro_se_10th.id),
+            biblioteca.version("lector", lector_test.id),
+            biblioteca.version("lector", lector_test2.id)
+        )
+
+    inicial = versiones()
+    biblioteca.prestar_libro(lector_test.id, "C001")
+    tras_prestamo = versiones()
+    assert tras_prestamo[0] != inicial[0] and tras_prestamo[2] != inicial[2]
+    assert tras_prestamo[1] == inicial[1] and tras_prestamo[3] == inicial[3]
+
+    biblioteca.suscribir_lector(lector_test2.id, libro_se.id)
+    assert versiones() == tras_prestamo
+
+    biblioteca.cambiar_estado_copia("C002", EstadoCopia.EN_REPARACION)
+    tras_estado = versiones()
+    assert tras_estado[1] != tras_prestamo[1]
+
+    biblioteca.devolver_libro(lector_test.id, "C001")
+    assert versiones()[0] != tras_estado[0] and versiones()[2] != tras_estado[2]
+
+    biblioteca.agregar_copia(Copia(id="C001", libro=libro_se_10th))
+    final = versiones()
+    assert len(set(final)) == 4
+    assert biblioteca.version("libro", "inexistente") == 0
+
+
+def test_cache_respuestas_lru_invalida_por_etag():
+    cache = CacheRespuestas(capacidad=2)
+    cache.guardar("a", '"1"', b"A")
+    cache.guardar("b", '"1"', b"B")
+
+    assert cache.obtener("a", '"1"') == b"A"
+    assert cache.obtener("a", '"2"') is None
+
+    cache.guardar("c", '"1"', b"C")
+    assert cache.obtener("b", '"1"') is None
+    assert cache.obtener("a", '"1"') == b"A"
+    assert len(cache) == 2
+
+
+def test_metricas_se_mantienen_incrementalmente(biblioteca, lector_test, lector_test2, libro_se):
+    biblioteca.agregar_lector(lector_test)
+    biblioteca.agregar_lector(lector_test2)
+    biblioteca.agregar_copia(Copia(id="C001", libro=libro_se))
+    biblioteca.agregar_copia(Copia(id="C002", libro=libro_se))
+    biblioteca.suscribir_lector(lector_test2.id, libro_se.id)
+    metricas = biblioteca.metricas
+
+    biblioteca.prestar_libro(lector_test.id, "C001")
+    with pytest.raises(ValueError):
+        biblioteca.prestar_libro(lector_test2.id, "C001")
+    with pytest.raises(ValueError):
+        biblioteca.devolver_libro(lector_test2.id, "C001")
+    biblioteca.cambiar_estado_copia("C002", EstadoCopia.EN_REPARACION)
+
+    assert metricas.prestamos_activos == 1
+    assert metricas.copias[EstadoCopia.PRESTADA] == 1
+    assert metricas.copias[EstadoCopia.EN_REPARACION] == 1
+    assert metricas.copias[EstadoCopia.DISPONIBLE] == 0
+    assert metricas.rechazos == {("prestamo", "copia_no_disponible"): 1, ("devolucion", "prestamo_no_encontrado"): 1}
+
+    lector_test.prestamos_activos[0].fecha_devolucion_esperada = datetime.now() - timedelta(days=3)
+    biblioteca.devolver_libro(lector_test.id, "C001")
+
+    assert (metricas.prestamos, metricas.devoluciones, metricas.prestamos_activos) == (1, 1, 0)
+    assert metricas.copias[EstadoCopia.DISPONIBLE] == 1
+    assert metricas.notificaciones == 1
+    assert metricas.lectores_suspendidos() == 1
+    assert metricas.lectores_suspendidos(hoy=lector_test.fecha_fin_suspension + timedelta(days=1)) == 0
+
+
+def test_prestamos_vencidos_ordenados_y_paginados(biblioteca, libro_se):
+    for i in range(5):
+        biblioteca.agregar_lector(Lector(id=f"V{i}", nombre=f"Lector {i}", email=f"v{i}@example.com"))
+        biblioteca.agregar_copia(Copia(id=f"VC{i}", libro=libro_se))
+        biblioteca.prestar_libro(f"V{i}", f"VC{i}")
+    biblioteca.devolver_libro("V2", "VC2")
+
+    assert biblioteca.paginar_prestamos_vencidos()[0] == []
+
+    despues_del_plazo = datetime.now() + timedelta(days=31)
+    vistos = []
+    cursor = None
+    while True:
+        prestamos, cursor = biblioteca.paginar_prestamos_vencidos(2, cursor, despues_del_plazo)
+        vistos.extend((lector_id, p.copia.id) for p, lector_id in prestamos)
+        if cursor is None:
+            break
+
+    assert vistos == [("V0", "VC0"), ("V1", "VC1"), ("V3", "VC3"), ("V4", "VC4")]
+    with pytest.raises(ValueError):
+        biblioteca.paginar_prestamos_vencidos(cursor="bm8tZXMtdW4tY3Vyc29y")
+
+
+def test_indice_vencimientos_compacta_y_no_duplica(libro_se):
+    indice = IndiceVencimientos()
+    base = datetime(2024, 1, 1)
+    prestamos = [
+        Prestamo(copia=Copia(id=f"C{i}", libro=libro_se), fecha_prestamo=base, fecha_devolucion_esperada=base + timedelta(days=i % 7))
+        for i in range(100)
+    ]
+    for prestamo in reversed(prestamos):
+        indice.agregar(prestamo, "L")
+    for prestamo in prestamos[:90]:
+        indice.quitar(prestamo)
+    indice.agregar(prestamos[95], "L")
+
+    vencidos, siguiente = indice.vencidos(base + timedelta(days=30), None, 100)
+
+    assert [p.copia.id for p, _ in vencidos] == sorted(
+        (f"C{i}" for i in range(90, 100)), key=lambda id_: (int(id_[1:]) % 7, id_)
+    )
+    assert siguiente is None
+    assert len(indice._claves) < 50
+
+
+def test_temporizador_marca_copias_con_retraso_y_fin_de_suspension(biblioteca, lector_test, lector_test2, libro_se):
+    ahora = datetime.now()
+    biblioteca.activar_temporizador(ahora)
+    biblioteca.agregar_lector(lector_test)
+    biblioteca.agregar_lector(lector_test2)
+    biblioteca.agregar_copia(Copia(id="C001", libro=libro_se))
+    biblioteca.agregar_copia(Copia(id="C002", libro=libro_se))
+    biblioteca.prestar_libro(lector_test.id, "C001")
+    biblioteca.prestar_libro(lector_test2.id, "C002")
+    biblioteca.devolver_libro(lector_test2.id, "C002")
+
+    assert biblioteca.procesar_temporizadores(ahora + timedelta(days=29))["copias_con_retraso"] == 0
+    version = biblioteca.version("libro", libro_se.id)
+    assert biblioteca.procesar_temporizadores(ahora + timedelta(days=31))["copias_con_retraso"] == 1
+    assert biblioteca.copias["C001"].estado == EstadoCopia.CON_RETRASO
+    assert biblioteca.copias["C002"].estado == EstadoCopia.DISPONIBLE
+    assert biblioteca.version("libro", libro_se.id) != version
+    assert biblioteca.metricas.copias[EstadoCopia.CON_RETRASO] == 1
+
+    lector_test2.fecha_fin_suspension = (ahora + timedelta(days=40)).date()
+    biblioteca.agregar_lector(lector_test2)
+    assert biblioteca.procesar_temporizadores(ahora + timedelta(days=40))["suspensiones_finalizadas"] == 0
+    assert biblioteca.procesar_temporizadores(ahora + timedelta(days=42))["suspensiones_finalizadas"] == 1
+
+
+def test_rueda_temporizadores_dispara_en_el_instante_exacto():
+    aleatorio = random.Random(7)
+    rueda = RuedaTemporizadores(1_000, ranuras=8, niveles=4)
+    vencimientos = {i: 1_000 + aleatorio.randrange(1, 20_000) for i in range(500)}
+    for clave, vencimiento in vencimientos.items():
+        rueda.programar(clave, vencimiento)
+    for clave in range(0, 500, 5):
+        rueda.cancelar(clave)
+        del vencimientos[clave]
+
+    disparos = {}
+    instante = 1_000
+    while instante < 25_000:
+        instante += aleatorio.choice([1, 3, 17, 250, 4_000])
+        for clave, _ in rueda.avanzar(instante):
+            disparos[clave] = instante
+        assert all(vencimiento > instante for clave, vencimiento in vencimientos.items() if clave not in disparos)
+
+    assert disparos.keys() == vencimientos.keys()
+    assert all(vencimientos[clave] <= instante for clave, instante in disparos.items())
+    assert len(rueda) == 0
+
+
+def test_reloj_virtual_gobierna_prestamos_multas_y_suspension(biblioteca, lector_test, libro_se):
+    reloj = RelojVirtual(datetime(2024, 1, 1, 10, 0))
+    biblioteca.reloj = reloj
+    biblioteca.agregar_lector(lector_test)
+    biblioteca.agregar_copia(Copia(id="C001", libro=libro_se))
+
+    prestamo = biblioteca.prestar_libro(lector_test.id, "C001")
+    assert prestamo.fecha_devolucion_esperada == datetime(2024, 1, 31, 10, 0)
+
+    reloj.avanzar(timedelta(days=35))
+    assert biblioteca.devolver_libro(lector_test.id, "C001")["dias_retraso"] == 5
+    assert lector_test.fecha_fin_suspension == date(2024, 2, 15)
+    with pytest.raises(ValueError, match="suspendido"):
+        biblioteca.prestar_libro(lector_test.id, "C001")
+
+    reloj.avanzar(timedelta(days=11))
+    assert biblioteca.prestar_libro(lector_test.id, "C001").fecha_prestamo == datetime(2024, 2, 16, 10, 0)
+    with pytest.raises(ValueError):
+        reloj.avanzar(timedelta(seconds=-1))
+
+
+def test_historial_agrega_circulacion_y_sobrevive_exportacion(
+    biblioteca, lector_test, lector_test2, libro_se, libro_se_10th, autor_pressman
+):
+    reloj = RelojVirtual(datetime(2024, 1, 1, 10, 0))
+    biblioteca.reloj = reloj
+    libro_pressman = Libro(nombre="Software Engineering: A Practitioner's Approach", anio=2014, autor=autor_pressman)
+    biblioteca.agregar_lector(lector_test)
+    biblioteca.agregar_lector(lector_test2)
+    for copia_id, libro in (("C001", libro_se), ("C002", libro_se_10th), ("C003", libro_pressman)):
+        biblioteca.agregar_copia(Copia(id=copia_id, libro=libro))
+
+    for copia_id in ("C001", "C001", "C002"):
+        biblioteca.prestar_libro(lector_test2.id, copia_id)
+        reloj.avanzar(timedelta(days=1))
+        biblioteca.devolver_libro(lector_test2.id, copia_id)
+    corte = reloj.avanzar(timedelta(hours=1))
+    biblioteca.prestar_libro(lector_test.id, "C003")
+    reloj.avanzar(timedelta(days=35))
+    biblioteca.devolver_libro(lector_test.id, "C003")
+
+    ranking = [(libro.id, prestamos) for libro, prestamos in biblioteca.libros_mas_prestados()]
+    assert ranking == [(libro_se.id, 2), (libro_se_10th.id, 1), (libro_pressman.id, 1)]
+    assert [(libro.id, n) for libro, n in biblioteca.libros_mas_prestados(desde=corte)] == [(libro_pressman.id, 1)]
+    assert [libro.id for libro, _ in biblioteca.libros_mas_prestados(1, hasta=corte)] == [libro_se.id]
+    with pytest.raises(ValueError):
+        biblioteca.libros_mas_prestados(desde=corte, hasta=corte)
+
+    assert biblioteca.circulacion_autor("somerville") == {
+        "autor": "Somerville", "prestamos": 3, "devoluciones_con_retraso": 0, "tasa_retraso": 0.0
+    }
+    assert biblioteca.circulacion_autor("Pressman")["tasa_retraso"] == 1.0
+    assert biblioteca.circulacion_autor("Desconocido") is None
+    assert [a["autor"] for a in biblioteca.autores_mas_prestados()] == ["Somerville", "Pressman"]
+
+    copia = HistorialPrestamos()
+    copia.importar(biblioteca.historial.exportar())
+    assert copia.resumen() == biblioteca.historial.resumen() == {
+        "prestamos": 4, "devoluciones_con_retraso": 1, "tasa_retraso": 0.25, "libros": 3, "lectores": 2
+    }
+    assert copia.mas_prestados() == biblioteca.historial.mas_prestados()
+    assert copia.autores_mas_prestados() == biblioteca.historial.autores_mas_prestados()
+
+
+def test_historial_cuenta_devoluciones_desordenadas_y_reparte_autores_al_importar(autor_somerville, autor_pressman):
+    historial = HistorialPrestamos()
+    inicio = datetime(2024, 1, 1, 10, 0)
+    libro_a = Libro(nombre="A", anio=2000, autor=autor_somerville, id="A")
+    libro_a_reasignado = Libro(nombre="A", anio=2000, autor=autor_pressman, id="A")
+    libro_b = Libro(nombre="B", anio=2000, autor=autor_pressman, id="B")
+    for libro, horas in ((libro_a, 5), (libro_b, 2), (libro_a, 8), (libro_b, 3), (libro_a_reasignado, 1)):
+        prestamo = Prestamo(Copia(id="C", libro=libro), inicio, inicio + timedelta(days=7))
+        prestamo.fecha_devolucion_real = inicio + timedelta(hours=horas)
+        historial.registrar(prestamo, "L001", 0)
+
+    corte = inicio + timedelta(hours=4)
+    assert historial.mas_prestados(desde=corte) == [("A", 2)]
+    assert sorted(historial.mas_prestados(hasta=corte)) == [("A", 1), ("B", 2)]
+
+    copia = HistorialPrestamos()
+    copia.importar(historial.exportar())
+    assert copia.mas_prestados(desde=corte) == [("A", 2)]
+    assert copia.circulacion_autor("Somerville")["prestamos"] == 2
+    assert copia.circulacion_autor("Pressman")["prestamos"] == 3
+    assert copia.autores_mas_prestados() == historial.autores_mas_prestados()
+
+
+def test_historial_por_periodo_coincide_con_conteo_por_filas(autor_somerville):
+    historial = HistorialPrestamos()
+    inicio = datetime(2024, 1, 1)
+    aleatorio = random.Random(7)
+    devoluciones = []
+    for i in range(2000):
+        libro = Libro(nombre=f"L{i % 13}", anio=2000, autor=autor_somerville, id=f"L{i % 13}")
+        prestamo = Prestamo(Copia(id="C", libro=libro), inicio, inicio)
+        prestamo.fecha_devolucion_real = inicio + timedelta(minutes=aleatorio.randrange(400 * 24 * 60))
+        historial.registrar(prestamo, "L001", 0)
+        devoluciones.append((prestamo.fecha_devolucion_real, libro.id))
+
+    for _ in range(30):
+        desde, hasta = sorted(inicio + timedelta(minutes=aleatorio.randrange(420 * 24 * 60)) for _ in range(2))
+        esperado = Counter(libro_id for fecha, libro_id in devoluciones if desde <= fecha < hasta)
+        assert dict(historial.mas_prestados(13, desde, hasta)) == esperado
+        assert dict(historial.mas_prestados(13, desde=desde)) == Counter(
+            libro_id for fecha, libro_id in devoluciones if fecha >= desde
+        )
+
+
+def test_reserva_asigna_copia_devuelta_al_siguiente_titular(biblioteca, lector_test, lector_test2, libro_se):
+    reloj = RelojVirtual(datetime(2024, 1, 1, 10, 0))
+    biblioteca.reloj = reloj
+    biblioteca.activar_temporizador()
+    lector_3 = Lector(id="L003", nombre="Ana Gomez", email="ana@example.com")
+    for lector in (lector_test, lector_test2, lector_3):
+        biblioteca.agregar_lector(lector)
+    biblioteca.agregar_copia(Copia(id="C001", libro=libro_se))
+
+    with pytest.raises(ValueError, match="copias disponibles"):
+        biblioteca.reservar_libro(lector_test2.id, libro_se.id)
+    biblioteca.prestar_libro(lector_test.id, "C001")
+    biblioteca.reservar_libro(lector_test2.id, libro_se.id)
+    biblioteca.reservar_libro(lector_3.id, libro_se.id, prioridad=-1)
+    with pytest.raises(ValueError, match="ya tiene una reserva"):
+        biblioteca.reservar_libro(lector_3.id, libro_se.id)
+    biblioteca.suscribir_lector(lector_test.id, libro_se.id)
+    assert [r.lector_id for r in biblioteca.reservas.pendientes(libro_se.id)] == [lector_3.id, lector_test2.id]
+
+    resultado = biblioteca.devolver_libro(lector_test.id, "C001")
+    assert resultado["reservada_para"] == lector_3.id
+    assert resultado["emails_notificados"] == ["ana@example.com"]
+    assert biblioteca.copias["C001"].estado == EstadoCopia.RESERVADA
+    assert biblioteca.bio_alert.esta_suscrito(lector_test.id, libro_se.id)
+    with pytest.raises(ValueError, match="Reservada para otro lector"):
+        biblioteca.prestar_libro(lector_test2.id, "C001")
+    biblioteca.prestar_libro(lector_3.id, "C001")
+    assert biblioteca.metricas.copias[EstadoCopia.PRESTADA] == 1
+
+    reloj.avanzar(timedelta(days=1))
+    assert biblioteca.devolver_libro(lector_3.id, "C001")["reservada_para"] == lector_test2.id
+    reloj.avanzar(timedelta(days=3))
+    assert biblioteca.procesar_temporizadores()["reservas_vencidas"] == 1
+    assert biblioteca.copias["C001"].estado == EstadoCopia.DISPONIBLE
+    assert biblioteca.reservas.asignada("C001") is None
+    assert not biblioteca.bio_alert.esta_suscrito(lector_test.id, libro_se.id)
+    assert biblioteca.metricas.copias[EstadoCopia.RESERVADA] == 0
+
+    assert biblioteca.cancelar_reserva(lector_test2.id, libro_se.id) is False
+
+
+def test_reservas_canceladas_se_compactan(biblioteca, lector_test, lector_test2, libro_se):
+    biblioteca.agregar_lector(lector_test)
+    biblioteca.agregar_lector(lector_test2)
+    biblioteca.agregar_copia(Copia(id="C001", libro=libro_se))
+    biblioteca.prestar_libro(lector_test.id, "C001")
+    biblioteca.reservar_libro(lector_test.id, libro_se.id)
+
+    for _ in range(1000):
+        biblioteca.reservar_libro(lector_test2.id, libro_se.id)
+        biblioteca.cancelar_reserva(lector_test2.id, libro_se.id)
+
+    assert len(biblioteca.reservas._colas[libro_se.id]) <= 2 * reservas.COMPACTAR_DESDE
+    assert [r.lector_id for r in biblioteca.reservas.pendientes(libro_se.id)] == [lector_test.id]
+    biblioteca.reservar_libro(lector_test2.id, libro_se.id)
+    assert biblioteca.devolver_libro(lector_test.id, "C001")["reservada_para"] == lector_test.id
+
+
+def test_disponibilidad_incremental_paginada_y_filtrada(biblioteca, lector_test, lector_test2, autor_somerville):
+    libros = [Libro(nombre=f"Libro {i}", anio=2000 + i, autor=autor_somerville) for i in range(5)]
+    for i, libro in enumerate(libros):
+        biblioteca.agregar_libro(libro)
+        for j in range(i % 3):
+            biblioteca.agregar_copia(Copia(id=f"C{i}-{j}", libro=libro))
+    biblioteca.agregar_lector(lector_test)
+    biblioteca.agregar_lector(lector_test2)
+
+    biblioteca.prestar_libro(lector_test.id, "C1-0")
+    biblioteca.reservar_libro(lector_test2.id, libros[1].id)
+    biblioteca.prestar_libro(lector_test.id, "C2-0")
+    biblioteca.cambiar_estado_copia("C2-1", EstadoCopia.EN_REPARACION)
+    biblioteca.agregar_copia(Copia(id="C0-0", libro=libros[0]))
+    biblioteca.agregar_copia(Copia(id="C2-1", libro=libros[3]))
+
+    for libro in libros:
+        contadores = biblioteca.disponibilidad.obtener(libro.id)
+        assert contadores.total == biblioteca.contar_copias_libro(libro.id)
+        assert contadores.disponibles == biblioteca.contar_copias_estado(libro.id, EstadoCopia.DISPONIBLE)
+    assert biblioteca.disponibilidad.obtener(libros[1].id).en_espera == 1
+
+    pagina, cursor = biblioteca.paginar_disponibilidad(limite=2)
+    assert [libro.id for libro, _ in pagina] == [libros[0].id, libros[1].id]
+    pagina, cursor = biblioteca.paginar_disponibilidad(limite=2, cursor=cursor)
+    assert [(libro.id, c.total, c.disponibles) for libro, c in pagina] == [(libros[2].id, 1, 0), (libros[3].id, 1, 1)]
+
+    disponibles, cursor = biblioteca.paginar_disponibilidad(limite=1, filtro="disponibles")
+    assert [libro.id for libro, _ in disponibles] == [libros[0].id]
+    biblioteca.prestar_libro(lector_test2.id, "C0-0")
+    disponibles, _ = biblioteca.paginar_disponibilidad(limite=10, cursor=cursor, filtro="disponibles")
+    assert [libro.id for libro, _ in disponibles] == [libros[3].id, libros[4].id]
+    assert [libro.id for libro, _ in biblioteca.paginar_disponibilidad(filtro="con_espera")[0]] == [libros[1].id]
+
+    biblioteca.devolver_libro(lector_test.id, "C1-0")
+    assert biblioteca.disponibilidad.obtener(libros[1].id) == DisponibilidadLibro(total=1, disponibles=0, en_espera=0)
+    assert biblioteca.paginar_disponibilidad(filtro="con_espera")[0] == []
+    with pytest.raises(ValueError, match="Filtro inválido"):
+        biblioteca.paginar_disponibilidad(filtro="todos")
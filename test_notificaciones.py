@@ -0,0 +1,126 @@
+import socketserver
+import threading
+import pytest
+from datetime import date
+from models import Autor, Libro, Copia, Lector, BioAlert
+from notificaciones import DespachadorNotificaciones, TransporteMemoria, TransporteSMTP
+from service import BibliotecaService
+
+
+class _ManejadorSMTP(socketserver.StreamRequestHandler):
+    def responder(self, linea: str):
+        self.wfile.write((linea + "\r\n").encode())
+
+    def handle(self):
+        self.responder("220 localhost")
+        destinatarios = []
+        while True:
+            comando = self.rfile.readline().decode().strip()
+            if not comando:
+                return
+            verbo = comando.split(" ", 1)[0].upper()
+            if verbo == "RCPT":
+                destinatarios.append(comando.split(":", 1)[1].strip(" <>"))
+            if verbo == "DATA":
+                self.responder("354 fin con <CRLF>.<CRLF>")
+                lineas = []
+                while True:
+                    linea = self.rfile.readline().decode()
+                    if linea in (".\r\n", ""):
+                        break
+                    lineas.append(linea)
+                self.server.mensajes.append((destinatarios, "".join(lineas)))
+                destinatarios = []
+                self.responder("250 OK")
+            elif verbo == "QUIT":
+                self.responder("221 adios")
+                return
+            else:
+                self.responder("250 OK")
+
+
+@pytest.fixture
+def servidor_smtp():
+    servidor = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _ManejadorSMTP)
+    servidor.daemon_threads = True
+    servidor.mensajes = []
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+
+@pytest.fixture
+def bio_alert():
+    alerta = BioAlert()
+    alerta._suscripciones = {}
+    yield alerta
+    alerta._suscripciones = {}
+
+
+@pytest.fixture
+def libro_se():
+    autor = Autor(nombre="Somerville", fecha_nacimiento=date(1950, 1, 1))
+    return Libro(nombre="Software Engineering", anio=2020, autor=autor)
+
+
+def suscribir(bio_alert, libro_id, cantidad):
+    for i in range(cantidad):
+        bio_alert.suscribir(Lector(id=f"L{i}", nombre=f"Lector {i}", email=f"l{i}@example.com"), libro_id)
+
+
+def test_despachador_entrega_por_smtp(servidor_smtp, bio_alert):
+    suscribir(bio_alert, "X1", 3)
+    _, puerto = servidor_smtp.server_address
+    despachador = DespachadorNotificaciones(TransporteSMTP("127.0.0.1", puerto), bio_alert, trabajadores=2)
+
+    despachador.encolar("X1")
+    despachador.cerrar()
+
+    assert sorted(d for destinatarios, _ in servidor_smtp.mensajes for d in destinatarios) == [
+        "l0@example.com", "l1@example.com", "l2@example.com"
+    ]
+    assert "X1" in servidor_smtp.mensajes[0][1]
+    assert despachador.estadisticas["enviadas"] == 3
+
+
+def test_despachador_reintenta_con_espera(bio_alert):
+    suscribir(bio_alert, "X1", 1)
+    transporte = TransporteMemoria(fallos=2)
+    despachador = DespachadorNotificaciones(transporte, bio_alert, espera_inicial=0.001)
+
+    despachador.encolar("X1")
+    despachador.cerrar()
+
+    assert [d for d, _, _ in transporte.enviados] == ["l0@example.com"]
+    assert despachador.estadisticas == {"enviadas": 1, "reintentos": 2, "fallidas": 0}
+
+
+def test_despachador_abandona_tras_max_intentos(bio_alert):
+    suscribir(bio_alert, "X1", 1)
+    despachador = DespachadorNotificaciones(
+        TransporteMemoria(fallos=10), bio_alert, max_intentos=3, espera_inicial=0.001
+    )
+
+    despachador.encolar("X1")
+    despachador.cerrar()
+
+    assert despachador.estadisticas == {"enviadas": 0, "reintentos": 2, "fallidas": 1}
+
+
+def test_devolucion_encola_sin_construir_lista(bio_alert, libro_se):
+    transporte = TransporteMemoria()
+    despachador = DespachadorNotificaciones(transporte, bio_alert)
+    service = BibliotecaService(despachador=despachador)
+    service.agregar_copia(Copia(id="C001", libro=libro_se))
+    service.agregar_lector(Lector(id="P1", nombre="Juan", email="juan@example.com"))
+    suscribir(bio_alert, libro_se.id, 500)
+    service.prestar_libro("P1", "C001")
+
+    resultado = service.devolver_libro("P1", "C001")
+    despachador.cerrar()
+
+    assert resultado["emails_notificados"] == []
+    assert resultado["notificacion_encolada"] is True
+    assert len(transporte.enviados) == 500
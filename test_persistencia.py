@@ -0,0 +1,233 @@
+import asyncio
+import json
+import os
+import pytest
+import threading
+import time
+from datetime import date, datetime, timedelta
+from models import Autor, Libro, Copia, Lector, EstadoCopia, BioAlert
+from persistencia import RegistroEventos, cargar_biblioteca, ARCHIVO_INSTANTANEA
+from service import BibliotecaService
+from servicio_async import BibliotecaAsync
+
+
+@pytest.fixture(autouse=True)
+def limpiar_bioalert():
+    BioAlert()._suscripciones = {}
+    yield
+    BioAlert()._suscripciones = {}
+
+
+@pytest.fixture
+def libro_se():
+    autor = Autor(nombre="Somerville", fecha_nacimiento=date(1950, 1, 1))
+    return Libro(nombre="Software Engineering", anio=2020, autor=autor)
+
+
+def poblar(biblioteca, libro_se):
+    biblioteca.agregar_libro(libro_se)
+    biblioteca.agregar_copia(Copia(id="C001", libro=libro_se))
+    biblioteca.agregar_copia(Copia(id="C002", libro=libro_se))
+    biblioteca.agregar_lector(Lector(id="L001", nombre="Juan Perez", email="juan@example.com"))
+    biblioteca.agregar_lector(Lector(id="L002", nombre="Maria Lopez", email="maria@example.com"))
+    biblioteca.prestar_libro("L001", "C001")
+    biblioteca.prestar_libro("L001", "C002")
+    biblioteca.devolver_libro("L001", "C002")
+    biblioteca.cambiar_estado_copia("C002", EstadoCopia.EN_REPARACION)
+    biblioteca.suscribir_lector("L002", libro_se.id)
+
+
+def reiniciar(directorio, **opciones):
+    BioAlert()._suscripciones = {}
+    return cargar_biblioteca(directorio, **opciones)
+
+
+def verificar_estado(biblioteca, libro_se):
+    assert set(biblioteca.copias) == {"C001", "C002"}
+    assert biblioteca.copias["C001"].estado == EstadoCopia.PRESTADA
+    assert biblioteca.copias["C002"].estado == EstadoCopia.EN_REPARACION
+    assert [p.copia.id for p in biblioteca.lectores["L001"].prestamos_activos] == ["C001"]
+    assert [l.id for l in biblioteca.obtener_libros_por_autor("somerville")] == [libro_se.id]
+    suscripciones = biblioteca.bio_alert.obtener_suscripciones(libro_se.id)
+    assert [s.lector.id for s in suscripciones] == ["L002"]
+
+
+def test_reinicio_reproduce_registro(tmp_path, libro_se):
+    biblioteca = cargar_biblioteca(str(tmp_path))
+    poblar(biblioteca, libro_se)
+    biblioteca.registro.cerrar()
+
+    verificar_estado(reiniciar(str(tmp_path)), libro_se)
+
+
+def test_reinicio_desde_instantanea_y_cola(tmp_path, libro_se):
+    biblioteca = cargar_biblioteca(str(tmp_path), eventos_por_instantanea=4)
+    poblar(biblioteca, libro_se)
+    biblioteca.registro.cerrar()
+
+    with open(tmp_path / ARCHIVO_INSTANTANEA) as archivo:
+        assert json.load(archivo)["seq"] == 8
+    segmentos = [n for n in os.listdir(tmp_path) if n.startswith("eventos-")]
+    assert len(segmentos) == 1
+
+    restaurada = reiniciar(str(tmp_path))
+    verificar_estado(restaurada, libro_se)
+    assert restaurada.registro.seq == 10
+
+
+def test_multa_reproducida_con_fechas_del_registro(tmp_path, libro_se):
+    eventos = [
+        {"tipo": "libro", "id": "X1", "nombre": "Libro", "anio": 2020,
+         "autor_nombre": "Somerville", "autor_fecha_nacimiento": "1950-01-01"},
+        {"tipo": "copia", "id": "C001", "libro_id": "X1", "estado": "disponible"},
+        {"tipo": "lector", "id": "L001", "nombre": "Juan", "email": "juan@example.com",
+         "dias_suspension": 0, "fecha_fin_suspension": None},
+        {"tipo": "prestamo", "lector_id": "L001", "copia_id": "C001", "fecha": "2024-01-01T10:00:00"},
+        {"tipo": "devolucion", "lector_id": "L001", "copia_id": "C001", "fecha": "2024-02-10T10:00:00"},
+    ]
+    with open(tmp_path / "eventos-00000000000000000001.log", "w") as archivo:
+        for seq, evento in enumerate(eventos, start=1):
+            archivo.write(json.dumps({"seq": seq, **evento}) + "\n")
+
+    lector = reiniciar(str(tmp_path)).lectores["L001"]
+
+    assert lector.dias_suspension == 20
+    assert lector.fecha_fin_suspension == date(2024, 3, 1)
+
+
+def test_linea_incompleta_al_final_se_descarta(tmp_path, libro_se):
+    biblioteca = cargar_biblioteca(str(tmp_path))
+    poblar(biblioteca, libro_se)
+    biblioteca.registro.cerrar()
+    with open(tmp_path / "eventos-00000000000000000001.log", "a") as archivo:
+        archivo.write('{"seq":11,"tipo":"lec')
+
+    restaurada = reiniciar(str(tmp_path))
+    verificar_estado(restaurada, libro_se)
+    assert restaurada.registro.seq == 10
+
+
+def test_esperar_bloquea_hasta_fsync(tmp_path):
+    registro = RegistroEventos(str(tmp_path), durable=True, intervalo_fsync=0)
+    seq = registro.registrar({"tipo": "lector", "id": "L001"})
+    registro.esperar(seq)
+    contenido = (tmp_path / "eventos-00000000000000000001.log").read_text()
+    registro.cerrar()
+
+    assert seq == 1
+    assert json.loads(contenido) == {"seq": 1, "tipo": "lector", "id": "L001"}
+
+
+def test_esperar_no_aguarda_el_intervalo_entre_lotes(tmp_path):
+    registro = RegistroEventos(str(tmp_path), durable=True, intervalo_fsync=60)
+    inicio = time.monotonic()
+    for i in range(3):
+        registro.esperar(registro.registrar({"tipo": "lector", "id": f"L{i}"}))
+    registro.cerrar()
+
+    assert time.monotonic() - inicio < 5
+    lineas = (tmp_path / "eventos-00000000000000000001.log").read_text().splitlines()
+    assert [json.loads(linea)["seq"] for linea in lineas] == [1, 2, 3]
+
+
+def test_reservas_sobreviven_reinicio_e_instantanea(tmp_path, libro_se):
+    biblioteca = cargar_biblioteca(str(tmp_path), eventos_por_instantanea=14)
+    poblar(biblioteca, libro_se)
+    biblioteca.agregar_lector(Lector(id="L003", nombre="Ana Gomez", email="ana@example.com"))
+    biblioteca.reservar_libro("L002", libro_se.id)
+    biblioteca.reservar_libro("L003", libro_se.id)
+    biblioteca.devolver_libro("L001", "C001")
+    biblioteca.registro.cerrar()
+    with open(tmp_path / ARCHIVO_INSTANTANEA) as archivo:
+        assert json.load(archivo)["reservas_asignadas"][0]["lector_id"] == "L002"
+
+    restaurada = reiniciar(str(tmp_path))
+    assert restaurada.copias["C001"].estado == EstadoCopia.RESERVADA
+    assert restaurada.reservas.asignada("C001").lector_id == "L002"
+    assert [r.lector_id for r in restaurada.reservas.pendientes(libro_se.id)] == ["L003"]
+
+    restaurada.activar_temporizador()
+    restaurada.procesar_temporizadores(datetime.now() + timedelta(days=4))
+    restaurada.registro.cerrar()
+    assert reiniciar(str(tmp_path)).reservas.asignada("C001").lector_id == "L003"
+
+
+def test_notificaciones_limitadas_sobreviven_reinicio(tmp_path, libro_se):
+    biblioteca = cargar_biblioteca(str(tmp_path))
+    biblioteca.limite_notificaciones = 1
+    biblioteca.agregar_copia(Copia(id="C001", libro=libro_se))
+    biblioteca.agregar_copia(Copia(id="C002", libro=libro_se))
+    biblioteca.agregar_lector(Lector(id="L001", nombre="Juan Perez", email="juan@example.com"))
+    for i in range(4):
+        biblioteca.agregar_lector(Lector(id=f"F{i}", nombre=f"Lector {i}", email=f"f{i}@example.com"))
+        biblioteca.suscribir_lector(f"F{i}", libro_se.id)
+    biblioteca.prestar_libro("L001", "C001")
+    biblioteca.prestar_libro("L001", "C002")
+    biblioteca.devolver_lote([("L001", "C001"), ("L001", "C002")])
+    biblioteca.prestar_libro("L001", "C001")
+    biblioteca.devolver_libro("L001", "C001")
+    suscritos = [s.lector.id for s in biblioteca.bio_alert.obtener_suscripciones(libro_se.id)]
+    biblioteca.registro.cerrar()
+
+    restaurada = reiniciar(str(tmp_path))
+
+    assert suscritos == ["F2", "F3"]
+    assert restaurada.limite_notificaciones is None
+    assert [s.lector.id for s in restaurada.bio_alert.obtener_suscripciones(libro_se.id)] == suscritos
+
+
+def test_biblioteca_async_con_registro_escribe_en_hilos_sin_bloquear_el_bucle(tmp_path, libro_se):
+    biblioteca = cargar_biblioteca(str(tmp_path), durable=True, eventos_por_instantanea=4)
+    servicio = BibliotecaAsync(biblioteca)
+
+    async def escenario():
+        with biblioteca.bloquear_todo():
+            escritura = asyncio.ensure_future(servicio.agregar_libro(libro_se))
+            for _ in range(20):
+                await asyncio.sleep(0.001)
+            bloqueada = not escritura.done()
+        await escritura
+        await asyncio.gather(*(servicio.agregar_copia(Copia(id=f"C{i}", libro=libro_se)) for i in range(6)))
+        return bloqueada
+
+    bloqueada = asyncio.run(escenario())
+    contenido = "".join(path.read_text() for path in tmp_path.glob("eventos-*.log"))
+    biblioteca.registro.cerrar()
+
+    assert bloqueada
+    assert json.loads(contenido.splitlines()[-1])["seq"] == 7
+    with open(tmp_path / ARCHIVO_INSTANTANEA) as archivo:
+        assert json.load(archivo)["seq"] >= 4
+    assert set(reiniciar(str(tmp_path)).copias) == {f"C{i}" for i in range(6)}
+
+
+def test_biblioteca_async_en_memoria_no_bloquea_el_bucle_mientras_otro_hilo_bloquea_todo(libro_se):
+    biblioteca = BibliotecaService()
+    servicio = BibliotecaAsync(biblioteca)
+    bloqueando, liberar = threading.Event(), threading.Event()
+
+    def temporizador():
+        with biblioteca.bloquear_todo():
+            bloqueando.set()
+            liberar.wait(5)
+
+    hilo = threading.Thread(target=temporizador)
+    hilo.start()
+    bloqueando.wait(5)
+
+    async def escenario():
+        escritura = asyncio.ensure_future(servicio.agregar_libro(libro_se))
+        inicio = time.monotonic()
+        for _ in range(20):
+            await asyncio.sleep(0.001)
+        atendido = time.monotonic() - inicio < 2
+        bloqueada = not escritura.done()
+        liberar.set()
+        await escritura
+        return atendido, bloqueada
+
+    atendido, bloqueada = asyncio.run(escenario())
+    hilo.join()
+
+    assert atendido and bloqueada
+    assert biblioteca.obtener_libro(libro_se.id) is libro_se
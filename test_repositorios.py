@@ -0,0 +1,63 @@
+import pytest
+from test_bliblioteca import *
+from repositorio import RepositorioSQLite
+from service import BibliotecaService
+
+
+@pytest.fixture
+def repositorio_sqlite(tmp_path):
+    repositorio = RepositorioSQLite(str(tmp_path / "biblioteca.db"))
+    yield repositorio
+    repositorio.cerrar()
+
+
+@pytest.fixture
+def biblioteca(repositorio_sqlite):
+    service = BibliotecaService(repositorio=repositorio_sqlite)
+    service.bio_alert._suscripciones = {}
+    return service
+
+
+def test_sqlite_usa_wal(repositorio_sqlite):
+    modo = repositorio_sqlite._conexion.execute("PRAGMA journal_mode").fetchone()[0]
+    assert modo == "wal"
+
+
+@pytest.mark.parametrize("sql, indice", [
+    ("SELECT id FROM libros WHERE autor_clave = ?", "libros_autor"),
+    ("SELECT COUNT(*) FROM copias WHERE libro_id = ? AND estado = ?", "copias_libro_estado"),
+    ("SELECT id FROM copias WHERE libro_id = ? ORDER BY rowid", "copias_libro"),
+    ("SELECT copia_id FROM prestamos WHERE lector_id = ?", "prestamos_lector"),
+    ("SELECT id FROM libros WHERE autor_clave = ? AND rowid > ? ORDER BY rowid LIMIT ?", "libros_autor"),
+    ("SELECT id FROM copias WHERE libro_id = ? AND rowid > ? ORDER BY rowid LIMIT ?", "copias_libro"),
+])
+def test_sqlite_consultas_usan_indices(repositorio_sqlite, sql, indice):
+    parametros = ("x",) * sql.count("?")
+    plan = repositorio_sqlite._conexion.execute("EXPLAIN QUERY PLAN " + sql, parametros).fetchall()
+    assert any(indice in fila[-1] for fila in plan)
+
+
+def test_sqlite_estado_sobrevive_reapertura(tmp_path, libro_se):
+    ruta = str(tmp_path / "biblioteca.db")
+    repositorio = RepositorioSQLite(ruta)
+    service = BibliotecaService(repositorio=repositorio)
+    service.agregar_copia(Copia(id="C001", libro=libro_se))
+    service.agregar_copia(Copia(id="C002", libro=libro_se))
+    service.agregar_lector(Lector(id="L001", nombre="Juan Perez", email="juan@example.com"))
+    service.prestar_libro("L001", "C001")
+    repositorio.cerrar()
+
+    repositorio = RepositorioSQLite(ruta)
+    service = BibliotecaService(repositorio=repositorio)
+    lector = service.lectores["L001"]
+
+    assert [p.copia.id for p in lector.prestamos_activos] == ["C001"]
+    assert service.copias["C001"].estado == EstadoCopia.PRESTADA
+    assert [c.id for c in service.obtener_copias_disponibles(libro_se.id)] == ["C002"]
+    assert [l.id for l in service.obtener_libros_por_autor("SOMERVILLE")] == [libro_se.id]
+
+    assert [l.id for l, _ in service.buscar_libros("softw")] == [libro_se.id]
+
+    service.devolver_libro("L001", "C001")
+    assert service.contar_copias_estado(libro_se.id, EstadoCopia.DISPONIBLE) == 2
+    repositorio.cerrar()
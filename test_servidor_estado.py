@@ -0,0 +1,184 @@
+import multiprocessing
+import os
+import stat
+import threading
+import pytest
+from datetime import date
+from models import Autor, Libro, Copia, Lector, EstadoCopia, BioAlert
+from service import BibliotecaService
+from servidor_estado import ServidorEstado, ReplicaBiblioteca, servir_metricas
+
+CLAVE = b"clave-de-prueba"
+
+
+def servir(direccion, listo, detener):
+    BioAlert()._suscripciones = {}
+    service = BibliotecaService()
+    service.limite_notificaciones = 1
+    servidor = ServidorEstado(service, direccion, CLAVE).iniciar()
+    listo.set()
+    detener.wait()
+    servidor.cerrar()
+
+
+@pytest.fixture(autouse=True)
+def limpiar_bioalert():
+    BioAlert()._suscripciones = {}
+    yield
+    BioAlert()._suscripciones = {}
+
+
+@pytest.fixture
+def direccion(tmp_path):
+    contexto = multiprocessing.get_context("fork")
+    ruta = str(tmp_path / "estado.sock")
+    listo, detener = contexto.Event(), contexto.Event()
+    proceso = contexto.Process(target=servir, args=(ruta, listo, detener))
+    proceso.start()
+    assert listo.wait(10)
+    yield ruta
+    detener.set()
+    proceso.join(10)
+
+
+@pytest.fixture
+def replicas(direccion):
+    creadas = []
+
+    def crear():
+        replica = ReplicaBiblioteca(direccion, CLAVE)
+        creadas.append(replica)
+        return replica
+
+    yield crear
+    for replica in creadas:
+        replica.cerrar()
+
+
+@pytest.fixture
+def libro_se():
+    autor = Autor(nombre="Somerville", fecha_nacimiento=date(1950, 1, 1))
+    return Libro(nombre="Software Engineering", anio=2020, autor=autor)
+
+
+def poblar(biblioteca, libro_se):
+    biblioteca.agregar_copia(Copia(id="C001", libro=libro_se))
+    biblioteca.agregar_copia(Copia(id="C002", libro=libro_se))
+    biblioteca.agregar_lector(Lector(id="L001", nombre="Juan Perez", email="juan@example.com"))
+    biblioteca.agregar_lector(Lector(id="L002", nombre="Maria Lopez", email="maria@example.com"))
+
+
+def test_replica_lee_sus_propias_escrituras(replicas, libro_se):
+    replica = replicas()
+    poblar(replica, libro_se)
+
+    prestamo = replica.prestar_libro("L001", "C001")
+
+    assert prestamo.copia.id == "C001"
+    assert replica.copias["C001"].estado == EstadoCopia.PRESTADA
+    assert [p.copia.id for p in replica.lectores["L001"].prestamos_activos] == ["C001"]
+    assert replica.contar_copias_estado(libro_se.id, EstadoCopia.DISPONIBLE) == 1
+
+
+def test_replicas_convergen_tras_sincronizar(replicas, libro_se):
+    escritora, lectora = replicas(), replicas()
+    poblar(escritora, libro_se)
+    escritora.prestar_libro("L002", "C002")
+
+    lectora.sincronizar()
+
+    assert lectora.seq_aplicado == escritora.seq_aplicado
+    assert lectora.copias["C002"].estado == EstadoCopia.PRESTADA
+    assert [l.id for l in lectora.obtener_libros_por_autor("somerville")] == [libro_se.id]
+
+
+def test_errores_del_dueno_se_propagan(replicas, libro_se):
+    replica = replicas()
+    poblar(replica, libro_se)
+
+    with pytest.raises(ValueError, match="Copia no encontrada"):
+        replica.prestar_libro("L001", "C999")
+
+
+def test_replica_nueva_arranca_desde_instantanea(replicas, libro_se):
+    primera = replicas()
+    poblar(primera, libro_se)
+    primera.prestar_libro("L001", "C001")
+    primera.suscribir_lector("L002", libro_se.id)
+
+    nueva = replicas()
+
+    assert nueva.seq_aplicado == primera.seq_aplicado
+    assert nueva.copias["C001"].estado == EstadoCopia.PRESTADA
+    assert nueva.bio_alert.esta_suscrito("L002", libro_se.id)
+
+
+def test_escrituras_concurrentes_se_serializan_en_el_dueno(replicas, libro_se):
+    una, otra = replicas(), replicas()
+    poblar(una, libro_se)
+    otra.sincronizar()
+    exitos = []
+    barrera = threading.Barrier(2)
+
+    def prestar(replica, lector_id):
+        barrera.wait()
+        try:
+            replica.prestar_libro(lector_id, "C001")
+        except ValueError:
+            return
+        exitos.append(lector_id)
+
+    hilos = [threading.Thread(target=prestar, args=args) for args in ((una, "L001"), (otra, "L002"))]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    una.sincronizar()
+    otra.sincronizar()
+
+    assert len(exitos) == 1
+    assert una.copias["C001"].estado == otra.copias["C001"].estado == EstadoCopia.PRESTADA
+
+
+def test_replica_respeta_el_limite_de_notificaciones_del_dueno(direccion, replicas, libro_se):
+    replica = replicas()
+    poblar(replica, libro_se)
+    replica.agregar_lector(Lector(id="L003", nombre="Ana Gomez", email="ana@example.com"))
+    replica.prestar_libro("L001", "C001")
+    replica.prestar_libro("L001", "C002")
+    replica.suscribir_lector("L002", libro_se.id)
+    replica.suscribir_lector("L003", libro_se.id)
+
+    replica.devolver_libro("L001", "C001")
+
+    assert replica.limite_notificaciones == 1
+    assert len(replica.bio_alert.obtener_suscripciones(libro_se.id)) == 1
+    assert stat.S_IMODE(os.stat(direccion).st_mode) == 0o600
+
+
+def test_servidor_estado_exige_clave(tmp_path):
+    with pytest.raises(ValueError, match="clave"):
+        ServidorEstado(BibliotecaService(), str(tmp_path / "sin-clave.sock"), None)
+    assert not (tmp_path / "sin-clave.sock").exists()
+    with pytest.raises(ValueError, match="clave"):
+        ReplicaBiblioteca(str(tmp_path / "sin-clave.sock"), b"")
+
+
+def test_metricas_de_dominio_se_exponen_desde_el_dueno(libro_se):
+    import httpx
+    service = BibliotecaService()
+    poblar(service, libro_se)
+    service.prestar_libro("L001", "C001")
+    with pytest.raises(ValueError):
+        service.prestar_libro("L002", "C001")
+    servidor = servir_metricas(service, "127.0.0.1", 0)
+    try:
+        url = f"http://127.0.0.1:{servidor.server_address[1]}"
+        lineas = httpx.get(f"{url}/metrics").text.splitlines()
+        assert httpx.get(f"{url}/otra").status_code == 404
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+    assert "biblioteca_prestamos_total 1" in lineas
+    assert any(l.startswith("biblioteca_rechazos_total{") and l.endswith(" 1") for l in lineas)
@@ -0,0 +1,64 @@
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from models import Prestamo
+
+Clave = Tuple[datetime, str]
+
+
+class IndiceVencimientos:
+    def __init__(self):
+        self._claves: List[Clave] = []
+        self._prestamos: Dict[str, Tuple[Prestamo, str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._prestamos)
+
+    def __iter__(self) -> Iterator[Tuple[Prestamo, str]]:
+        with self._lock:
+            return iter(list(self._prestamos.values()))
+
+    def agregar(self, prestamo: Prestamo, lector_id: str):
+        clave = (prestamo.fecha_devolucion_esperada, prestamo.copia.id)
+        with self._lock:
+            self._prestamos[prestamo.copia.id] = (prestamo, lector_id)
+            if not self._claves or clave > self._claves[-1]:
+                self._claves.append(clave)
+                return
+            posicion = bisect_left(self._claves, clave)
+            if posicion == len(self._claves) or self._claves[posicion] != clave:
+                self._claves.insert(posicion, clave)
+
+    def quitar(self, prestamo: Prestamo):
+        with self._lock:
+            actual = self._prestamos.get(prestamo.copia.id)
+            if actual is None or actual[0].fecha_devolucion_esperada != prestamo.fecha_devolucion_esperada:
+                return
+            del self._prestamos[prestamo.copia.id]
+            if len(self._claves) > 2 * len(self._prestamos) + 32:
+                self._claves = [clave for clave in self._claves if self._vigente(clave)]
+
+    def _vigente(self, clave: Clave) -> bool:
+        actual = self._prestamos.get(clave[1])
+        return actual is not None and actual[0].fecha_devolucion_esperada == clave[0]
+
+    def vencidos(
+        self,
+        ahora: datetime,
+        despues: Optional[Clave],
+        limite: int
+    ) -> Tuple[List[Tuple[Prestamo, str]], Optional[Clave]]:
+        resultado = []
+        with self._lock:
+            posicion = bisect_right(self._claves, despues) if despues is not None else 0
+            while posicion < len(self._claves) and self._claves[posicion][0] < ahora:
+                clave = self._claves[posicion]
+                posicion += 1
+                if self._vigente(clave):
+                    if len(resultado) == limite:
+                        return resultado, (resultado[-1][0].fecha_devolucion_esperada, resultado[-1][0].copia.id)
+                    resultado.append(self._prestamos[clave[1]])
+        return resultado, None